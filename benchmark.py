@@ -0,0 +1,393 @@
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import logging
+import tempfile
+import importlib
+from contextlib import contextmanager
+import numpy as np
+
+# Benchmarks of the data and model pipeline on synthetic data, so they run
+# offline. Results are compared with a JSON baseline and any benchmark that
+# got slower than `threshold` x its baseline time is reported as a regression.
+# A benchmark entry in the baseline may set its own "threshold".
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = 'benchmark_baseline.json'
+DEFAULT_THRESHOLD = 1.5
+MODELS = ['exercise_classifier.h5', 'best_model.h5']
+MODEL_BATCH_SIZE = 256
+
+BENCHMARKS = []
+
+
+class SkipBenchmark(Exception):
+    """Raised by a benchmark setup when it cannot run in this environment"""
+
+
+def benchmark(name):
+    """Register a setup function; it returns the callable to time"""
+    def register(setup):
+        BENCHMARKS.append((name, setup))
+        return setup
+    return register
+
+
+@contextmanager
+def working_dir(path):
+    """Run code that uses repo-relative paths against a synthetic tree"""
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+def load_script(relative_path):
+    """Import a script of the training package, e.g. 'training/train_model.py'
+    as training.train_model, which does not shadow the root train_model.py"""
+    name = os.path.splitext(relative_path)[0].replace('/', '.')
+    try:
+        return importlib.import_module(name)
+    except ImportError as e:
+        raise SkipBenchmark(f"{relative_path}: {e}")
+
+
+# Synthetic data ------------------------------------------------------------
+
+def make_mmfit_tree(base_dir, rng, workouts=4, frames=2000, segments=5):
+    """data/mm-fit/mm-fit/wXX/{wXX_labels.csv, wXX_pose_3d.npy} like the real dataset"""
+    exercises = ['squats', 'pushups', 'lunges', 'situps', 'jumping_jacks']
+    for w in range(workouts):
+        name = f"w{w:02d}"
+        workout_dir = os.path.join(base_dir, 'data', 'mm-fit', 'mm-fit', name)
+        os.makedirs(workout_dir, exist_ok=True)
+        np.save(os.path.join(workout_dir, f"{name}_pose_3d.npy"),
+                rng.random((3, frames, 18)).astype(np.float32))
+        bounds = np.linspace(0, frames, segments + 1).astype(int)
+        with open(os.path.join(workout_dir, f"{name}_labels.csv"), 'w') as f:
+            for i in range(segments):
+                f.write(f"{bounds[i]},{bounds[i + 1]},10,{exercises[i % len(exercises)]}\n")
+
+
+def make_pose_store(store_dir, rng, poses=50000, exercises=10, workouts=5):
+    from pose_store import PoseStoreWriter
+    per_segment = poses // (exercises * workouts)
+    with PoseStoreWriter(store_dir) as writer:
+        for w in range(workouts):
+            for e in range(exercises):
+                writer.append(f"w{w:02d}", f"exercise_{e}",
+                              rng.random((per_segment, 17, 3)).astype(np.float32))
+
+
+def make_keypoint_dir(keypoints_dir, rng, files=20, frames=300):
+    os.makedirs(keypoints_dir, exist_ok=True)
+    for i in range(files):
+        np.save(os.path.join(keypoints_dir, f"exercise {i}_keypoints.npy"),
+                rng.random((frames, 17, 3)).astype(np.float32))
+
+
+# Benchmarks ----------------------------------------------------------------
+
+@benchmark('process_mmfit.convert_pose_format')
+def bench_convert_pose_format(ctx):
+    from process_mmfit import convert_pose_format
+    poses = ctx.rng.random((1000, 3, 18)).astype(np.float32)
+    return lambda: [convert_pose_format(p) for p in poses]
+
+
+@benchmark('process_mmfit.convert_pose_sequence')
+def bench_convert_pose_sequence(ctx):
+    from process_mmfit import convert_pose_sequence
+    poses = ctx.rng.random((1000, 3, 18)).astype(np.float32)
+    return lambda: convert_pose_sequence(poses)
+
+
+@benchmark('process_mmfit.process_mmfit_data')
+def bench_process_mmfit_data(ctx):
+    from process_mmfit import process_mmfit_data
+    base = ctx.subdir('mmfit')
+    make_mmfit_tree(base, ctx.rng)
+
+    def run():
+        with working_dir(base), ctx.quiet():
+            process_mmfit_data('data/processed_mmfit', force=True)
+    return run
+
+
+@benchmark('process_mmfit.process_mmfit_data (cached)')
+def bench_process_mmfit_data_cached(ctx):
+    from process_mmfit import process_mmfit_data
+    base = ctx.subdir('mmfit_cached')
+    make_mmfit_tree(base, ctx.rng)
+    with working_dir(base), ctx.quiet():
+        process_mmfit_data('data/processed_mmfit')
+
+    def run():
+        with working_dir(base), ctx.quiet():
+            process_mmfit_data('data/processed_mmfit')
+    return run
+
+
+@benchmark('train_model.Dataset.load_data')
+def bench_dataset_load_data(ctx):
+    from train_model import Dataset
+    data_dir = ctx.subdir('dataset')
+    make_pose_store(os.path.join(data_dir, 'processed_mmfit'), ctx.rng)
+    def run():
+        with ctx.quiet():
+            Dataset(data_dir).load_data()
+    return run
+
+
+@benchmark('train_model.Dataset._normalize_data')
+def bench_normalize_data(ctx):
+    from train_model import Dataset
+    data_dir = ctx.subdir('normalize')
+    make_pose_store(os.path.join(data_dir, 'processed_mmfit'), ctx.rng)
+    dataset = Dataset(data_dir)
+    with ctx.quiet():
+        dataset._load_mmfit_data()
+    X = dataset.X
+
+    def run():
+        dataset.X = X
+        dataset._normalize_data()
+    return run
+
+
+@benchmark('pose_augment.augment_data')
+def bench_augment_data(ctx):
+    from pose_augment import augment_data
+    X = ctx.rng.random((10000, 51)).astype(np.float32)
+    y = ctx.rng.integers(0, 10, len(X))
+    return lambda: augment_data(X, y)
+
+
+@benchmark('keypoint_files.load_keypoint_files')
+def bench_load_keypoint_files(ctx):
+    from keypoint_files import load_keypoint_files
+    keypoints_dir = ctx.subdir('keypoints')
+    make_keypoint_dir(keypoints_dir, ctx.rng)
+    return lambda: load_keypoint_files(keypoints_dir)
+
+
+@benchmark('keypoint_files.read_keypoints (csv)')
+def bench_read_keypoints_csv(ctx):
+    from keypoint_files import read_keypoints
+    path = os.path.join(ctx.subdir('csv'), 'exercise_keypoints.csv')
+    np.savetxt(path, ctx.rng.random((3000, 51)), delimiter=',')
+    return lambda: read_keypoints(path)
+
+
+@benchmark('extract_keypoints_v2.save_keypoints')
+def bench_smoothing(ctx):
+    save_keypoints = load_script('training/extract_keypoints_v2.py').save_keypoints
+    output_dir = ctx.subdir('smoothing')
+    keypoints = ctx.rng.random((300, 51)).astype(np.float32)
+
+    def run():
+        with ctx.quiet():
+            save_keypoints(keypoints, 'bench.gif', output_dir)
+    return run
+
+
+def _filter_benchmark(ctx, method):
+    from keypoint_filters import smooth_keypoints
+    keypoints = ctx.rng.random((300, 51)).astype(np.float32)
+    return lambda: smooth_keypoints(keypoints, method)
+
+
+for _method in ['ema', 'moving_average', 'confidence', 'one_euro']:
+    benchmark(f'keypoint_filters.smooth_keypoints[{_method}]')(
+        lambda ctx, method=_method: _filter_benchmark(ctx, method))
+
+
+@benchmark('pose_features.pose_features')
+def bench_pose_features(ctx):
+    from pose_features import pose_features
+    keypoints = ctx.rng.random((300, 51)).astype(np.float32)
+    return lambda: pose_features(keypoints)
+
+
+def _model_benchmark(model_path, batch_size):
+    def setup(ctx):
+        import tensorflow as tf
+        import pose_normalization  # registers PoseNormalization for load_model
+        path = os.path.join(ROOT, model_path)
+        if not os.path.exists(path):
+            raise SkipBenchmark(f"{model_path} not found")
+        model = tf.keras.models.load_model(path, compile=False)
+        forward = tf.function(lambda x: model(x, training=False))
+        x = tf.constant(ctx.rng.random((batch_size, model.input_shape[-1])).astype(np.float32))
+        return lambda: forward(x).numpy()
+    return setup
+
+
+for _model in MODELS:
+    benchmark(f"{_model} single pose")(_model_benchmark(_model, 1))
+    benchmark(f"{_model} batch {MODEL_BATCH_SIZE}")(_model_benchmark(_model, MODEL_BATCH_SIZE))
+
+
+# Runner --------------------------------------------------------------------
+
+class Context:
+    def __init__(self, tmp_dir, seed=0):
+        self.tmp_dir = tmp_dir
+        self.rng = np.random.default_rng(seed)
+
+    def subdir(self, name):
+        path = os.path.join(self.tmp_dir, name)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    @contextmanager
+    def quiet(self):
+        """Silence the progress output of the code under test"""
+        with open(os.devnull, 'w') as devnull:
+            stdout, stderr = sys.stdout, sys.stderr
+            sys.stdout = sys.stderr = devnull
+            logging.disable(logging.INFO)
+            try:
+                yield
+            finally:
+                logging.disable(logging.NOTSET)
+                sys.stdout, sys.stderr = stdout, stderr
+
+
+def time_callable(fn, min_time=0.5, max_repeats=50, min_repeats=3):
+    """Median and min wall time in ms, after one warm-up call"""
+    fn()
+    times = []
+    start = time.perf_counter()
+    while len(times) < min_repeats or (len(times) < max_repeats and
+                                       time.perf_counter() - start < min_time):
+        t = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t)
+    return {'median_ms': 1000 * float(np.median(times)),
+            'min_ms': 1000 * float(np.min(times)),
+            'repeats': len(times)}
+
+
+def machine_info():
+    info = {'platform': platform.platform(), 'python': platform.python_version(),
+            'numpy': np.__version__, 'cpu_count': os.cpu_count()}
+    try:
+        import tensorflow as tf
+        info['tensorflow'] = tf.__version__
+    except ImportError:
+        pass
+    return info
+
+
+def run_benchmarks(selected=None, min_time=0.5):
+    results = {}
+    tmp_dir = tempfile.mkdtemp(prefix='formsense_bench_')
+    try:
+        ctx = Context(tmp_dir)
+        for name, setup in BENCHMARKS:
+            if selected and not any(s in name for s in selected):
+                continue
+            try:
+                fn = setup(ctx)
+                results[name] = time_callable(fn, min_time=min_time)
+                print(f"  {name:50s} {results[name]['median_ms']:10.3f} ms")
+            except SkipBenchmark as e:
+                results[name] = {'skipped': str(e)}
+                print(f"  {name:50s}    skipped ({e})")
+            except Exception as e:
+                # Record the failure and keep going so the other results are kept
+                results[name] = {'failed': f"{type(e).__name__}: {e}"}
+                print(f"  {name:50s}    ❌ failed ({type(e).__name__}: {e})")
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return results
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """Return the (name, baseline ms, current ms, ratio) rows that regressed"""
+    regressions = []
+    print(f"\n{'benchmark':50s} {'baseline':>10s} {'current':>10s} {'ratio':>7s}")
+    for name, result in results.items():
+        base = baseline.get('results', {}).get(name)
+        if 'median_ms' not in result or not base or 'median_ms' not in base:
+            continue
+        ratio = result['median_ms'] / base['median_ms']
+        limit = base.get('threshold', threshold)
+        flag = '  ❌' if ratio > limit else ''
+        print(f"{name:50s} {base['median_ms']:10.3f} {result['median_ms']:10.3f} {ratio:6.2f}x{flag}")
+        if ratio > limit:
+            regressions.append((name, base['median_ms'], result['median_ms'], ratio))
+    return regressions
+
+
+def report_failures(failed):
+    """Print the benchmarks that raised; 1 if there were any, else 0"""
+    if not failed:
+        return 0
+    print(f"\n❌ {len(failed)} benchmark(s) failed: {', '.join(failed)}")
+    return 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the data and model pipeline on synthetic data')
+    parser.add_argument('names', nargs='*', help='Only run benchmarks whose name contains one of these')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='Write the results as the new baseline instead of comparing')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='Slowdown ratio that counts as a regression')
+    parser.add_argument('--min-time', type=float, default=0.5,
+                        help='Seconds to spend timing each benchmark')
+    parser.add_argument('--list', action='store_true')
+    args = parser.parse_args()
+
+    if args.list:
+        for name, _ in BENCHMARKS:
+            print(name)
+        return 0
+
+    print("Running benchmarks...")
+    results = run_benchmarks(args.names, args.min_time)
+    failed = [name for name, result in results.items() if 'failed' in result]
+
+    if args.save_baseline:
+        baseline = {'machine': machine_info(), 'results': results}
+        if os.path.exists(args.baseline) and args.names:
+            # Partial run: update only the benchmarks that ran
+            with open(args.baseline, 'r') as f:
+                previous = json.load(f)
+            previous['results'].update(results)
+            baseline['results'] = previous['results']
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2)
+        print(f"\n✅ Baseline saved to {args.baseline}")
+        return report_failures(failed)
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; create one with --save-baseline")
+        return report_failures(failed)
+
+    with open(args.baseline, 'r') as f:
+        baseline = json.load(f)
+    if baseline.get('machine', {}).get('platform') != platform.platform():
+        print(f"\n⚠️ Baseline was recorded on {baseline.get('machine', {}).get('platform')}; "
+              "ratios across machines are only indicative")
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"\n❌ {len(regressions)} benchmark(s) regressed beyond their threshold")
+        report_failures(failed)
+        return 1
+    if report_failures(failed):
+        return 1
+    print("\n✅ No regressions")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,186 @@
+import os
+import json
+import argparse
+import numpy as np
+import tensorflow as tf
+import pose_normalization  # registers PoseNormalization for load_model
+from keypoint_files import load_keypoint_splits
+from export_model import single_pose_latency_ms
+
+# Two-stage classification: a small model (e.g. the distilled student) answers
+# every pose whose top-1 margin clears a calibrated threshold, and only the
+# ambiguous rest go to the full classifier. The calibration file records both
+# models, the threshold and the measured costs. The threshold is calibrated on
+# the calibration tail of every keypoint file and the costs are measured on the
+# test tail, which neither the calibration nor the student's early stopping saw:
+#   {'fast_model', 'full_model', 'threshold', 'accept_rate', 'accuracy', ...}
+DEFAULT_FAST_MODEL = 'student_classifier.h5'
+DEFAULT_FULL_MODEL = 'exercise_classifier.h5'
+DEFAULT_CALIBRATION = 'models/cascade.json'
+MAX_ACCURACY_DROP = 0.005
+
+
+def top1_margin(probs):
+    """Top-1 minus top-2 probability of each row"""
+    top2 = np.partition(probs, -2, axis=1)[:, -2:]
+    return top2[:, 1] - top2[:, 0]
+
+
+class CascadeClassifier:
+    """Callable like a Keras model on (B, D) poses; returns (B, C) probabilities
+    from the fast model where its margin is at least `threshold`, else from
+    the full model, which only sees the ambiguous rows"""
+
+    def __init__(self, fast_model, full_model, threshold):
+        if fast_model.output_shape[-1] != full_model.output_shape[-1]:
+            raise ValueError(f"Fast and full models predict {fast_model.output_shape[-1]} and "
+                             f"{full_model.output_shape[-1]} classes")
+        self.fast_model = fast_model
+        self.full_model = full_model
+        self.threshold = float(threshold)
+        self.input_shape = fast_model.input_shape
+        self.output_shape = fast_model.output_shape
+
+    def __call__(self, inputs, training=False):
+        probs = tf.cast(self.fast_model(inputs, training=False), tf.float32)
+        top2 = tf.math.top_k(probs, k=2).values
+        ambiguous = tf.where(top2[:, 0] - top2[:, 1] < self.threshold)
+        full = self.full_model(tf.gather_nd(inputs, ambiguous), training=False)
+        return tf.tensor_scatter_nd_update(probs, ambiguous, tf.cast(full, tf.float32))
+
+    def predict(self, X, batch_size=1024):
+        """(probabilities, bool mask of rows answered by the fast model)"""
+        fast = self.fast_model.predict(X, batch_size=batch_size, verbose=0)
+        accepted = top1_margin(fast) >= self.threshold
+        if not accepted.all():
+            fast[~accepted] = self.full_model.predict(X[~accepted], batch_size=batch_size, verbose=0)
+        return fast, accepted
+
+
+def load_cascade(calibration_path=DEFAULT_CALIBRATION):
+    """CascadeClassifier from a calibration file written by main()"""
+    with open(calibration_path, 'r') as f:
+        calibration = json.load(f)
+    fast_model = tf.keras.models.load_model(calibration['fast_model'], compile=False)
+    full_model = tf.keras.models.load_model(calibration['full_model'], compile=False)
+    return CascadeClassifier(fast_model, full_model, calibration['threshold'])
+
+
+def cascade_curve(fast_probs, full_probs, labels):
+    """Accuracy of the cascade at every distinct threshold.
+
+    Returns (thresholds, accept rates, accuracies), from accepting nothing
+    (threshold inf) to accepting every pose. All thresholds are evaluated
+    at once from cumulative sums over the poses sorted by margin.
+    """
+    margins = top1_margin(fast_probs)
+    order = np.argsort(-margins, kind='stable')
+    margins = margins[order]
+    fast_correct = (np.argmax(fast_probs, axis=1) == labels)[order]
+    full_correct = (np.argmax(full_probs, axis=1) == labels)[order]
+    # Accepting the first k poses: fast answers [:k], full answers [k:]
+    accepted_correct = np.concatenate([[0], np.cumsum(fast_correct)])
+    rejected_correct = np.concatenate([np.cumsum(full_correct[::-1])[::-1], [0]])
+    n = len(margins)
+    k = np.arange(n + 1)
+    # With tied margins a threshold accepts all of them, so only cut between distinct values
+    valid = np.ones(n + 1, dtype=bool)
+    valid[1:n] = margins[:-1] > margins[1:]
+    thresholds = np.concatenate([[np.inf], margins])
+    accuracy = (accepted_correct + rejected_correct) / n
+    return thresholds[valid], (k / n)[valid], accuracy[valid]
+
+
+def calibrate_threshold(fast_probs, full_probs, labels, target_accuracy):
+    """Lowest threshold (most poses answered by the fast model) whose cascade
+    accuracy is at least target_accuracy; (threshold, accept rate, accuracy)"""
+    thresholds, accept_rates, accuracies = cascade_curve(fast_probs, full_probs, labels)
+    ok = np.flatnonzero(accuracies >= target_accuracy)
+    # Accepting nothing always reaches the full model's accuracy
+    best = ok[-1] if len(ok) else 0
+    return float(thresholds[best]), float(accept_rates[best]), float(accuracies[best])
+
+
+def expected_cost_ms(accept_rate, fast_ms, full_ms):
+    """Average per-pose cost: the fast model always runs, the full model on rejects"""
+    return fast_ms + (1 - accept_rate) * full_ms
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Calibrate a fast/full classifier cascade')
+    parser.add_argument('--fast-model', default=DEFAULT_FAST_MODEL)
+    parser.add_argument('--full-model', default=DEFAULT_FULL_MODEL)
+    parser.add_argument('--data', default='training/keypoints', help='Keypoint directory')
+    parser.add_argument('--target-accuracy', type=float, default=None,
+                        help='Cascade accuracy to keep (default: full model accuracy '
+                             f'minus --max-drop)')
+    parser.add_argument('--max-drop', type=float, default=MAX_ACCURACY_DROP)
+    parser.add_argument('--out', default=DEFAULT_CALIBRATION)
+    args = parser.parse_args(argv)
+
+    print(f"Loading {args.fast_model} and {args.full_model}...")
+    fast_model = tf.keras.models.load_model(args.fast_model, compile=False)
+    full_model = tf.keras.models.load_model(args.full_model, compile=False)
+
+    print(f"Loading keypoints from {args.data}...")
+    X, y, _, splits = load_keypoint_splits(args.data)
+    X_cal, y_cal = X[splits['calibration']], y[splits['calibration']]
+    X_test, y_test = X[splits['test']], y[splits['test']]
+
+    fast_cal = fast_model.predict(X_cal, batch_size=1024, verbose=0)
+    full_cal = full_model.predict(X_cal, batch_size=1024, verbose=0)
+    full_cal_accuracy = float(np.mean(np.argmax(full_cal, axis=1) == y_cal))
+    target = args.target_accuracy if args.target_accuracy is not None else full_cal_accuracy - args.max_drop
+    threshold, cal_accept_rate, cal_accuracy = calibrate_threshold(fast_cal, full_cal, y_cal, target)
+
+    fast_probs = fast_model.predict(X_test, batch_size=1024, verbose=0)
+    full_probs = full_model.predict(X_test, batch_size=1024, verbose=0)
+    fast_accuracy = float(np.mean(np.argmax(fast_probs, axis=1) == y_test))
+    full_accuracy = float(np.mean(np.argmax(full_probs, axis=1) == y_test))
+    accepted = top1_margin(fast_probs) >= threshold
+    accept_rate = float(np.mean(accepted))
+    accuracy = float(np.mean(np.where(accepted, np.argmax(fast_probs, axis=1),
+                                      np.argmax(full_probs, axis=1)) == y_test))
+
+    input_dim = X.shape[1]
+    fast_ms = single_pose_latency_ms(fast_model, input_dim)
+    full_ms = single_pose_latency_ms(full_model, input_dim)
+    calibration = {
+        'fast_model': args.fast_model,
+        'full_model': args.full_model,
+        'threshold': threshold if np.isfinite(threshold) else 2.0,  # margins are at most 1
+        'target_accuracy': target,
+        'calibration_accept_rate': cal_accept_rate,
+        'calibration_accuracy': cal_accuracy,
+        'calibration_samples': int(len(X_cal)),
+        'accept_rate': accept_rate,
+        'accuracy': accuracy,
+        'fast_accuracy': fast_accuracy,
+        'full_accuracy': full_accuracy,
+        'fast_latency_ms': fast_ms,
+        'full_latency_ms': full_ms,
+        'expected_latency_ms': expected_cost_ms(accept_rate, fast_ms, full_ms),
+        'num_samples': int(len(X_test)),
+    }
+    os.makedirs(os.path.dirname(args.out) or '.', exist_ok=True)
+    with open(args.out, 'w') as f:
+        json.dump(calibration, f, indent=2)
+
+    print(f"\nTest split ({len(X_test)} frames):")
+    print(f"{'threshold':>10s} {'fast share':>11s} {'accuracy':>9s} {'ms/pose':>8s}")
+    thresholds, accept_rates, accuracies = cascade_curve(fast_probs, full_probs, y_test)
+    for rate in [0.0, 0.25, 0.5, 0.75, 0.9, 1.0]:
+        i = min(np.searchsorted(accept_rates, rate), len(accept_rates) - 1)
+        print(f"{thresholds[i]:10.3f} {accept_rates[i]:11.1%} {accuracies[i]:9.3f} "
+              f"{expected_cost_ms(accept_rates[i], fast_ms, full_ms):8.3f}")
+
+    print("\nCascade calibration:")
+    for key, value in calibration.items():
+        print(f"  {key:24s} {value}")
+    print(f"\n✅ Full model only: {full_ms:.3f} ms/pose; cascade: "
+          f"{calibration['expected_latency_ms']:.3f} ms/pose on average")
+    print(f"✅ Calibration saved to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
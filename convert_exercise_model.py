@@ -1,26 +1,32 @@
 import os
-import tensorflow as tf
-import tensorflowjs as tfjs
-import numpy as np
-
-# Make sure the output directory exists
-os.makedirs('public/tfjs_model', exist_ok=True)
-
-# Load the model
-print("Loading exercise_classifier.h5...")
-model = tf.keras.models.load_model('exercise_classifier.h5')
-
-# Print model summary to verify
-print("\nModel Summary:")
-model.summary()
-
-# Convert to TensorFlow.js format with optimization
-print("\nConverting to TensorFlow.js format...")
-tfjs.converters.save_keras_model(
-    model,
-    'public/tfjs_model',
-    weight_shard_size_bytes=1024*1024,  # 1MB shard size
-    quantization_dtype_map={'float16': '*'}  # Use float16 for better performance
-)
-
-print("\n✅ Model converted successfully!") 
\ No newline at end of file
+import argparse
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Convert the exercise classifier to TensorFlow.js')
+    parser.add_argument('--model', default='exercise_classifier.h5')
+    parser.add_argument('--out', default='public/tfjs_model')
+    args = parser.parse_args(argv)
+
+    # Imported here so that --help does not pay for TensorFlow
+    import tensorflow as tf
+    from export_model import export_tfjs
+
+    # Make sure the output directory exists
+    os.makedirs(args.out, exist_ok=True)
+
+    # Load the model
+    print(f"Loading {args.model}...")
+    model = tf.keras.models.load_model(args.model)
+
+    # Print model summary to verify
+    print("\nModel Summary:")
+    model.summary()
+
+    # Convert to TensorFlow.js format with optimization
+    print("\nConverting to TensorFlow.js format...")
+    export_tfjs(model, args.out)  # float16 weights in 1MB shards
+
+    print("\n✅ Model converted successfully!")
+
+if __name__ == "__main__":
+    main()
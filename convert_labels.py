@@ -1,17 +1,30 @@
-import numpy as np
-import json
 import os
+import json
+import argparse
+import numpy as np
+
+DEFAULT_LABELS = 'exercise_labels.npy'
+DEFAULT_OUTPUT = 'public/tfjs_model/exercise_labels.json'
+
+def export_labels(labels_path=DEFAULT_LABELS, output_path=DEFAULT_OUTPUT):
+    """Write the class labels saved by training as JSON for the browser"""
+    print(f"Loading {labels_path}...")
+    labels = np.load(labels_path, allow_pickle=True).tolist()
+    print(f"Loaded {len(labels)} labels: {labels}")
 
-# Make sure the output directory exists
-os.makedirs('public/tfjs_model', exist_ok=True)
+    # Make sure the output directory exists
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    with open(output_path, 'w') as f:
+        json.dump(labels, f)
+    print(f"✅ Saved labels to {output_path}")
+    return labels
 
-# Load the labels
-print("Loading exercise_labels.npy...")
-labels = np.load('exercise_labels.npy', allow_pickle=True)
-print(f"Loaded {len(labels)} labels: {labels.tolist()}")
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Convert exercise_labels.npy to JSON for the browser')
+    parser.add_argument('--labels', default=DEFAULT_LABELS)
+    parser.add_argument('--out', default=DEFAULT_OUTPUT)
+    args = parser.parse_args(argv)
+    export_labels(args.labels, args.out)
 
-# Save to JSON
-output_path = 'public/tfjs_model/exercise_labels.json'
-with open(output_path, 'w') as f:
-    json.dump(labels.tolist(), f)
-print(f"Successfully saved labels to {output_path}") 
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+import os
+import json
+import argparse
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras import layers, models
+from keypoint_files import load_keypoint_splits
+from pose_normalization import PoseNormalization, MOVENET_LAYOUT
+from export_model import export_tfjs, single_pose_latency_ms
+
+# Knowledge distillation of the v2 exercise classifier into a small MLP. The
+# student learns from the teacher's temperature-softened outputs as well as
+# the labels on the head of every keypoint file, early-stops on the validation
+# tail and is compared with the teacher on the test tail. It ends in a softmax
+# so it is a drop-in replacement for the teacher in the browser and the server.
+DEFAULT_HIDDEN = (64, 64)
+# Tried from largest to smallest when fitting a latency or size budget
+STUDENT_SIZES = [(256, 128), (128, 128), (128, 64), (64, 64), (64,), (32,)]
+TEMPERATURE = 4.0
+ALPHA = 0.9  # weight of the soft-target loss against the label loss
+
+
+def create_student(input_dim, num_classes, hidden=DEFAULT_HIDDEN):
+    """Raw keypoints -> PoseNormalization -> Dense stack -> softmax; the
+    pre-softmax layer is named 'logits' for distillation"""
+    pose_input = layers.Input(shape=(input_dim,), name='pose_input')
+    x = PoseNormalization(num_joints=input_dim // 3, **MOVENET_LAYOUT, dtype='float32')(pose_input)
+    for units in hidden:
+        x = layers.Dense(units, activation='relu')(x)
+    logits = layers.Dense(num_classes, dtype='float32', name='logits')(x)
+    output = layers.Activation('softmax', dtype='float32', name='exercise_output')(logits)
+    return models.Model(pose_input, output)
+
+
+def student_logits(student):
+    """A model sharing the student's weights that outputs its logits"""
+    return models.Model(student.input, student.get_layer('logits').output)
+
+
+def teacher_logits(teacher, X, batch_size=1024):
+    """Logits of a softmax teacher, recovered as log-probabilities (softmax
+    is invariant to the constant they differ by)"""
+    probs = teacher.predict(X, batch_size=batch_size, verbose=0)
+    return np.log(np.clip(probs, 1e-7, 1.0)).astype(np.float32)
+
+
+def distillation_loss(temperature=TEMPERATURE, alpha=ALPHA):
+    """Loss on student logits against y_true = [label id, teacher logits...].
+
+    alpha * T^2 * CE(softmax(teacher / T), softmax(student / T))
+    + (1 - alpha) * CE(label, softmax(student)); the T^2 keeps the soft-target
+    gradients on the scale of the label loss.
+    """
+    def loss(y_true, logits):
+        labels = tf.cast(y_true[:, 0], tf.int32)
+        soft_targets = tf.nn.softmax(y_true[:, 1:] / temperature)
+        soft = tf.keras.losses.categorical_crossentropy(soft_targets, logits / temperature, from_logits=True)
+        hard = tf.keras.losses.sparse_categorical_crossentropy(labels, logits, from_logits=True)
+        return alpha * temperature ** 2 * soft + (1 - alpha) * hard
+    return loss
+
+
+def pick_student_size(input_dim, num_classes, budget_ms=None, max_params=None, sizes=STUDENT_SIZES):
+    """Largest hidden sizes whose untrained student meets the latency budget
+    (measured here, on one pose) and parameter limit; the smallest otherwise"""
+    for hidden in sizes:
+        student = create_student(input_dim, num_classes, hidden)
+        if max_params is not None and student.count_params() > max_params:
+            continue
+        if budget_ms is not None and single_pose_latency_ms(student, input_dim) > budget_ms:
+            continue
+        return hidden
+    return sizes[-1]
+
+
+def compare(teacher, student, X, y, batch_size=1024):
+    """Accuracy, teacher agreement, parameters and single-pose latency of both models"""
+    teacher_pred = np.argmax(teacher.predict(X, batch_size=batch_size, verbose=0), axis=1)
+    student_pred = np.argmax(student.predict(X, batch_size=batch_size, verbose=0), axis=1)
+    input_dim = X.shape[1]
+    return {
+        'teacher': {'accuracy': float(np.mean(teacher_pred == y)),
+                    'params': int(teacher.count_params()),
+                    'latency_ms': single_pose_latency_ms(teacher, input_dim)},
+        'student': {'accuracy': float(np.mean(student_pred == y)),
+                    'agreement': float(np.mean(student_pred == teacher_pred)),
+                    'params': int(student.count_params()),
+                    'latency_ms': single_pose_latency_ms(student, input_dim)},
+        'num_samples': int(len(X)),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Distill the exercise classifier into a small student')
+    parser.add_argument('--teacher', default='exercise_classifier.h5')
+    parser.add_argument('--data', default='training/keypoints', help='Keypoint directory')
+    parser.add_argument('--hidden', type=int, nargs='+', default=None,
+                        help=f'Student hidden layer sizes (default {" ".join(map(str, DEFAULT_HIDDEN))})')
+    parser.add_argument('--budget-ms', type=float, default=None,
+                        help='Pick the largest student within this single-pose CPU latency')
+    parser.add_argument('--max-params', type=int, default=None,
+                        help='Pick the largest student with at most this many parameters')
+    parser.add_argument('--temperature', type=float, default=TEMPERATURE)
+    parser.add_argument('--alpha', type=float, default=ALPHA)
+    parser.add_argument('--epochs', type=int, default=100)
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--out', default='student_classifier.h5')
+    parser.add_argument('--tfjs-out', default='public/student_model')
+    parser.add_argument('--report', default='models/distill_report.json')
+    args = parser.parse_args(argv)
+    if args.hidden and (args.budget_ms or args.max_params):
+        parser.error("--hidden cannot be combined with --budget-ms or --max-params")
+
+    print(f"Loading teacher {args.teacher}...")
+    teacher = tf.keras.models.load_model(args.teacher, compile=False)
+
+    # Early stopping and the report use different per-file tails. The v2
+    # teacher was trained on a per-frame hashed split, so it may have seen
+    # neighbours of test frames and its test accuracy can be optimistic.
+    print(f"Loading keypoints from {args.data}...")
+    X, y, classes, splits = load_keypoint_splits(args.data)
+    X_train, y_train = X[splits['train']], y[splits['train']]
+    X_val, y_val = X[splits['validation']], y[splits['validation']]
+    X_test, y_test = X[splits['test']], y[splits['test']]
+    input_dim = X_train.shape[1]
+    if teacher.input_shape[-1] != input_dim or teacher.output_shape[-1] != len(classes):
+        parser.error(f"{args.teacher} expects {teacher.input_shape[-1]} features and "
+                     f"{teacher.output_shape[-1]} classes; {args.data} has {input_dim} and {len(classes)}")
+
+    if args.hidden:
+        hidden = tuple(args.hidden)
+    elif args.budget_ms or args.max_params:
+        hidden = pick_student_size(input_dim, len(classes), args.budget_ms, args.max_params)
+    else:
+        hidden = DEFAULT_HIDDEN
+    print(f"\nDistilling into a {'x'.join(map(str, hidden))} student...")
+
+    targets_train = np.concatenate([y_train[:, None], teacher_logits(teacher, X_train)], axis=1)
+    targets_val = np.concatenate([y_val[:, None], teacher_logits(teacher, X_val)], axis=1)
+    student = create_student(input_dim, len(classes), hidden)
+    trainer = student_logits(student)
+    trainer.compile(optimizer='adam', loss=distillation_loss(args.temperature, args.alpha))
+    trainer.fit(X_train, targets_train, validation_data=(X_val, targets_val),
+                batch_size=args.batch_size, epochs=args.epochs,
+                callbacks=[tf.keras.callbacks.EarlyStopping(monitor='val_loss', patience=10,
+                                                            restore_best_weights=True)])
+
+    student.compile(optimizer='adam', loss='sparse_categorical_crossentropy', metrics=['accuracy'])
+    student.save(args.out)
+    print("\nConverting to TensorFlow.js format...")
+    export_tfjs(student, args.tfjs_out)
+    with open(os.path.join(args.tfjs_out, 'exercise_labels.json'), 'w') as f:
+        json.dump(classes.tolist(), f)
+
+    report = {'teacher_model': args.teacher, 'student_model': args.out,
+              'hidden': list(hidden), 'temperature': args.temperature, 'alpha': args.alpha}
+    report.update(compare(teacher, student, X_test, y_test))
+    os.makedirs(os.path.dirname(args.report) or '.', exist_ok=True)
+    with open(args.report, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"\nTest split ({report['num_samples']} frames):")
+    print(f"{'':10s} {'accuracy':>9s} {'agreement':>10s} {'params':>9s} {'ms/pose':>8s}")
+    for name in ['teacher', 'student']:
+        row = report[name]
+        agreement = f"{row['agreement']:.3f}" if 'agreement' in row else '-'
+        print(f"{name:10s} {row['accuracy']:9.3f} {agreement:>10s} {row['params']:9d} {row['latency_ms']:8.3f}")
+    print(f"\n✅ Student saved as '{args.out}', TensorFlow.js model in '{args.tfjs_out}'")
+    print(f"✅ Report saved to {args.report}")
+
+
+if __name__ == '__main__':
+    main()
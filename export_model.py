@@ -0,0 +1,261 @@
+import os
+import gzip
+import json
+import time
+import argparse
+import numpy as np
+import tensorflow as tf
+from pose_normalization import PoseNormalization  # also registers it for load_model
+
+# Every TF.js export goes through export_tfjs so public/ artifacts do not
+# depend on which script wrote them last
+DEFAULT_QUANTIZATION = 'float16'
+QUANTIZATIONS = ['none', 'float16', 'uint16', 'uint8']
+SHARD_SIZE_BYTES = 1024 * 1024
+
+
+def export_tfjs(model, output_dir, quantization=DEFAULT_QUANTIZATION):
+    """Save a Keras model as TF.js layers artifacts with weight quantization"""
+    import tensorflowjs as tfjs
+
+    os.makedirs(output_dir, exist_ok=True)
+    # Remove old shards, which would otherwise linger if the shard count drops
+    for name in os.listdir(output_dir):
+        if name.startswith('group') and name.endswith('.bin'):
+            os.remove(os.path.join(output_dir, name))
+
+    kwargs = {'weight_shard_size_bytes': SHARD_SIZE_BYTES}
+    if quantization != 'none':
+        kwargs['quantization_dtype_map'] = {quantization: '*'}
+    tfjs.converters.save_keras_model(model, output_dir, **kwargs)
+
+
+def _dense_chain(model):
+    """Layers of a linear model, without the input layer"""
+    layers = [l for l in model.layers if not isinstance(l, tf.keras.layers.InputLayer)]
+    if not isinstance(model, tf.keras.Sequential):
+        for prev, layer in zip(layers, layers[1:]):
+            if layer.input is not prev.output:
+                raise ValueError("Only single-path (Sequential-style) models can be folded")
+    return layers
+
+
+def fold_batchnorm(model):
+    """Return an equivalent inference model with BatchNormalization folded into
+    the following Dense layer and Dropout removed.
+
+    BN(x) = x * g + b, so Dense(BN(x)) = x @ (g[:, None] * W) + (b @ W + c).
+    Works for the Dense/BN/Dropout stacks in this repo in either order; a BN
+    with no Dense after it cannot be folded. A leading PoseNormalization
+    layer is kept as is.
+    """
+    scale, shift = None, None
+    folded = []
+    normalization = None
+    for layer in _dense_chain(model):
+        if isinstance(layer, PoseNormalization) and not folded and scale is None:
+            normalization = PoseNormalization.from_config(layer.get_config())
+            continue
+        if isinstance(layer, tf.keras.layers.Dropout):
+            continue
+        if isinstance(layer, tf.keras.layers.BatchNormalization):
+            gamma, beta, mean, var = [w.astype(np.float64) for w in layer.get_weights()]
+            g = gamma / np.sqrt(var + layer.epsilon)
+            b = beta - mean * g
+            if scale is None:
+                scale, shift = g, b
+            else:
+                scale, shift = scale * g, shift * g + b
+            continue
+        if isinstance(layer, tf.keras.layers.Dense):
+            kernel, bias = [w.astype(np.float64) for w in layer.get_weights()]
+            if scale is not None:
+                bias = shift @ kernel + bias
+                kernel = scale[:, None] * kernel
+                scale, shift = None, None
+            config = layer.get_config()
+            config['use_bias'] = True
+            folded.append((config, [kernel.astype(np.float32), bias.astype(np.float32)]))
+            continue
+        raise ValueError(f"Cannot fold through layer {layer.name} ({type(layer).__name__})")
+    if scale is not None:
+        raise ValueError("Model ends in BatchNormalization; nothing to fold it into")
+
+    inputs = tf.keras.Input(shape=model.input_shape[1:], name='pose_input')
+    x = normalization(inputs) if normalization is not None else inputs
+    dense_layers = []
+    for config, _ in folded:
+        layer = tf.keras.layers.Dense.from_config(config)
+        dense_layers.append(layer)
+        x = layer(x)
+    folded_model = tf.keras.Model(inputs, x, name=f"{model.name}_folded")
+    for layer, (_, weights) in zip(dense_layers, folded):
+        layer.set_weights(weights)
+    return folded_model
+
+
+class _MagnitudeMask(tf.keras.callbacks.Callback):
+    """Zero the smallest-magnitude Dense weights, ramping up to the target
+    sparsity over the epochs and re-applying the mask after every step"""
+
+    def __init__(self, target_sparsity, epochs):
+        super().__init__()
+        self.target_sparsity = target_sparsity
+        self.epochs = epochs
+        self.masks = {}
+
+    def _kernels(self):
+        return [l.kernel for l in self.model.layers if isinstance(l, tf.keras.layers.Dense)]
+
+    def on_epoch_begin(self, epoch, logs=None):
+        sparsity = self.target_sparsity * (epoch + 1) / self.epochs
+        for kernel in self._kernels():
+            values = np.abs(kernel.numpy())
+            threshold = np.quantile(values, sparsity)
+            self.masks[id(kernel)] = (values > threshold).astype(values.dtype)
+        self._apply()
+
+    def on_train_batch_end(self, batch, logs=None):
+        self._apply()
+
+    def _apply(self):
+        for kernel in self._kernels():
+            kernel.assign(kernel.numpy() * self.masks[id(kernel)])
+
+
+def prune_model(model, X, y, sparsity=0.5, epochs=3, batch_size=256, learning_rate=1e-4):
+    """Magnitude-prune the Dense kernels of a model by fine-tuning it on (X, y).
+
+    The model is modified in place. Zeroed weights do not shrink the raw
+    shards, but they compress well over gzip/brotli HTTP transfer.
+    """
+    model.compile(optimizer=tf.keras.optimizers.Adam(learning_rate=learning_rate),
+                  loss='sparse_categorical_crossentropy', metrics=['accuracy'])
+    model.fit(X, y, epochs=epochs, batch_size=batch_size,
+              callbacks=[_MagnitudeMask(sparsity, epochs)], verbose=1)
+    return model
+
+
+def quantize_weights(weights, quantization):
+    """Round-trip weights through the TF.js quantization, to evaluate its effect"""
+    if quantization == 'none':
+        return weights
+    if quantization == 'float16':
+        return [w.astype(np.float16).astype(w.dtype) for w in weights]
+    levels = 255 if quantization == 'uint8' else 65535
+    result = []
+    for w in weights:
+        lo, hi = float(w.min()), float(w.max())
+        scale = (hi - lo) / levels if hi > lo else 1.0
+        result.append((np.round((w - lo) / scale) * scale + lo).astype(w.dtype))
+    return result
+
+
+def quantized_copy(model, quantization):
+    clone = tf.keras.models.clone_model(model)
+    clone.set_weights(quantize_weights(model.get_weights(), quantization))
+    return clone
+
+
+def shard_sizes(output_dir):
+    """(raw bytes, gzip bytes) of the weight shards in a TF.js model directory"""
+    raw, compressed = 0, 0
+    for name in sorted(os.listdir(output_dir)):
+        if name.endswith('.bin'):
+            with open(os.path.join(output_dir, name), 'rb') as f:
+                data = f.read()
+            raw += len(data)
+            compressed += len(gzip.compress(data, compresslevel=6))
+    return raw, compressed
+
+
+def single_pose_latency_ms(model, input_dim, runs=200):
+    """Median CPU latency of one forward pass on a single pose"""
+    x = tf.constant(np.random.rand(1, input_dim).astype(np.float32))
+    forward = tf.function(lambda inputs: model(inputs, training=False))
+    forward(x)
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        tf.nest.map_structure(lambda t: t.numpy(), forward(x))  # multi-output models too
+        times.append(time.perf_counter() - start)
+    return 1000 * float(np.median(times))
+
+
+def top1_agreement(reference, model, X, batch_size=1024):
+    ref = np.argmax(reference.predict(X, batch_size=batch_size, verbose=0), axis=1)
+    out = np.argmax(model.predict(X, batch_size=batch_size, verbose=0), axis=1)
+    return float(np.mean(ref == out))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Export a Keras classifier to TF.js')
+    parser.add_argument('--model', default='exercise_classifier.h5')
+    parser.add_argument('--out', default='public/tfjs_model')
+    parser.add_argument('--quantize', choices=QUANTIZATIONS, default=DEFAULT_QUANTIZATION)
+    parser.add_argument('--fold-bn', action='store_true',
+                        help='Fold BatchNormalization into Dense layers and drop Dropout')
+    parser.add_argument('--prune', type=float, default=0.0,
+                        help='Target fraction of Dense weights to zero by fine-tuning')
+    parser.add_argument('--prune-epochs', type=int, default=3)
+    parser.add_argument('--data', default='training/keypoints',
+                        help='Keypoint directory for pruning and the agreement check')
+    parser.add_argument('--report', default='models/export_report.json')
+    args = parser.parse_args(argv)
+
+    print(f"Loading {args.model}...")
+    reference = tf.keras.models.load_model(args.model, compile=False)
+    input_dim = reference.input_shape[-1]
+
+    X, y = None, None
+    if os.path.isdir(args.data):
+        from keypoint_files import load_keypoint_files
+        X, y, _ = load_keypoint_files(args.data)
+        if X.shape[1] != input_dim:
+            print(f"Skipping {args.data}: {X.shape[1]} features, model expects {input_dim}")
+            X, y = None, None
+
+    model = tf.keras.models.clone_model(reference)
+    model.set_weights(reference.get_weights())
+    if args.prune > 0:
+        if X is None:
+            parser.error("--prune needs keypoint data matching the model (--data)")
+        print(f"\nPruning to {args.prune:.0%} sparsity...")
+        model = prune_model(model, X, y, sparsity=args.prune, epochs=args.prune_epochs)
+    if args.fold_bn:
+        print("\nFolding BatchNormalization into Dense layers...")
+        model = fold_batchnorm(model)
+
+    print(f"\nExporting to {args.out} ({args.quantize})...")
+    export_tfjs(model, args.out, args.quantize)
+
+    raw_bytes, gzip_bytes = shard_sizes(args.out)
+    report = {
+        'model': args.model,
+        'output': args.out,
+        'quantization': args.quantize,
+        'fold_bn': args.fold_bn,
+        'sparsity': args.prune,
+        'shard_bytes': raw_bytes,
+        'shard_gzip_bytes': gzip_bytes,
+        'params': int(model.count_params()),
+        'reference_params': int(reference.count_params()),
+        'latency_ms': single_pose_latency_ms(model, input_dim),
+        'reference_latency_ms': single_pose_latency_ms(reference, input_dim),
+    }
+    if X is not None:
+        report['top1_agreement'] = top1_agreement(reference, quantized_copy(model, args.quantize), X)
+        report['num_samples'] = int(len(X))
+
+    os.makedirs(os.path.dirname(args.report) or '.', exist_ok=True)
+    with open(args.report, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print("\nExport report:")
+    for key, value in report.items():
+        print(f"  {key:22s} {value}")
+    print(f"\n✅ Report saved to {args.report}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+import math
+import time
+import tensorflow as tf
+
+BASE_BATCH_SIZE = 32
+FAST_BATCH_SIZE = 1024
+# Scaled-up learning rates ramp up linearly over this many samples
+WARMUP_SAMPLES = 32000
+
+
+def add_fast_args(parser):
+    """Add the --fast / --batch-size / --precision options to a training script"""
+    parser.add_argument('--fast', action='store_true',
+                        help='Mixed precision, XLA-compiled steps and large batches')
+    parser.add_argument('--batch-size', type=int, default=None,
+                        help=f'Batch size (default {BASE_BATCH_SIZE}, or {FAST_BATCH_SIZE} with --fast)')
+    parser.add_argument('--precision', default='mixed_float16',
+                        choices=['mixed_float16', 'mixed_bfloat16', 'float32'],
+                        help='Policy used with --fast; mixed_bfloat16 suits CPUs with native bf16')
+    return parser
+
+
+def setup_fast_training(args):
+    """Apply the precision policy for --fast and return the batch size to use.
+
+    Must run before any model is built. Output layers are declared with
+    dtype='float32' so the softmax stays in float32 under a mixed policy.
+    """
+    if args.fast and args.precision != 'float32':
+        tf.keras.mixed_precision.set_global_policy(args.precision)
+    if args.batch_size:
+        return args.batch_size
+    return FAST_BATCH_SIZE if args.fast else BASE_BATCH_SIZE
+
+
+def scaled_learning_rate(base_learning_rate, batch_size, base_batch_size=BASE_BATCH_SIZE):
+    """Square-root learning-rate scaling for batch sizes other than the one it
+    was tuned for; linear scaling overshoots with Adam (0.032 at batch 1024)"""
+    return base_learning_rate * math.sqrt(batch_size / base_batch_size)
+
+
+@tf.keras.utils.register_keras_serializable(package='formsense')
+class LinearWarmup(tf.keras.optimizers.schedules.LearningRateSchedule):
+    """Ramp a learning rate (a float or a schedule) up from 1/warmup_steps of
+    its value over the first warmup_steps steps"""
+
+    def __init__(self, learning_rate, warmup_steps):
+        self.learning_rate = learning_rate
+        self.warmup_steps = int(warmup_steps)
+
+    def __call__(self, step):
+        step = tf.cast(step, tf.float32)
+        if isinstance(self.learning_rate, tf.keras.optimizers.schedules.LearningRateSchedule):
+            learning_rate = self.learning_rate(step)
+        else:
+            learning_rate = tf.cast(self.learning_rate, tf.float32)
+        return learning_rate * tf.minimum(1.0, (step + 1) / self.warmup_steps)
+
+    def get_config(self):
+        learning_rate = self.learning_rate
+        if isinstance(learning_rate, tf.keras.optimizers.schedules.LearningRateSchedule):
+            learning_rate = tf.keras.optimizers.schedules.serialize(learning_rate)
+        return {'learning_rate': learning_rate, 'warmup_steps': self.warmup_steps}
+
+    @classmethod
+    def from_config(cls, config):
+        config = dict(config)
+        if isinstance(config['learning_rate'], dict):
+            config['learning_rate'] = tf.keras.optimizers.schedules.deserialize(config['learning_rate'])
+        return cls(**config)
+
+
+def with_warmup(learning_rate, batch_size, base_batch_size=BASE_BATCH_SIZE):
+    """learning_rate wrapped in a LinearWarmup over WARMUP_SAMPLES when the
+    batch size is above the tuned one, else unchanged"""
+    if batch_size <= base_batch_size:
+        return learning_rate
+    return LinearWarmup(learning_rate, warmup_steps=math.ceil(WARMUP_SAMPLES / batch_size))
+
+
+class ThroughputLogger(tf.keras.callbacks.Callback):
+    """Print training time and samples/sec for every epoch and on average"""
+
+    def __init__(self, batch_size):
+        super().__init__()
+        self.batch_size = batch_size
+        self.epoch_times = []
+        self.epoch_samples = []
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._start = time.perf_counter()
+        self._batches = 0
+
+    def on_train_batch_end(self, batch, logs=None):
+        self._batches += 1
+        self._last_batch_end = time.perf_counter()
+
+    def on_epoch_end(self, epoch, logs=None):
+        # Training time only; validation runs after the last batch
+        elapsed = max(self._last_batch_end - self._start, 1e-9) if self._batches else 1e-9
+        # The last batch may be partial, so this slightly overcounts
+        samples = self._batches * self.batch_size
+        self.epoch_times.append(elapsed)
+        self.epoch_samples.append(samples)
+        print(f"\nEpoch {epoch + 1}: {elapsed:.2f}s, {samples / elapsed:,.0f} samples/sec")
+
+    def on_train_end(self, logs=None):
+        if not self.epoch_times:
+            return
+        # Skip the first epoch, which includes tracing/XLA compilation, when possible
+        times = self.epoch_times[1:] or self.epoch_times
+        samples = self.epoch_samples[1:] or self.epoch_samples
+        print(f"Mean epoch time {sum(times) / len(times):.2f}s, "
+              f"{sum(samples) / sum(times):,.0f} samples/sec")
@@ -0,0 +1,82 @@
+import os
+import sys
+import argparse
+import runpy
+
+# One entry point for the data, training and export scripts. Only argparse is
+# imported up front; a subcommand loads its script (and with it TensorFlow,
+# pandas, ...) when it runs, so `formsense labels` does not pay for the
+# TensorFlow import. Everything after the subcommand, including --help, is
+# passed to the script, which runs as __main__ with the repo root on sys.path,
+# as `python -m training.<script>` would, so its worker processes start the
+# same way.
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# name: (help, option choosing the script, {choice: script}, default choice)
+COMMANDS = {
+    'extract': ('Extract keypoints from GIFs and videos', '--backend',
+                {'movenet': 'training/extract_keypoints_v2.py',
+                 'mediapipe': 'training/extract_keypoints.py'}, 'movenet'),
+    'process-mmfit': ('Convert the mm-fit dataset to a pose store', None,
+                      {None: 'process_mmfit.py'}, None),
+    'train': ('Train a classifier', '--pipeline',
+              {'mmfit': 'train_model.py',
+               'keypoints': 'training/train_model.py',
+               'keypoints-v2': 'training/train_model_v2.py',
+               'csv': 'training/exercise_classifier_train.py',
+               'temporal': 'temporal_model.py',
+               'features': 'pose_features.py',
+               'distill': 'distill.py',
+               'multitask': 'multitask_model.py'}, 'keypoints-v2'),
+    'export': ('Export a Keras model to TensorFlow.js', '--target',
+               {'classifier': 'export_model.py'}, 'classifier'),
+    'cascade': ('Calibrate the fast/full classifier cascade', None,
+                {None: 'cascade.py'}, None),
+    'labels': ('Convert exercise_labels.npy to JSON for the browser', None,
+               {None: 'convert_labels.py'}, None),
+    'frames': ('Cache GIF/video frames for extraction and QA', None,
+               {None: 'training/gif_to_frames.py'}, None),
+}
+
+
+def run_script(relative_path, argv):
+    """Run a script by path as __main__ with the given arguments"""
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    # run_path replaces sys.argv[0] with the script path
+    sys.argv = [relative_path] + list(argv)
+    runpy.run_path(os.path.join(ROOT, relative_path), run_name='__main__')
+
+
+def resolve(command, argv):
+    """The script for a subcommand and the arguments left for it"""
+    _, option, scripts, default = COMMANDS[command]
+    if option is None:
+        return scripts[None], argv
+    chooser = argparse.ArgumentParser(add_help=False)
+    chooser.add_argument(option, choices=list(scripts), default=default)
+    chosen, rest = chooser.parse_known_args(argv)
+    return scripts[getattr(chosen, option.lstrip('-').replace('-', '_'))], rest
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    lines = []
+    for name, (help_text, option, scripts, default) in COMMANDS.items():
+        lines.append(f"  {name:15s} {help_text}")
+        if option is not None:
+            lines.append(f"  {'':15s}   {option} {{{','.join(scripts)}}} (default {default})")
+    parser = argparse.ArgumentParser(
+        prog='formsense', description='FormSense AI data, training and export tools',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='commands:\n' + '\n'.join(lines) +
+               '\n\nRun `formsense <command> --help` for the options of a command.')
+    parser.add_argument('command', choices=list(COMMANDS), metavar='command')
+    args = parser.parse_args(argv[:1])
+
+    script, rest = resolve(args.command, argv[1:])
+    run_script(script, rest)
+
+
+if __name__ == '__main__':
+    main()
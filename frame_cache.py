@@ -0,0 +1,168 @@
+import os
+import json
+from functools import partial
+from pathlib import Path
+import numpy as np
+from frame_source import iter_frames, list_media_files
+from preprocess_cache import PreprocessCache
+from worker_pool import imap_safe
+
+# A frame cache holds the decoded frames of each training GIF/video, already
+# resized to the pose model input, as plain .npy arrays that np.load can
+# memory-map:
+#   <file>.npy   uint8 (F, H, W, 3)  letterboxed RGB frames of <file>, e.g. squat.gif.npy
+#   index.json   {'version', 'size', 'stride', 'fps', 'entries': {file: {'file', 'frames'}}}
+# Extraction and QA read frames from it without decoding or JPEG loss.
+FRAME_CACHE_VERSION = 2  # 2: cache files keep the source extension
+DEFAULT_CACHE_DIR = 'training/frame_cache'
+FRAME_SIZE = (256, 256)  # MoveNet Thunder input, see extract_keypoints_v2.IMAGE_SIZE
+_COPY_CHUNK = 64
+
+
+def letterbox(frame, size=FRAME_SIZE):
+    """Resize an RGB uint8 frame to fit `size` (H, W), keeping its aspect
+    ratio, and pad it centered with black as tf.image.resize_with_pad does"""
+    from PIL import Image
+
+    h, w = frame.shape[:2]
+    target_h, target_w = size
+    ratio = max(h / target_h, w / target_w)
+    new_h, new_w = max(1, int(h / ratio)), max(1, int(w / ratio))
+    top, left = (target_h - new_h) // 2, (target_w - new_w) // 2
+    out = np.zeros((target_h, target_w, 3), dtype=np.uint8)
+    resized = Image.fromarray(frame).resize((new_w, new_h), Image.BILINEAR)
+    out[top:top + new_h, left:left + new_w] = np.asarray(resized)
+    return out
+
+
+def frames_path(media_path, cache_dir):
+    # Keep the extension so squat.gif and squat.mp4 get separate files
+    return os.path.join(cache_dir, os.path.basename(media_path) + '.npy')
+
+
+def write_frames(media_path, output_path, size=FRAME_SIZE, stride=1, target_fps=None):
+    """Decode, letterbox and write one file's frames as an (F, H, W, 3) .npy.
+
+    Frames are appended to a raw file as they are decoded, so memory does not
+    grow with the video length, then copied behind a .npy header. Returns F.
+    """
+    raw_path = output_path + '.raw'
+    num_frames = 0
+    try:
+        with open(raw_path, 'wb') as raw:
+            for frame in iter_frames(media_path, stride=stride, target_fps=target_fps):
+                raw.write(letterbox(frame, size).tobytes())
+                num_frames += 1
+        if num_frames == 0:
+            return 0
+        shape = (num_frames, size[0], size[1], 3)
+        frames = np.lib.format.open_memmap(output_path, mode='w+', dtype=np.uint8, shape=shape)
+        source = np.memmap(raw_path, dtype=np.uint8, mode='r', shape=shape)
+        for i in range(0, num_frames, _COPY_CHUNK):
+            frames[i:i + _COPY_CHUNK] = source[i:i + _COPY_CHUNK]
+        frames.flush()
+        del frames, source
+    finally:
+        if os.path.exists(raw_path):
+            os.remove(raw_path)
+    return num_frames
+
+
+class FrameCache:
+    """Read-only view over a frame cache directory"""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        self.cache_dir = Path(cache_dir)
+        with open(self.cache_dir / 'index.json', 'r') as f:
+            index = json.load(f)
+        if index.get('version') != FRAME_CACHE_VERSION:
+            raise ValueError(f"Unsupported frame cache version in {self.cache_dir}: {index.get('version')}")
+        self.size = tuple(index['size'])
+        self.stride = index['stride']
+        self.fps = index['fps']
+        self.entries = index['entries']
+        # The manifest build_frame_cache keeps, to tell whether a source file
+        # changed after its frames were cached
+        self.manifest = PreprocessCache(self.cache_dir / '.manifest.json', version=FRAME_CACHE_VERSION,
+                                        params={'size': list(self.size), 'stride': self.stride,
+                                                'fps': self.fps})
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, media_file):
+        return os.path.basename(media_file) in self.entries
+
+    def is_fresh(self, media_path):
+        """True if the cached frames were decoded from media_path's current contents"""
+        name = os.path.basename(media_path)
+        if name not in self.entries:
+            return False
+        return self.manifest.is_fresh(name, [media_path], [self.cache_dir / self.entries[name]['file']])
+
+    @property
+    def files(self):
+        return sorted(self.entries)
+
+    def frames(self, media_file, mmap_mode='r'):
+        """(F, H, W, 3) uint8 frames of a GIF/video; memory-mapped, not read"""
+        entry = self.entries[os.path.basename(media_file)]
+        return np.load(self.cache_dir / entry['file'], mmap_mode=mmap_mode)
+
+
+def open_frame_cache(cache_dir=DEFAULT_CACHE_DIR):
+    return FrameCache(cache_dir)
+
+
+def frame_cache_exists(cache_dir=DEFAULT_CACHE_DIR):
+    return (Path(cache_dir) / 'index.json').exists()
+
+
+def build_frame_cache(input_dir, cache_dir=DEFAULT_CACHE_DIR, size=FRAME_SIZE, stride=1,
+                      target_fps=None, workers=None):
+    """Fill a frame cache from every GIF/video in input_dir, one process per
+    file in parallel. Files unchanged since the last run are kept; frames of
+    removed files are deleted. Returns the opened FrameCache."""
+    os.makedirs(cache_dir, exist_ok=True)
+    media_files = list_media_files(input_dir)
+    cache = PreprocessCache(os.path.join(cache_dir, '.manifest.json'), version=FRAME_CACHE_VERSION,
+                            params={'size': list(size), 'stride': stride, 'fps': target_fps})
+    cache.prune(media_files)
+    todo = [f for f in media_files
+            if not cache.is_fresh(f, [os.path.join(input_dir, f)], [frames_path(f, cache_dir)])]
+    print(f"Caching frames of {len(todo)} files ({len(media_files) - len(todo)} cached)...")
+
+    for media_file in todo:
+        cache.invalidate(media_file)
+    failed = []
+    try:
+        media_paths = [os.path.join(input_dir, f) for f in todo]
+        worker = partial(_write_worker, cache_dir=cache_dir, size=tuple(size), stride=stride,
+                         target_fps=target_fps)
+        results = imap_safe(worker, media_paths, workers=workers or os.cpu_count(), desc='frames')
+        for media_path, num_frames, error in results:
+            if error is not None:
+                failed.append((media_path, error))
+            elif num_frames:
+                cache.record(os.path.basename(media_path), [media_path],
+                             [frames_path(media_path, cache_dir)])
+    finally:
+        cache.save()
+
+    entries = {}
+    for media_file in media_files:
+        output_path = frames_path(media_file, cache_dir)
+        if media_file in cache.entries and os.path.exists(output_path):
+            frames = np.load(output_path, mmap_mode='r')
+            entries[media_file] = {'file': os.path.basename(output_path), 'frames': len(frames)}
+    with open(os.path.join(cache_dir, 'index.json'), 'w') as f:
+        json.dump({'version': FRAME_CACHE_VERSION, 'size': list(size), 'stride': stride,
+                   'fps': target_fps, 'entries': entries}, f, indent=2)
+
+    for media_path, error in failed:
+        print(f"Error caching {media_path}: {error}")
+    return FrameCache(cache_dir)
+
+
+def _write_worker(media_path, cache_dir, size, stride, target_fps):
+    return write_frames(media_path, frames_path(media_path, cache_dir), size, stride, target_fps)
@@ -0,0 +1,123 @@
+import os
+import argparse
+import numpy as np
+
+# Lazy frame decoding for keypoint extraction. Frames are yielded one at a
+# time as RGB uint8 (H, W, 3) arrays, so a full-length workout video is
+# processed at constant memory. Decoders are imported on first use.
+GIF_EXTENSIONS = ('.gif',)
+VIDEO_EXTENSIONS = ('.mp4', '.webm', '.mov', '.avi', '.mkv', '.m4v')
+MEDIA_EXTENSIONS = GIF_EXTENSIONS + VIDEO_EXTENSIONS
+DEFAULT_GIF_FRAME_MS = 100
+
+
+def is_media_file(filename):
+    return filename.lower().endswith(MEDIA_EXTENSIONS)
+
+
+def _gif_frames(path):
+    """Yield (timestamp ms, decode) for each GIF frame; decode() returns RGB"""
+    from PIL import Image, ImageSequence
+
+    with Image.open(path) as im:
+        t = 0.0
+        for frame in ImageSequence.Iterator(im):
+            yield t, lambda frame=frame: np.asarray(frame.convert('RGB'))
+            t += frame.info.get('duration') or DEFAULT_GIF_FRAME_MS
+
+
+def _video_frames(path):
+    """Yield (timestamp ms, decode) for each video frame.
+
+    Frames are grabbed without being decoded to pixels; decode() retrieves
+    and converts only the frames that are kept.
+    """
+    import cv2
+
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise IOError(f"Cannot open video {path}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    try:
+        index = 0
+        while cap.grab():
+            def decode(index=index):
+                ok, frame = cap.retrieve()
+                if not ok:
+                    raise IOError(f"Cannot decode frame {index} of {path}")
+                return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            yield 1000.0 * index / fps, decode
+            index += 1
+    finally:
+        cap.release()
+
+
+def _stride(value):
+    stride = int(value)
+    if stride < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return stride
+
+
+def _fps(value):
+    fps = float(value)
+    if not fps > 0:
+        raise argparse.ArgumentTypeError(f"must be positive, got {value}")
+    return fps
+
+
+def add_sampling_args(parser):
+    """Add the --stride / --fps frame subsampling options of iter_frames"""
+    parser.add_argument('--stride', type=_stride, default=1, help='Keep every n-th frame')
+    parser.add_argument('--fps', type=_fps, default=None,
+                        help='Subsample frames to at most this rate (for long videos)')
+    return parser
+
+
+def iter_frames(path, stride=1, target_fps=None, max_frames=None):
+    """Yield RGB uint8 frames of a GIF or video as they are decoded.
+
+    `stride` keeps every n-th frame; `target_fps` then drops frames so that
+    kept frames are at least 1/target_fps apart, using the GIF frame
+    durations or the video frame rate. Skipped frames are never converted.
+    """
+    source = _gif_frames if path.lower().endswith(GIF_EXTENSIONS) else _video_frames
+    interval = 1000.0 / target_fps if target_fps else 0.0
+    next_time = 0.0
+    kept = 0
+    for i, (timestamp, decode) in enumerate(source(path)):
+        if i % stride:
+            continue
+        if timestamp + 1e-6 < next_time:
+            continue
+        next_time = timestamp + interval
+        yield decode()
+        kept += 1
+        if max_frames is not None and kept >= max_frames:
+            return
+
+
+def frame_batches(frames, batch_size):
+    """Group a frame iterator into (B, H, W, 3) arrays of up to batch_size frames.
+
+    A batch is cut early if the frame size changes, which cannot happen
+    within one file but keeps np.stack safe for mixed sources. An array of
+    frames (e.g. memory-mapped from a frame cache) is sliced, not copied.
+    """
+    if isinstance(frames, np.ndarray):
+        for start in range(0, len(frames), batch_size):
+            yield frames[start:start + batch_size]
+        return
+    batch = []
+    for frame in frames:
+        if batch and (len(batch) == batch_size or frame.shape != batch[0].shape):
+            yield np.stack(batch)
+            batch = []
+        batch.append(frame)
+    if batch:
+        yield np.stack(batch)
+
+
+def list_media_files(directory):
+    """Sorted GIF and video files in a directory"""
+    return sorted(f for f in os.listdir(directory) if is_media_file(f))
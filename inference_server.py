@@ -0,0 +1,264 @@
+import os
+import json
+import time
+import queue
+import argparse
+import threading
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import tensorflow as tf
+import pose_normalization  # registers PoseNormalization for load_model
+from reference_index import (load_reference_index, build_keypoint_reference_index, DEFAULT_INDEX_DIRS,
+                             DEFAULT_KEYPOINTS_DIR)
+from cascade import load_cascade
+
+DEFAULT_MODEL = 'exercise_classifier.h5'
+DEFAULT_LABELS = 'exercise_labels.npy'
+DEFAULT_PORT = 5001
+MAX_BATCH_SIZE = 64
+MAX_WAIT_MS = 5.0
+# Pose layouts a request may declare. The shipped classifiers take MoveNet
+# keypoints in COCO order, [y, x, score] in normalized image coordinates;
+# mm-fit models take H36M poses, [x, y, z] with the hip at joint 0. Corrections
+# come from the reference index of the request's layout.
+POSE_LAYOUTS = ['movenet', 'h36m']
+DEFAULT_LAYOUT = 'movenet'
+# Normalized image coordinates, with room for joints slightly off-frame
+MOVENET_COORD_RANGE = (-0.5, 1.5)
+
+
+def load_labels(path):
+    """Class names from a .npy (LabelEncoder classes) or .json list"""
+    if not os.path.exists(path):
+        return None
+    if path.endswith('.json'):
+        with open(path, 'r') as f:
+            return [str(l) for l in json.load(f)]
+    return [str(l) for l in np.load(path, allow_pickle=True)]
+
+
+def model_layout(model, default=DEFAULT_LAYOUT):
+    """Input layout of a model from its leading PoseNormalization layer, if any"""
+    for layer in getattr(model, 'layers', []):
+        if isinstance(layer, pose_normalization.PoseNormalization):
+            return 'movenet' if layer.score_channel is not None else 'h36m'
+    return default
+
+
+def check_pose(pose, layout, expected_layout):
+    """Raise ValueError unless a flattened pose is in the layout the model expects"""
+    if layout != expected_layout:
+        raise ValueError(f"Model expects '{expected_layout}' poses, got '{layout}'")
+    joints = np.asarray(pose, dtype=np.float32).reshape(-1, 3)
+    if not np.all(np.isfinite(joints)):
+        raise ValueError("Pose contains non-finite values")
+    if layout == 'movenet':
+        low, high = MOVENET_COORD_RANGE
+        if joints[:, :2].min() < low or joints[:, :2].max() > high:
+            raise ValueError("MoveNet positions must be in normalized image coordinates")
+        if joints[:, 2].min() < 0 or joints[:, 2].max() > 1:
+            raise ValueError("MoveNet scores must be in [0, 1]")
+
+
+class MicroBatcher:
+    """Collect concurrent single-pose requests into one model call.
+
+    A batch is run as soon as `max_batch_size` poses are queued, or
+    `max_wait_ms` after the first pose of the batch arrived, whichever
+    comes first. Only the batcher thread touches the model.
+    """
+
+    def __init__(self, model, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+        self.input_dim = model.input_shape[-1]
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.requests = queue.Queue()
+        self.forward = tf.function(
+            lambda x: model(x, training=False),
+            input_signature=[tf.TensorSpec([None, self.input_dim], tf.float32)]
+        )
+        # Trace once up front so the first request does not pay for it
+        self.forward(tf.zeros([1, self.input_dim]))
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def submit(self, pose):
+        """Queue one flattened pose; returns a Future of (probabilities, stats)"""
+        pose = np.asarray(pose, dtype=np.float32).reshape(-1)
+        if pose.size != self.input_dim:
+            raise ValueError(f"Expected {self.input_dim} values per pose, got {pose.size}")
+        future = Future()
+        self.requests.put((pose, future, time.perf_counter()))
+        return future
+
+    def _next_batch(self):
+        batch = [self.requests.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self.requests.get(timeout=remaining) if remaining > 0
+                             else self.requests.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            start = time.perf_counter()
+            try:
+                probs = self.forward(np.stack([pose for pose, _, _ in batch])).numpy()
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            inference_ms = 1000 * (time.perf_counter() - start)
+            for (_, future, queued), p in zip(batch, probs):
+                future.set_result((p, {
+                    'queue_ms': 1000 * (start - queued),
+                    'inference_ms': inference_ms,
+                    'batch_size': len(batch),
+                }))
+
+
+class InferenceServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default listen backlog of 5 resets bursts of concurrent clients
+    request_queue_size = 128
+
+
+def make_handler(batcher, labels, reference_indexes=None, layout=DEFAULT_LAYOUT):
+    reference_index = (reference_indexes or {}).get(layout)
+
+    class InferenceHandler(BaseHTTPRequestHandler):
+        # HTTP/1.1 keeps connections from the Node proxy open between requests
+        protocol_version = 'HTTP/1.1'
+
+        def _send_json(self, status, body, headers=None):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path != '/health':
+                return self._send_json(404, {'error': 'Not found'})
+            self._send_json(200, {'status': 'ok', 'input_dim': batcher.input_dim,
+                                  'layout': layout, 'labels': labels})
+
+        def do_POST(self):
+            if self.path != '/predict':
+                return self._send_json(404, {'error': 'Not found'})
+            received = time.perf_counter()
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                request = json.loads(self.rfile.read(length) or b'{}')
+                check_pose(request['pose'], request.get('layout'), layout)
+                future = batcher.submit(request['pose'])
+            except (KeyError, ValueError, TypeError) as e:
+                return self._send_json(400, {'error': f'Invalid pose: {e}'})
+
+            try:
+                probs, stats = future.result()
+            except Exception as e:
+                return self._send_json(500, {'error': f'Inference failed: {e}'})
+
+            best = int(np.argmax(probs))
+            body = {
+                'probabilities': probs.tolist(),
+                'exercise': labels[best] if labels else best,
+                'confidence': float(probs[best]),
+            }
+            exercise = request.get('exercise')
+            if labels and exercise in labels:
+                body['exerciseConfidence'] = float(probs[labels.index(exercise)])
+            # check_pose has made sure the request is in the model's, and so the index's, layout
+            if reference_index is not None and exercise in reference_index:
+                match = reference_index.query(exercise, request['pose'])
+                body['referencePose'] = match['reference'][0].tolist()
+                body['jointDeltas'] = match['deltas'][0].tolist()
+                body['referenceDistance'] = float(match['distance'][0])
+            self._send_json(200, body, {
+                'X-Queue-Ms': f"{stats['queue_ms']:.2f}",
+                'X-Inference-Ms': f"{stats['inference_ms']:.2f}",
+                'X-Batch-Size': str(stats['batch_size']),
+                'X-Total-Ms': f"{1000 * (time.perf_counter() - received):.2f}",
+            })
+
+        def log_message(self, format, *args):
+            pass
+
+    return InferenceHandler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Micro-batching pose classification service')
+    parser.add_argument('--model', default=DEFAULT_MODEL,
+                        help='Keras .h5 file or SavedModel directory')
+    parser.add_argument('--layout', choices=POSE_LAYOUTS, default=DEFAULT_LAYOUT,
+                        help='Pose layout of models without a PoseNormalization layer')
+    parser.add_argument('--cascade', default=None,
+                        help='Calibration file from cascade.py; serves its fast/full cascade instead of --model')
+    parser.add_argument('--labels', default=DEFAULT_LABELS)
+    parser.add_argument('--reference-index', nargs='*', default=list(DEFAULT_INDEX_DIRS.values()),
+                        help='Reference-pose indexes from reference_index.py, used for corrections; '
+                             "the one in the model's layout is queried")
+    parser.add_argument('--keypoints', default=DEFAULT_KEYPOINTS_DIR,
+                        help='Keypoint files to index in memory when there is no saved MoveNet index')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--max-batch-size', type=int, default=MAX_BATCH_SIZE)
+    parser.add_argument('--max-wait-ms', type=float, default=MAX_WAIT_MS,
+                        help='How long the first pose of a batch waits for others')
+    args = parser.parse_args(argv)
+
+    if args.cascade:
+        print(f"Loading the cascade in {args.cascade}...")
+        model = load_cascade(args.cascade)
+        name = f"the cascade in {args.cascade}"
+    else:
+        print(f"Loading {args.model}...")
+        model = tf.keras.models.load_model(args.model, compile=False)
+        name = args.model
+    labels = load_labels(args.labels)
+    if labels is None:
+        print(f"⚠️ No labels at {args.labels}; responses will use class indices")
+
+    layout = model_layout(model.fast_model if args.cascade else model, args.layout)
+    reference_indexes = {}
+    for index_dir in args.reference_index:
+        if not os.path.exists(os.path.join(index_dir, 'index.json')):
+            continue
+        try:
+            index = load_reference_index(index_dir)
+        except ValueError as e:
+            print(f"⚠️ Skipping {index_dir}: {e}")
+            continue
+        reference_indexes[index.layout] = index
+        print(f"Loaded {len(index)} {index.layout} reference poses from {index_dir}")
+    if layout == 'movenet' and 'movenet' not in reference_indexes and os.path.isdir(args.keypoints):
+        reference_indexes['movenet'] = build_keypoint_reference_index(args.keypoints)
+        print(f"Indexed {len(reference_indexes['movenet'])} reference poses from {args.keypoints}")
+    if layout not in reference_indexes:
+        print(f"⚠️ No {layout} reference index; corrections will echo the input pose")
+
+    batcher = MicroBatcher(model, args.max_batch_size, args.max_wait_ms)
+    server = InferenceServer((args.host, args.port),
+                             make_handler(batcher, labels, reference_indexes, layout))
+    print(f"✅ Serving {name} on http://{args.host}:{args.port} "
+          f"({layout} poses, batch ≤ {args.max_batch_size}, wait ≤ {args.max_wait_ms}ms)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down")
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,244 @@
+import os
+import sys
+import json
+import time
+import functools
+import threading
+import tracemalloc
+from collections import defaultdict
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Spans, counters and memory snapshots for finding where time goes in
+# extraction and training. Everything is a no-op until enable() is called;
+# a disabled span() returns a shared null context, so instrumented code pays
+# one global lookup and a function call per span.
+_enabled = False
+_trace_memory = False
+_lock = threading.Lock()
+_events = []
+_counters = defaultdict(float)
+# Spans open while tracing memory, in every thread; see _Span
+_memory_spans = []
+_origin_ns = time.perf_counter_ns()
+
+
+def enable(memory=False):
+    """Start recording; `memory` also tracks Python allocations with tracemalloc"""
+    global _enabled, _trace_memory
+    _enabled = True
+    _trace_memory = memory
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def disable():
+    global _enabled
+    _enabled = False
+    if _trace_memory and tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def is_enabled():
+    return _enabled
+
+
+def reset():
+    with _lock:
+        _events.clear()
+        _counters.clear()
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _now_us():
+    return (time.perf_counter_ns() - _origin_ns) / 1000
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def _fold_peak(peak):
+    """Raise the running peak of every open span to `peak`; callers hold _lock"""
+    for open_span in _memory_spans:
+        open_span.mem_peak = max(open_span.mem_peak, peak)
+
+
+class _Span:
+    """A timed block. With memory tracing, each span keeps its own running
+    allocation peak: tracemalloc has a single peak, so before a nested span
+    resets it the peak so far is folded into every open span, and on exit a
+    span folds its peak into the spans still open around it."""
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        if _trace_memory:
+            with _lock:
+                current, peak = tracemalloc.get_traced_memory()
+                _fold_peak(peak)
+                tracemalloc.reset_peak()
+                self.mem_start = self.mem_peak = current
+                _memory_spans.append(self)
+        self.start = _now_us()
+        return self
+
+    def __exit__(self, *exc):
+        end = _now_us()
+        event = {'name': self.name, 'ph': 'X', 'ts': self.start, 'dur': end - self.start,
+                 'pid': os.getpid(), 'tid': threading.get_ident(), 'args': dict(self.args)}
+        event['args']['peak_rss_mb'] = peak_rss_mb()
+        if _trace_memory and self in _memory_spans:
+            with _lock:
+                current, peak = tracemalloc.get_traced_memory()
+                self.mem_peak = max(self.mem_peak, peak)
+                _memory_spans.remove(self)
+                _fold_peak(self.mem_peak)
+            event['args']['alloc_mb'] = (current - self.mem_start) / 1e6
+            event['args']['alloc_peak_mb'] = (self.mem_peak - self.mem_start) / 1e6
+        with _lock:
+            _events.append(event)
+        return False
+
+
+def span(name, **args):
+    """Time a block: `with span('movenet', frames=len(batch)):`"""
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name, args)
+
+
+def traced(name=None):
+    """Decorator form of span(); the span is named after the function by default"""
+    def decorate(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Span(span_name, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def count(name, value=1):
+    """Add to a counter, e.g. count('gifs') or count('frames', len(frames))"""
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] += value
+        _events.append({'name': name, 'ph': 'C', 'ts': _now_us(), 'pid': os.getpid(),
+                        'args': {name: _counters[name]}})
+
+
+def counters():
+    with _lock:
+        return dict(_counters)
+
+
+def write_chrome_trace(path):
+    """Write the recorded events as Chrome trace JSON (chrome://tracing, Perfetto)"""
+    with _lock:
+        events = list(_events)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+
+def summary():
+    """Per-span totals: {name: {'calls', 'total_s', 'mean_ms', 'max_ms', ...}}"""
+    with _lock:
+        spans = [e for e in _events if e['ph'] == 'X']
+    stats = {}
+    for e in spans:
+        s = stats.setdefault(e['name'], {'calls': 0, 'total_s': 0.0, 'max_ms': 0.0,
+                                         'peak_rss_mb': 0.0, 'alloc_peak_mb': None})
+        s['calls'] += 1
+        s['total_s'] += e['dur'] / 1e6
+        s['max_ms'] = max(s['max_ms'], e['dur'] / 1000)
+        s['peak_rss_mb'] = max(s['peak_rss_mb'], e['args'].get('peak_rss_mb') or 0.0)
+        if 'alloc_peak_mb' in e['args']:
+            s['alloc_peak_mb'] = max(s['alloc_peak_mb'] or 0.0, e['args']['alloc_peak_mb'])
+    for s in stats.values():
+        s['mean_ms'] = 1000 * s['total_s'] / s['calls']
+    return stats
+
+
+def print_summary():
+    stats = summary()
+    if not stats:
+        return
+    print(f"\n{'stage':32s} {'calls':>7s} {'total s':>9s} {'mean ms':>9s} "
+          f"{'max ms':>9s} {'peak RSS MB':>12s} {'alloc MB':>9s}")
+    for name, s in sorted(stats.items(), key=lambda item: -item[1]['total_s']):
+        alloc = f"{s['alloc_peak_mb']:9.1f}" if s['alloc_peak_mb'] is not None else f"{'-':>9s}"
+        print(f"{name:32s} {s['calls']:7d} {s['total_s']:9.2f} {s['mean_ms']:9.1f} "
+              f"{s['max_ms']:9.1f} {s['peak_rss_mb']:12.0f} {alloc}")
+    for name, value in sorted(counters().items()):
+        print(f"{name:32s} {value:>7g}")
+
+
+def add_trace_args(parser):
+    """Add the --trace / --trace-memory options to a script"""
+    parser.add_argument('--trace', metavar='PATH', default=None,
+                        help='Record per-stage timings and write a Chrome trace to PATH')
+    parser.add_argument('--trace-memory', action='store_true',
+                        help='Also record Python allocations per stage (slower)')
+    return parser
+
+
+def setup_tracing(args):
+    if args.trace:
+        enable(memory=args.trace_memory)
+
+
+def finish_tracing(args):
+    """Write the trace and print the summary table, if tracing was requested"""
+    if not args.trace:
+        return
+    write_chrome_trace(args.trace)
+    print_summary()
+    print(f"\n✅ Trace saved to {args.trace} (open in chrome://tracing or ui.perfetto.dev)")
+
+
+def keras_callback():
+    """Keras callback recording one span per epoch plus epoch/batch counters"""
+    import tensorflow as tf
+
+    class TraceCallback(tf.keras.callbacks.Callback):
+        def on_epoch_begin(self, epoch, logs=None):
+            self._span = span('epoch', epoch=epoch + 1)
+            self._span.__enter__()
+
+        def on_train_batch_end(self, batch, logs=None):
+            count('train_batches')
+
+        def on_epoch_end(self, epoch, logs=None):
+            if isinstance(self._span, _Span):
+                self._span.args.update({k: float(v) for k, v in (logs or {}).items()})
+            self._span.__exit__(None, None, None)
+            count('epochs')
+
+    return TraceCallback()
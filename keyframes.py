@@ -0,0 +1,110 @@
+import numpy as np
+
+# Cheap pre-inference frame selection. Each frame is reduced to a small
+# grayscale signature; a frame only goes through the pose model when it
+# differs enough from the last frame that did, so static stretches of a loop
+# are inferred sparsely and fast motion densely.
+SIGNATURE_SIZE = 16
+MOTION_THRESHOLD = 0.02
+MAX_GAP = 4
+KEYFRAME_MODES = ['off', 'reuse', 'skip']
+_GRAY = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+
+def frame_signatures(frames, size=SIGNATURE_SIZE):
+    """Block-average (..., H, W, 3) uint8 frames down to (..., size, size)
+    grayscale in [0, 1]"""
+    frames = np.asarray(frames)
+    # Average a grid of about 4x4 pixels per block rather than every pixel
+    step = max(1, min(frames.shape[-3:-1]) // (size * 4))
+    frames = frames[..., ::step, ::step, :]
+    h, w = frames.shape[-3:-1]
+    bh, bw = max(h // size, 1), max(w // size, 1)
+    rows, cols = min(size, h), min(size, w)
+    blocks = frames[..., :rows * bh, :cols * bw, :].reshape(
+        frames.shape[:-3] + (rows, bh, cols, bw, 3))
+    return blocks.mean(axis=(-4, -2), dtype=np.float32) @ _GRAY / 255
+
+
+def motion_scores(frames):
+    """Mean absolute signature change between consecutive (F, H, W, 3) frames"""
+    signatures = frame_signatures(frames)
+    return np.abs(np.diff(signatures, axis=0)).mean(axis=(-2, -1))
+
+
+class KeyframeSampler:
+    """Streaming keyframe selection for one video.
+
+    `filter(frames)` passes through only the frames that need pose inference
+    and records, for every input frame, which keyframe's keypoints it should
+    use (`sources`). A frame is a keyframe when it differs from the previous
+    keyframe by more than the threshold, or after `max_gap` reused frames.
+    Comparing against the last keyframe, rather than the previous frame,
+    keeps slow drift from going unnoticed.
+    """
+
+    def __init__(self, threshold=MOTION_THRESHOLD, max_gap=MAX_GAP):
+        self.threshold = threshold
+        self.max_gap = max_gap
+        self.sources = []
+        self.num_keyframes = 0
+        self._last = None
+        self._gap = 0
+
+    def is_keyframe(self, frame):
+        signature = frame_signatures(frame)
+        key = (self._last is None or self._gap >= self.max_gap
+               or float(np.abs(signature - self._last).mean()) > self.threshold)
+        if key:
+            self._last = signature
+            self._gap = 0
+            self.num_keyframes += 1
+        else:
+            self._gap += 1
+        self.sources.append(self.num_keyframes - 1)
+        return key
+
+    def filter(self, frames):
+        for frame in frames:
+            if self.is_keyframe(frame):
+                yield frame
+
+    def expand(self, keypoints, mode='reuse'):
+        """Keypoints for the frames seen: one row per input frame ('reuse'),
+        or only the keyframes ('skip')"""
+        if mode == 'skip':
+            return keypoints
+        return keypoints[np.asarray(self.sources, dtype=np.int64)]
+
+    @property
+    def num_frames(self):
+        return len(self.sources)
+
+
+def add_keyframe_args(parser):
+    """Add the --keyframes / --motion-threshold / --max-gap options to an extractor"""
+    parser.add_argument('--keyframes', choices=KEYFRAME_MODES, default='off',
+                        help="Only run the pose model on changed frames; 'reuse' copies keypoints "
+                             "to near-duplicate frames, 'skip' drops them from the output")
+    parser.add_argument('--motion-threshold', type=float, default=MOTION_THRESHOLD,
+                        help='Mean grayscale change (0-1) that makes a new keyframe')
+    parser.add_argument('--max-gap', type=int, default=MAX_GAP,
+                        help='Run the pose model at least every n+1 frames')
+    return parser
+
+
+def keyframe_params(args):
+    """Keyframe settings, for the extractor cache parameters; empty when off
+    so existing caches stay valid"""
+    if args.keyframes == 'off':
+        return {}
+    return {'keyframes': args.keyframes, 'motion_threshold': args.motion_threshold,
+            'max_gap': args.max_gap}
+
+
+def make_sampler(params):
+    """A fresh sampler per video from keyframe_params(), or None when
+    keyframe selection is off"""
+    if not params or params['keyframes'] == 'off':
+        return None
+    return KeyframeSampler(threshold=params['motion_threshold'], max_gap=params['max_gap'])
@@ -0,0 +1,135 @@
+import os
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+
+def keypoint_label(filename):
+    """Exercise name of a keypoint file, e.g. 'air bike_keypoints.npy' -> 'air bike'"""
+    return os.path.splitext(filename)[0].split('_keypoints')[0]
+
+
+def list_keypoint_files(keypoints_dir, suffix='_keypoints.npy'):
+    """Return (paths, label ids, class names) for the keypoint files in a directory.
+
+    Class names are sorted, matching LabelEncoder's class order.
+    """
+    files = sorted(f for f in os.listdir(keypoints_dir) if f.endswith(suffix))
+    if not files:
+        raise ValueError(f"No *{suffix} files found in {keypoints_dir}")
+    labels = [keypoint_label(f) for f in files]
+    classes = sorted(set(labels))
+    class_ids = {name: i for i, name in enumerate(classes)}
+    paths = [os.path.join(keypoints_dir, f) for f in files]
+    return paths, np.array([class_ids[l] for l in labels], dtype=np.int32), np.array(classes)
+
+
+def read_keypoints(path):
+    """Read one keypoint file (.npy or headerless .csv) as (F, D) float32.
+
+    CSVs go through pandas' C parser, which is several times faster than
+    np.loadtxt's per-line Python parsing.
+    """
+    path = path.decode() if isinstance(path, bytes) else path
+    if path.endswith('.csv'):
+        import pandas as pd
+        try:
+            frames = pd.read_csv(path, header=None, dtype=np.float32).to_numpy()
+        except pd.errors.EmptyDataError:
+            return np.zeros((0, 0), dtype=np.float32)
+        frames = np.ascontiguousarray(frames)
+    else:
+        frames = np.load(path).astype(np.float32, copy=False)
+    return frames.reshape(len(frames), -1)
+
+
+def keypoint_file_shape(path):
+    """(frames, features) of a keypoint file; .npy files are read from their header only"""
+    if path.endswith('.csv'):
+        with open(path, 'r') as f:
+            first = f.readline()
+            if not first.strip():
+                return 0, 0
+            return 1 + sum(1 for line in f if line.strip()), len(first.split(','))
+    shape = np.load(path, mmap_mode='r').shape
+    return shape[0], int(np.prod(shape[1:]))
+
+
+def keypoint_feature_dim(path):
+    """Feature dimension of a keypoint file"""
+    return keypoint_file_shape(path)[1]
+
+
+def load_keypoint_files(keypoints_dir, suffix='_keypoints.npy', workers=None):
+    """Load every keypoint file in a directory into one (N, D) float32 array.
+
+    File headers are read first so the output is allocated once; files are
+    then copied into their slices in parallel and labels are built with
+    np.repeat. Returns (X, label ids, class names).
+    """
+    paths, label_ids, classes = list_keypoint_files(keypoints_dir, suffix)
+    shapes = [keypoint_file_shape(p) for p in paths]
+    counts = np.array([s[0] for s in shapes], dtype=np.int64)
+    dims = {s[1] for s, n in zip(shapes, counts) if n}
+    if len(dims) > 1:
+        raise ValueError(f"Keypoint files in {keypoints_dir} have mixed feature sizes: {sorted(dims)}")
+    dim = dims.pop() if dims else 0
+
+    offsets = np.concatenate([[0], np.cumsum(counts)])
+    X = np.empty((int(offsets[-1]), dim), dtype=np.float32)
+
+    def fill(i):
+        if not counts[i]:
+            return
+        if paths[i].endswith('.npy'):
+            # Copy straight from the mapped file, no intermediate array
+            frames = np.load(paths[i], mmap_mode='r')
+            X[offsets[i]:offsets[i + 1]] = frames.reshape(len(frames), -1)
+        else:
+            X[offsets[i]:offsets[i + 1]] = read_keypoints(paths[i])
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(fill, range(len(paths))))
+
+    return X, np.repeat(label_ids, counts), classes
+
+
+# Held-out tails of every keypoint file, as fractions of its frames. The tails
+# follow each other at the end of the file in this order, after the training
+# head. Neighbouring frames are near-duplicates, so whole tails are held out
+# rather than hashed frames.
+HELD_OUT_SPLITS = {'validation': 0.15, 'calibration': 0.15, 'test': 0.15}
+
+
+def keypoint_file_bounds(keypoints_dir, suffix='_keypoints.npy'):
+    """(start, end) rows of each file in load_keypoint_files' output"""
+    paths, _, _ = list_keypoint_files(keypoints_dir, suffix)
+    offsets = np.cumsum([0] + [keypoint_file_shape(p)[0] for p in paths])
+    return list(zip(offsets[:-1].tolist(), offsets[1:].tolist()))
+
+
+def tail_split(bounds, fractions):
+    """Split every (start, end) segment into a head and consecutive tails of
+    the given fractions; returns [head indices, tail indices...].
+
+    Each tail gets at least one frame of every segment long enough to leave
+    one in the head too; shorter segments go to the head whole.
+    """
+    parts = [[] for _ in range(len(fractions) + 1)]
+    for start, end in bounds:
+        n = end - start
+        sizes = [max(1, int(round(f * n))) for f in fractions] if n > len(fractions) else []
+        sizes += [0] * (len(fractions) - len(sizes))
+        cut = end - sum(sizes)
+        parts[0].append(np.arange(start, cut))
+        for part, size in zip(parts[1:], sizes):
+            part.append(np.arange(cut, cut + size))
+            cut += size
+    return [np.concatenate(p).astype(np.int64) if p else np.zeros(0, np.int64) for p in parts]
+
+
+def load_keypoint_splits(keypoints_dir, splits=HELD_OUT_SPLITS, suffix='_keypoints.npy'):
+    """load_keypoint_files plus {'train': rows, <split>: rows, ...} holding out
+    the tail of every file"""
+    X, y, classes = load_keypoint_files(keypoints_dir, suffix)
+    parts = tail_split(keypoint_file_bounds(keypoints_dir, suffix), list(splits.values()))
+    return X, y, classes, dict(zip(['train'] + list(splits), parts))
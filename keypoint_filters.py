@@ -0,0 +1,194 @@
+import math
+import numpy as np
+
+# Temporal smoothing of (F, J*3) keypoint sequences whose joints are laid out
+# as [c0, c1, confidence] (MoveNet: y, x, score). Position channels are
+# smoothed; the confidence channel is kept, except by the moving averages.
+#
+# The browser smooths live keypoints in smoothKeypoints() (public/app.js) with
+# an exponential moving average. EMA_ALPHA and EMA_MIN_SCORE mirror it, and
+# ema_filter is the default extraction smoothing so training data sees the
+# same filter as the served model. Keep them in sync with app.js.
+EMA_ALPHA = 0.4        # weight of the previous smoothed value
+EMA_MIN_SCORE = 0.3    # keypoints below this confidence are not smoothed
+MOVING_AVERAGE_WINDOW = 3
+DEFAULT_FPS = 30.0
+SMOOTHING_METHODS = ['ema', 'moving_average', 'confidence', 'one_euro', 'none']
+
+
+def _as_joints(keypoints):
+    keypoints = np.asarray(keypoints)
+    return keypoints.reshape(len(keypoints), -1, 3)
+
+
+def _window_sums(values, window):
+    """Sums over the centered window [i - window//2, i + window//2] of each
+    row, truncated at the ends, and the number of rows in each window"""
+    n = len(values)
+    half = window // 2
+    csum = np.zeros((n + 1,) + values.shape[1:], dtype=np.float64)
+    np.cumsum(values, axis=0, out=csum[1:])
+    idx = np.arange(n)
+    starts = np.maximum(idx - half, 0)
+    ends = np.minimum(idx + half + 1, n)
+    return csum[ends] - csum[starts], (ends - starts).reshape((n,) + (1,) * (values.ndim - 1))
+
+
+def moving_average(keypoints, window=MOVING_AVERAGE_WINDOW):
+    """Centered moving average over every channel, in O(F) with a cumulative
+    sum. Windows are truncated at the sequence ends, as the per-frame
+    np.mean loop it replaces did."""
+    keypoints = np.asarray(keypoints)
+    if len(keypoints) == 0:
+        return keypoints.copy()
+    sums, counts = _window_sums(keypoints, window)
+    return (sums / counts).astype(keypoints.dtype)
+
+
+def confidence_weighted_average(keypoints, window=MOVING_AVERAGE_WINDOW, eps=1e-6):
+    """Moving average of positions weighted by each joint's confidence, so a
+    missed detection does not drag its neighbours; confidence itself gets a
+    plain moving average"""
+    keypoints = np.asarray(keypoints)
+    if len(keypoints) == 0:
+        return keypoints.copy()
+    joints = _as_joints(keypoints).astype(np.float64)
+    weights = np.clip(joints[..., 2:], 0, None)
+    weighted, _ = _window_sums(joints[..., :2] * weights, window)
+    total, _ = _window_sums(weights, window)
+    plain, counts = _window_sums(joints, window)
+    plain /= counts
+
+    smoothed = plain
+    smoothed[..., :2] = np.where(total > eps, weighted / np.maximum(total, eps), plain[..., :2])
+    return smoothed.reshape(keypoints.shape).astype(keypoints.dtype)
+
+
+def _ema_scan(x, reset, alpha):
+    """s[t] = alpha * s[t-1] + (1 - alpha) * x[t], restarting at s[t] = x[t]
+    wherever `reset` is set (and at t = 0), for (F, C) arrays.
+
+    Solved in closed form per block: with r the last reset at or before t,
+    s[t] = alpha^(t-r) x[r] + (1 - alpha) alpha^t sum_{r<k<=t} alpha^-k x[k].
+    Blocks keep alpha^-k within float64 range; the previous block's last
+    value enters as a reset row.
+    """
+    if alpha <= 0:
+        return x.copy()
+    out = np.empty_like(x)
+    block = int(np.clip(250 / max(-math.log10(alpha), 1e-9), 1, 1024))
+    carry = None
+    for start in range(0, len(x), block):
+        xb, rb = x[start:start + block], reset[start:start + block].copy()
+        if carry is None:
+            rb[0] = True
+        else:
+            xb = np.concatenate([carry[None], xb])
+            rb = np.concatenate([np.ones((1,) + rb.shape[1:], bool), rb])
+        k = np.arange(len(xb), dtype=np.float64)[:, None]
+        powers = alpha ** k
+        csum = np.cumsum(xb / powers, axis=0)
+        last_reset = np.maximum.accumulate(np.where(rb, np.arange(len(xb))[:, None], 0), axis=0)
+        cols = np.arange(xb.shape[1])[None, :]
+        sb = (alpha ** (k - last_reset) * xb[last_reset, cols]
+              + (1 - alpha) * powers * (csum - csum[last_reset, cols]))
+        if carry is not None:
+            sb = sb[1:]
+        out[start:start + len(sb)] = sb
+        carry = sb[-1]
+    return out
+
+
+def ema_filter(keypoints, alpha=EMA_ALPHA, min_score=EMA_MIN_SCORE):
+    """The browser's smoothKeypoints over a whole sequence: each position
+    becomes (1 - alpha) * new + alpha * previous smoothed value, except for
+    joints below min_score, which pass through unsmoothed (and restart the
+    average from their raw value)."""
+    keypoints = np.asarray(keypoints)
+    if len(keypoints) == 0:
+        return keypoints.copy()
+    joints = _as_joints(keypoints)
+    smoothed = joints.astype(np.float64)
+    positions = smoothed[..., :2].reshape(len(joints), -1)
+    reset = np.repeat(joints[..., 2] < min_score, 2, axis=1)
+    smoothed[..., :2] = _ema_scan(positions, reset, alpha).reshape(len(joints), -1, 2)
+    return smoothed.reshape(keypoints.shape).astype(keypoints.dtype)
+
+
+def ema_min_cutoff(alpha=EMA_ALPHA, fps=DEFAULT_FPS):
+    """One-Euro min_cutoff (Hz) whose smoothing at rest equals an EMA that
+    keeps `alpha` of the previous value at this frame rate"""
+    # One-Euro weights the new sample by 1 / (1 + fps / (2 pi f_c))
+    return fps * (1 - alpha) / (2 * math.pi * alpha)
+
+
+class OneEuroFilter:
+    """Streaming One-Euro filter (Casiez et al. 2012) over a vector of values.
+
+    Smooths heavily when the signal is slow and less when it moves fast,
+    trading jitter against lag. With beta=0 it is a fixed EMA; the default
+    min_cutoff makes that EMA match the browser's smoothing at `fps`.
+    """
+
+    def __init__(self, fps=DEFAULT_FPS, min_cutoff=None, beta=0.0, d_cutoff=1.0):
+        self.fps = fps
+        self.min_cutoff = ema_min_cutoff(fps=fps) if min_cutoff is None else min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.reset()
+
+    def reset(self):
+        self.x_prev = None
+        self.dx_prev = None
+        self.t_prev = None
+
+    @staticmethod
+    def _alpha(cutoff, dt):
+        return 1.0 / (1.0 + 1.0 / (2 * math.pi * cutoff * dt))
+
+    def __call__(self, x, timestamp=None):
+        """Filter one sample; `timestamp` in seconds, else 1/fps steps are assumed"""
+        x = np.asarray(x, dtype=np.float64)
+        if self.x_prev is None:
+            self.x_prev, self.dx_prev = x.copy(), np.zeros_like(x)
+            self.t_prev = timestamp
+            return x.copy()
+
+        dt = 1.0 / self.fps
+        if timestamp is not None and self.t_prev is not None and timestamp > self.t_prev:
+            dt = timestamp - self.t_prev
+        self.t_prev = timestamp
+
+        a_d = self._alpha(self.d_cutoff, dt)
+        dx = a_d * (x - self.x_prev) / dt + (1 - a_d) * self.dx_prev
+        cutoff = self.min_cutoff + self.beta * np.abs(dx)
+        a = self._alpha(cutoff, dt)
+        self.x_prev = a * x + (1 - a) * self.x_prev
+        self.dx_prev = dx
+        return self.x_prev.copy()
+
+
+def one_euro(keypoints, fps=DEFAULT_FPS, min_cutoff=None, beta=0.0, d_cutoff=1.0):
+    """Apply a OneEuroFilter to the positions of a whole (F, J*3) sequence"""
+    keypoints = np.asarray(keypoints)
+    joints = _as_joints(keypoints)
+    smoothed = joints.astype(np.float64)
+    f = OneEuroFilter(fps, min_cutoff, beta, d_cutoff)
+    for t in range(len(smoothed)):
+        smoothed[t, :, :2] = f(joints[t, :, :2])
+    return smoothed.reshape(keypoints.shape).astype(keypoints.dtype)
+
+
+def smooth_keypoints(keypoints, method='ema', window=MOVING_AVERAGE_WINDOW, fps=DEFAULT_FPS):
+    """Dispatch on one of SMOOTHING_METHODS"""
+    if method == 'ema':
+        return ema_filter(keypoints)
+    if method == 'moving_average':
+        return moving_average(keypoints, window)
+    if method == 'confidence':
+        return confidence_weighted_average(keypoints, window)
+    if method == 'one_euro':
+        return one_euro(keypoints, fps)
+    if method == 'none':
+        return np.array(keypoints, copy=True)
+    raise ValueError(f"Unknown smoothing method: {method}")
@@ -0,0 +1,137 @@
+import os
+import json
+import argparse
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras import layers, models
+from keypoint_files import load_keypoint_files, list_keypoint_files, keypoint_file_shape
+from temporal_model import segment_bounds, window_starts
+from pose_features import joint_angles
+from pose_normalization import PoseNormalization, MOVENET_LAYOUT
+from export_model import export_tfjs, single_pose_latency_ms
+
+# One network for exercise classification and form scoring on MoveNet
+# keypoints: a shared backbone with a softmax head ('exercise') and a
+# form-score head ('form_score', 0 = poor, 1 = matches the demonstration).
+#
+# The keypoint files are demonstrations of correct form and carry no form
+# labels, so the form head learns from perturbed copies of them: limbs are
+# rotated about their joints and the score falls off with the resulting
+# change in joint angles, score = exp(-mean |angle change| / FORM_SCALE_DEGREES).
+# Unperturbed frames score 1.
+FORM_SCALE_DEGREES = 15.0
+MAX_PERTURBATION_DEGREES = 45.0
+FORM_LOSS_WEIGHT = 5.0  # MSE on [0, 1] scores is small next to the cross-entropy
+# (pivot joint, joints rotated about it), proximal segments first
+LIMB_CHAINS = [
+    (5, [7, 9]), (6, [8, 10]),       # upper arms
+    (7, [9]), (8, [10]),             # forearms
+    (11, [13, 15]), (12, [14, 16]),  # thighs
+    (13, [15]), (14, [16]),          # shins
+]
+
+
+def perturb_form(frames, rng, severity=None, max_degrees=MAX_PERTURBATION_DEGREES):
+    """Rotate the limbs of (F, 51) MoveNet keypoints by random angles up to
+    severity * max_degrees (severity (F,) in [0, 1], uniform if None).
+    Only the (y, x) channels move; scores are kept. Returns (F, 51)."""
+    joints = np.array(frames, dtype=np.float32).reshape(len(frames), -1, 3)
+    if severity is None:
+        severity = rng.random(len(joints))
+    for pivot, moving in LIMB_CHAINS:
+        theta = np.radians(severity * max_degrees * rng.uniform(-1, 1, len(joints)))
+        cos, sin = np.cos(theta)[:, None], np.sin(theta)[:, None]
+        center = joints[:, pivot:pivot + 1, :2]
+        offset = joints[:, moving, :2] - center
+        joints[:, moving, 0] = (center[..., 0] + cos * offset[..., 0] - sin * offset[..., 1])
+        joints[:, moving, 1] = (center[..., 1] + sin * offset[..., 0] + cos * offset[..., 1])
+    return joints.reshape(len(frames), -1)
+
+
+def form_scores(frames, reference):
+    """exp(-mean |joint angle change| / FORM_SCALE_DEGREES) of frames against
+    the poses they were derived from"""
+    num_frames = len(frames)
+    change = np.abs(joint_angles(np.reshape(frames, (num_frames, -1, 3)))
+                    - joint_angles(np.reshape(reference, (num_frames, -1, 3))))
+    return np.exp(-np.degrees(change).mean(axis=1) / FORM_SCALE_DEGREES).astype(np.float32)
+
+
+def form_training_data(X, y, rng, copies=1):
+    """The original frames (score 1) plus `copies` perturbed copies of each;
+    returns (frames, label ids, form scores)"""
+    perturbed = [perturb_form(X, rng) for _ in range(copies)]
+    frames = np.concatenate([X] + perturbed)
+    scores = np.concatenate([np.ones(len(X), np.float32)] + [form_scores(p, X) for p in perturbed])
+    return frames, np.tile(y, copies + 1), scores
+
+
+def create_multitask_model(input_dim, num_classes):
+    """Raw keypoints -> PoseNormalization -> shared backbone -> [exercise
+    probabilities, form score]"""
+    pose_input = layers.Input(shape=(input_dim,), name='pose_input')
+    x = PoseNormalization(num_joints=input_dim // 3, **MOVENET_LAYOUT, dtype='float32')(pose_input)
+    x = layers.Dense(256, activation='relu')(x)
+    x = layers.Dropout(0.3)(x)
+    x = layers.Dense(128, activation='relu')(x)
+    x = layers.Dropout(0.2)(x)
+    exercise = layers.Dense(num_classes, activation='softmax', dtype='float32', name='exercise')(x)
+    form_score = layers.Dense(1, activation='sigmoid', dtype='float32', name='form_score')(x)
+    model = models.Model(pose_input, [exercise, form_score])
+    model.compile(optimizer='adam',
+                  loss={'exercise': 'sparse_categorical_crossentropy', 'form_score': 'mse'},
+                  loss_weights={'exercise': 1.0, 'form_score': FORM_LOSS_WEIGHT},
+                  metrics={'exercise': ['accuracy'], 'form_score': ['mae']})
+    return model
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Train the exercise + form-score multi-task model')
+    parser.add_argument('--data', default='training/keypoints', help='MoveNet keypoint directory')
+    parser.add_argument('--copies', type=int, default=1,
+                        help='Perturbed copies of each frame for the form head')
+    parser.add_argument('--epochs', type=int, default=100)
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default='models/multitask_model.h5')
+    parser.add_argument('--tfjs-out', default='public/multitask_model')
+    args = parser.parse_args(argv)
+    rng = np.random.default_rng(args.seed)
+
+    print(f"Loading keypoints from {args.data}...")
+    X, y, classes = load_keypoint_files(args.data)
+    paths, _, _ = list_keypoint_files(args.data)
+    offsets = np.cumsum([0] + [keypoint_file_shape(p)[0] for p in paths])
+    # Hold out the end of every file; neighbouring frames are near-duplicates
+    train_idx, val_idx = window_starts(segment_bounds(y, offsets), window=1, stride=1)
+    X_train, y_train, s_train = form_training_data(X[train_idx], y[train_idx], rng, args.copies)
+    X_val, y_val, s_val = form_training_data(X[val_idx], y[val_idx], rng, args.copies)
+    print(f"{len(X_train)} training / {len(X_val)} validation frames, {len(classes)} classes")
+
+    model = create_multitask_model(X.shape[1], len(classes))
+    model.summary()
+    model.fit(X_train, {'exercise': y_train, 'form_score': s_train},
+              validation_data=(X_val, {'exercise': y_val, 'form_score': s_val}),
+              batch_size=args.batch_size, epochs=args.epochs,
+              callbacks=[tf.keras.callbacks.EarlyStopping(monitor='val_loss', patience=10,
+                                                          restore_best_weights=True)])
+
+    os.makedirs(os.path.dirname(args.out) or '.', exist_ok=True)
+    model.save(args.out)
+    print("\nConverting to TensorFlow.js format...")
+    export_tfjs(model, args.tfjs_out)
+    labels_json = os.path.join(args.tfjs_out, 'exercise_labels.json')
+    with open(labels_json, 'w') as f:
+        json.dump(classes.tolist(), f)
+
+    probs, scores = model.predict(X_val, batch_size=1024, verbose=0)
+    accuracy = float(np.mean(np.argmax(probs, axis=1) == y_val))
+    form_mae = float(np.mean(np.abs(scores[:, 0] - s_val)))
+    print(f"\n✅ Exercise accuracy {accuracy:.3f}, form score MAE {100 * form_mae:.1f} points, "
+          f"{model.count_params()} parameters, {single_pose_latency_ms(model, X.shape[1]):.3f} ms per pose")
+    print(f"✅ Model saved as '{args.out}'")
+    print(f"✅ TensorFlow.js model saved in '{args.tfjs_out}', labels in '{labels_json}'")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+import numpy as np
+
+# Index of each joint's mirror image, for flipping poses left/right
+FLIP_INDEX = {
+    # MoveNet / COCO: nose, eyes, ears, shoulders, elbows, wrists, hips, knees, ankles
+    17: [0, 2, 1, 4, 3, 6, 5, 8, 7, 10, 9, 12, 11, 14, 13, 16, 15],
+    # MediaPipe Pose: nose, eyes (inner, center, outer), ears, mouth, then L/R pairs
+    33: [0, 4, 5, 6, 1, 2, 3, 8, 7, 10, 9] + [i + 1 if i % 2 else i - 1 for i in range(11, 33)],
+}
+
+# The classifiers train on MoveNet keypoints, [y, x, score] per joint in
+# normalized image coordinates
+X_CHANNEL = 1
+NOISE_STD = 0.01
+SCALE_RANGE = (0.95, 1.05)
+MAX_ANGLE = 0.1
+
+
+def flip_index(num_joints):
+    """Mirror table for a skeleton; identity if the layout is unknown"""
+    return FLIP_INDEX.get(num_joints, list(range(num_joints)))
+
+
+def add_noise(poses, rng, std=NOISE_STD):
+    """Gaussian noise on every channel of (B, J, 3) poses"""
+    return poses + rng.normal(0, std, poses.shape).astype(poses.dtype)
+
+
+def pose_centers(poses):
+    """(B, 1, 2) mean position of each of (B, J, 3) poses"""
+    return poses[..., :2].mean(axis=1, keepdims=True)
+
+
+def mirror(poses):
+    """Flip x and swap left/right joints of (B, J, 3) poses"""
+    mirrored = poses[:, flip_index(poses.shape[1])].copy()
+    mirrored[..., X_CHANNEL] = 1 - mirrored[..., X_CHANNEL]
+    return mirrored
+
+
+def scale(poses, rng, scale_range=SCALE_RANGE):
+    """Scale each pose about its center by its own random factor"""
+    factors = rng.uniform(*scale_range, size=(len(poses), 1, 1)).astype(poses.dtype)
+    centers = pose_centers(poses)
+    scaled = poses.copy()
+    scaled[..., :2] = (poses[..., :2] - centers) * factors + centers
+    return scaled
+
+
+def rotate(poses, rng, max_angle=MAX_ANGLE):
+    """Rotate each pose about its center by its own random angle"""
+    angles = rng.uniform(-max_angle, max_angle, size=len(poses))
+    cos_t, sin_t = np.cos(angles), np.sin(angles)
+    rotations = np.stack([np.stack([cos_t, -sin_t], axis=-1),
+                          np.stack([sin_t, cos_t], axis=-1)], axis=1).astype(poses.dtype)
+    centers = pose_centers(poses)
+    rotated = poses.copy()
+    rotated[..., :2] = np.einsum('bij,bkj->bki', rotations, poses[..., :2] - centers) + centers
+    return rotated
+
+
+def augment_data(X, y, rng=None):
+    """Expand (N, J*3) samples into the original plus five augmented copies
+    (noise, mirror, scale, two rotations), without modifying X"""
+    rng = np.random.default_rng() if rng is None else rng
+    poses = np.asarray(X).reshape(len(X), -1, 3)
+    copies = [poses, add_noise(poses, rng), mirror(poses), scale(poses, rng),
+              rotate(poses, rng), rotate(poses, rng)]
+    X_aug = np.concatenate(copies).reshape(len(copies) * len(X), -1)
+    return X_aug, np.tile(np.asarray(y), len(copies))
+
+
+def make_tf_augment(num_joints, noise_std=NOISE_STD, scale_range=SCALE_RANGE,
+                    max_angle=MAX_ANGLE, mirror_prob=0.5):
+    """Build a batched augmentation for tf.data: `dataset.batch(n).map(fn)`.
+
+    Every sample gets noise, a random scale and rotation, and is mirrored
+    with probability `mirror_prob`, so each epoch sees fresh variants.
+    """
+    import tensorflow as tf
+
+    flip = tf.constant(flip_index(num_joints), dtype=tf.int32)
+
+    def augment(x, y):
+        batch = tf.shape(x)[0]
+        poses = tf.reshape(tf.cast(x, tf.float32), [batch, num_joints, 3])
+        poses += tf.random.normal(tf.shape(poses), stddev=noise_std)
+
+        mirrored = tf.gather(poses, flip, axis=1)
+        flipped = 1 - mirrored[..., X_CHANNEL:X_CHANNEL + 1]
+        mirrored = tf.concat([mirrored[..., :X_CHANNEL], flipped, mirrored[..., X_CHANNEL + 1:]], axis=-1)
+        do_mirror = tf.random.uniform([batch, 1, 1]) < mirror_prob
+        poses = tf.where(do_mirror, mirrored, poses)
+
+        factors = tf.random.uniform([batch, 1, 1], *scale_range)
+        angles = tf.random.uniform([batch], -max_angle, max_angle)
+        cos_t, sin_t = tf.cos(angles), tf.sin(angles)
+        rotations = tf.stack([tf.stack([cos_t, -sin_t], axis=-1),
+                              tf.stack([sin_t, cos_t], axis=-1)], axis=1)
+        centers = tf.reduce_mean(poses[..., :2], axis=1, keepdims=True)
+        xy = tf.einsum('bij,bkj->bki', rotations, (poses[..., :2] - centers) * factors) + centers
+        poses = tf.concat([xy, poses[..., 2:]], axis=-1)
+
+        return tf.reshape(poses, [batch, num_joints * 3]), y
+
+    return augment
@@ -0,0 +1,100 @@
+import numpy as np
+import tensorflow as tf
+from pose_store import open_pose_store
+from keypoint_files import list_keypoint_files, read_keypoints, keypoint_feature_dim
+
+AUTOTUNE = tf.data.AUTOTUNE
+
+
+def keypoint_files_dataset(keypoints_dir='training/keypoints', suffix='_keypoints.npy'):
+    """Stream (frame, label id) pairs from per-exercise keypoint files.
+
+    Files are read lazily and interleaved, so only a few are in memory at a
+    time. Returns the dataset and the class names.
+    """
+    paths, label_ids, classes = list_keypoint_files(keypoints_dir, suffix)
+    dim = keypoint_feature_dim(paths[0])
+
+    def load(path, label):
+        frames = tf.numpy_function(read_keypoints, [path], tf.float32)
+        frames = tf.reshape(frames, [-1, dim])
+        labels = tf.fill([tf.shape(frames)[0]], label)
+        return tf.data.Dataset.from_tensor_slices((frames, labels))
+
+    files = tf.data.Dataset.from_tensor_slices((paths, label_ids))
+    dataset = files.interleave(load, cycle_length=4, num_parallel_calls=AUTOTUNE, deterministic=True)
+    return dataset, classes
+
+
+def pose_store_dataset(store_dir='data/processed_mmfit', chunk_size=4096):
+    """Stream flattened (51,) poses and label ids from a memory-mapped pose store"""
+    store = open_pose_store(store_dir)
+    dim = int(np.prod(store.poses.shape[1:]))
+
+    def chunks():
+        for start in range(0, len(store), chunk_size):
+            end = start + chunk_size
+            yield (np.asarray(store.poses[start:end], dtype=np.float32).reshape(-1, dim),
+                   np.asarray(store.labels[start:end], dtype=np.int32))
+
+    dataset = tf.data.Dataset.from_generator(
+        chunks,
+        output_signature=(tf.TensorSpec([None, dim], tf.float32), tf.TensorSpec([None], tf.int32))
+    ).unbatch()
+    return dataset, np.array(store.exercises)
+
+
+def split_dataset(dataset, validation_split=0.2):
+    """Deterministically split a dataset into (train, validation) by element index.
+
+    The split is a hash of each element's position, so it is stable across
+    epochs and runs as long as the source order is.
+    """
+    threshold = int(validation_split * (1 << 32))
+
+    def is_val(i, element):
+        return tf.math.floormod(i * 2654435761, 1 << 32) < threshold
+
+    def is_train(i, element):
+        return tf.logical_not(is_val(i, element))
+
+    def drop_index(i, element):
+        return element
+
+    indexed = dataset.enumerate()
+    train = indexed.filter(is_train).map(drop_index)
+    val = indexed.filter(is_val).map(drop_index)
+    return train, val
+
+
+def make_pipeline(dataset, batch_size=32, shuffle_buffer=None, cache=False,
+                  map_fn=None, augment=None):
+    """Apply per-element preprocessing, cache, shuffle, batch, batch augmentation
+    and prefetch, in that order.
+
+    `cache` may be True (in memory) or a file path (on disk) for datasets that
+    do not fit in RAM. `augment` runs on whole batches.
+    """
+    if map_fn is not None:
+        dataset = dataset.map(map_fn, num_parallel_calls=AUTOTUNE)
+    if cache:
+        dataset = dataset.cache(cache if isinstance(cache, str) else '')
+    if shuffle_buffer:
+        dataset = dataset.shuffle(shuffle_buffer, reshuffle_each_iteration=True)
+    dataset = dataset.batch(batch_size)
+    if augment is not None:
+        dataset = dataset.map(augment, num_parallel_calls=AUTOTUNE)
+    return dataset.prefetch(AUTOTUNE)
+
+
+def train_val_datasets(dataset, validation_split=0.2, batch_size=32, shuffle_buffer=10000,
+                       cache=False, map_fn=None, augment=None):
+    """Split a (frame, label id) dataset and build the training and validation pipelines.
+
+    Augmentation and shuffling only apply to the training split.
+    """
+    train, val = split_dataset(dataset, validation_split)
+    val_cache = cache + '.val' if isinstance(cache, str) else cache
+    train = make_pipeline(train, batch_size, shuffle_buffer, cache, map_fn, augment)
+    val = make_pipeline(val, batch_size, None, val_cache, map_fn)
+    return train, val
@@ -0,0 +1,219 @@
+import os
+import json
+import argparse
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras import layers, models
+from keypoint_files import load_keypoint_files, list_keypoint_files, keypoint_file_shape
+from temporal_model import segment_bounds, window_starts
+from pose_normalization import MIN_SCORE
+from export_model import export_tfjs, single_pose_latency_ms
+
+# Joint angles, bone-length ratios and angular velocities of MoveNet/COCO
+# keypoints, computed for a whole batch at once. Positions are the first two
+# channels of each joint (MoveNet: y, x); angles are 2D like calculateAngle in
+# public/app.js. Joints scoring below MIN_SCORE, as PoseNormalization drops
+# them, are unreliable: every feature that uses one is 0.
+NUM_JOINTS = 17
+# (a, b, c): the angle at joint b between the segments to a and c
+ANGLES = [
+    (5, 7, 9), (6, 8, 10),      # elbows
+    (7, 5, 11), (8, 6, 12),     # shoulders
+    (5, 11, 13), (6, 12, 14),   # hips
+    (11, 13, 15), (12, 14, 16), # knees
+]
+BONES = [
+    (5, 7), (6, 8), (7, 9), (8, 10),         # upper arms, forearms
+    (11, 13), (12, 14), (13, 15), (14, 16),  # thighs, shins
+    (5, 6), (11, 12),                        # shoulder and hip width
+]
+# Bone lengths are divided by the mean of the two shoulder-to-hip lengths
+TORSO = [(5, 11), (6, 12)]
+NUM_FEATURES = 2 * len(ANGLES) + len(BONES)
+EPSILON = 1e-6
+
+_A, _B, _C = (np.array(idx) for idx in zip(*ANGLES))
+_BONE_START, _BONE_END = (np.array(idx) for idx in zip(*BONES))
+_TORSO_START, _TORSO_END = (np.array(idx) for idx in zip(*TORSO))
+
+
+def joint_angles(joints):
+    """(..., 17, C) keypoints -> (..., len(ANGLES)) angles in radians"""
+    positions = np.asarray(joints, dtype=np.float32)[..., :2]
+    v1 = positions[..., _A, :] - positions[..., _B, :]
+    v2 = positions[..., _C, :] - positions[..., _B, :]
+    cos = np.sum(v1 * v2, axis=-1) / (np.linalg.norm(v1, axis=-1) * np.linalg.norm(v2, axis=-1) + EPSILON)
+    return np.arccos(np.clip(cos, -1, 1))
+
+
+def reliable_joints(joints, min_score=MIN_SCORE):
+    """(..., 17, 3) keypoints -> (..., 17) bool, score at least min_score;
+    all True for keypoints without a score channel"""
+    joints = np.asarray(joints, dtype=np.float32)
+    if joints.shape[-1] < 3:
+        return np.ones(joints.shape[:-1], dtype=bool)
+    return joints[..., 2] >= min_score
+
+
+def bone_ratios(joints, reliable=None):
+    """(..., 17, C) keypoints -> (..., len(BONES)) bone lengths over torso
+    length, the mean of the shoulder-to-hip segments. Given (..., 17) bool
+    `reliable`, bones with an unreliable end are 0 and the torso length
+    uses the reliable segments only."""
+    positions = np.asarray(joints, dtype=np.float32)[..., :2]
+    if reliable is None:
+        reliable = np.ones(positions.shape[:-1], dtype=bool)
+    bones = np.linalg.norm(positions[..., _BONE_END, :] - positions[..., _BONE_START, :], axis=-1)
+    torso = np.linalg.norm(positions[..., _TORSO_END, :] - positions[..., _TORSO_START, :], axis=-1)
+    torso_ok = reliable[..., _TORSO_START] & reliable[..., _TORSO_END]
+    torso_count = torso_ok.sum(axis=-1, keepdims=True)
+    torso = (torso * torso_ok).sum(axis=-1, keepdims=True) / np.maximum(torso_count, 1)
+    bone_ok = reliable[..., _BONE_START] & reliable[..., _BONE_END] & (torso_count > 0)
+    return bones / (torso + EPSILON) * bone_ok
+
+
+def pose_features(frames, previous=None, min_score=MIN_SCORE):
+    """Features of (F, 51) or (F, 17, 3) keypoints in one vectorized pass:
+    angles / pi, angular velocities (radians per frame) and bone ratios.
+
+    Velocities are taken against `previous` frames of the same shape if
+    given, else against the preceding frame of the sequence (0 for the
+    first frame). Features involving a joint scored below min_score, in
+    either frame for velocities, are 0. Returns (F, NUM_FEATURES) float32.
+    """
+    joints = np.asarray(frames, dtype=np.float32).reshape(len(frames), NUM_JOINTS, -1)
+    reliable = reliable_joints(joints, min_score)
+    angle_ok = reliable[:, _A] & reliable[:, _B] & reliable[:, _C]
+    angles = joint_angles(joints) * angle_ok
+    if previous is None:
+        prev_angles = np.concatenate([angles[:1], angles[:-1]])
+        prev_ok = np.concatenate([angle_ok[:1], angle_ok[:-1]])
+    else:
+        prev_joints = np.asarray(previous, dtype=np.float32).reshape(joints.shape)
+        prev_reliable = reliable_joints(prev_joints, min_score)
+        prev_ok = prev_reliable[:, _A] & prev_reliable[:, _B] & prev_reliable[:, _C]
+        prev_angles = joint_angles(prev_joints)
+    velocities = (angles - prev_angles) * (angle_ok & prev_ok)
+    features = [angles / np.pi, velocities, bone_ratios(joints, reliable)]
+    return np.concatenate(features, axis=-1).astype(np.float32)
+
+
+def frame_pairs(frames, bounds):
+    """(N, D) frames -> (N, 2D) rows of [previous frame, frame]; the first
+    frame of each segment is paired with itself"""
+    previous = np.arange(len(frames)) - 1
+    starts = np.array([start for start, _ in bounds], dtype=np.int64)
+    previous[starts] = starts
+    return np.concatenate([frames[previous], frames], axis=1)
+
+
+@tf.keras.utils.register_keras_serializable(package='formsense')
+class PoseFeatures(tf.keras.layers.Layer):
+    """pose_features() as a layer over (B, 2 * 51) rows of [previous frame,
+    frame], so models take raw keypoints"""
+
+    def __init__(self, num_joints=NUM_JOINTS, min_score=MIN_SCORE, epsilon=EPSILON, **kwargs):
+        super().__init__(**kwargs)
+        self.num_joints = num_joints
+        self.min_score = min_score
+        self.epsilon = epsilon
+
+    def _angles(self, positions):
+        v1 = tf.gather(positions, _A, axis=1) - tf.gather(positions, _B, axis=1)
+        v2 = tf.gather(positions, _C, axis=1) - tf.gather(positions, _B, axis=1)
+        cos = tf.reduce_sum(v1 * v2, axis=-1) / (tf.norm(v1, axis=-1) * tf.norm(v2, axis=-1) + self.epsilon)
+        return tf.acos(tf.clip_by_value(cos, -1.0, 1.0))
+
+    def _angle_mask(self, reliable):
+        return (tf.gather(reliable, _A, axis=1) * tf.gather(reliable, _B, axis=1)
+                * tf.gather(reliable, _C, axis=1))
+
+    def call(self, inputs):
+        joints = tf.reshape(inputs, [-1, 2, self.num_joints, 3])
+        reliable = tf.cast(joints[..., 2] >= self.min_score, joints.dtype)
+        positions = joints[..., :2]
+        previous, current = positions[:, 0], positions[:, 1]
+        prev_ok, angle_ok = self._angle_mask(reliable[:, 0]), self._angle_mask(reliable[:, 1])
+        angles = self._angles(current) * angle_ok
+        velocities = (angles - self._angles(previous)) * angle_ok * prev_ok
+        bones = tf.norm(tf.gather(current, _BONE_END, axis=1) - tf.gather(current, _BONE_START, axis=1), axis=-1)
+        torso = tf.norm(tf.gather(current, _TORSO_END, axis=1) - tf.gather(current, _TORSO_START, axis=1), axis=-1)
+        torso_ok = tf.gather(reliable[:, 1], _TORSO_START, axis=1) * tf.gather(reliable[:, 1], _TORSO_END, axis=1)
+        torso_count = tf.reduce_sum(torso_ok, axis=-1, keepdims=True)
+        torso = tf.reduce_sum(torso * torso_ok, axis=-1, keepdims=True) / tf.maximum(torso_count, 1.0)
+        bone_ok = (tf.gather(reliable[:, 1], _BONE_START, axis=1) * tf.gather(reliable[:, 1], _BONE_END, axis=1)
+                   * tf.cast(torso_count > 0, joints.dtype))
+        ratios = bones / (torso + self.epsilon) * bone_ok
+        return tf.concat([angles / np.pi, velocities, ratios], axis=-1)
+
+    def compute_output_shape(self, input_shape):
+        return (input_shape[0], NUM_FEATURES)
+
+    def get_config(self):
+        config = super().get_config()
+        config.update({'num_joints': self.num_joints, 'min_score': self.min_score,
+                       'epsilon': self.epsilon})
+        return config
+
+
+def create_feature_model(num_classes, hidden=32):
+    """Small classifier on PoseFeatures of [previous frame, frame] rows"""
+    pose_input = layers.Input(shape=(2 * NUM_JOINTS * 3,), name='pose_pair_input')
+    x = PoseFeatures(dtype='float32', name='pose_features')(pose_input)
+    x = layers.Dense(hidden, activation='relu')(x)
+    output = layers.Dense(num_classes, activation='softmax', dtype='float32', name='exercise_output')(x)
+    model = models.Model(pose_input, output)
+    model.compile(optimizer='adam', loss='sparse_categorical_crossentropy', metrics=['accuracy'])
+    return model
+
+
+def load_pairs(keypoints_dir):
+    """[previous frame, frame] rows of every keypoint file, labels, classes
+    and per-file bounds"""
+    frames, labels, classes = load_keypoint_files(keypoints_dir)
+    paths, _, _ = list_keypoint_files(keypoints_dir)
+    offsets = np.cumsum([0] + [keypoint_file_shape(p)[0] for p in paths])
+    bounds = segment_bounds(labels, offsets)
+    return frame_pairs(frames, bounds), labels, classes, bounds
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Train the compact joint-angle exercise classifier')
+    parser.add_argument('--data', default='training/keypoints', help='MoveNet keypoint directory')
+    parser.add_argument('--hidden', type=int, default=32)
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--epochs', type=int, default=100)
+    parser.add_argument('--out', default='feature_classifier.h5')
+    parser.add_argument('--tfjs-out', default='public/feature_model')
+    args = parser.parse_args(argv)
+
+    print(f"Loading keypoints from {args.data}...")
+    X, y, classes, bounds = load_pairs(args.data)
+    # Hold out the end of every file; neighbouring frames are near-duplicates
+    train_idx, val_idx = window_starts(bounds, window=1, stride=1)
+    print(f"{len(X)} frames, {len(classes)} classes, {len(train_idx)} training / {len(val_idx)} validation")
+
+    model = create_feature_model(len(classes), args.hidden)
+    model.summary()
+    model.fit(X[train_idx], y[train_idx], validation_data=(X[val_idx], y[val_idx]),
+              batch_size=args.batch_size, epochs=args.epochs,
+              callbacks=[tf.keras.callbacks.EarlyStopping(monitor='val_accuracy', patience=10,
+                                                          restore_best_weights=True)])
+    model.save(args.out)
+
+    labels_path = os.path.splitext(args.out)[0] + '_labels.json'
+    with open(labels_path, 'w') as f:
+        json.dump(classes.tolist(), f)
+
+    print("\nConverting to TensorFlow.js format...")
+    export_tfjs(model, args.tfjs_out)
+
+    _, accuracy = model.evaluate(X[val_idx], y[val_idx], verbose=0)
+    print(f"\n✅ Validation accuracy {accuracy:.3f}, {model.count_params()} parameters, "
+          f"{single_pose_latency_ms(model, X.shape[1]):.3f} ms per pose")
+    print(f"✅ Model saved as '{args.out}', labels in '{labels_path}'")
+    print(f"✅ TensorFlow.js model saved in '{args.tfjs_out}'")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+import numpy as np
+import tensorflow as tf
+
+# Pose normalization as the first layer of the classifiers, so the exact same
+# centering, scaling and masking runs in training, in the inference server and
+# in the browser (public/app.js registers a TF.js twin of the layer). The
+# parameters are part of the layer config and are saved with the model.
+#
+# Layouts of the flattened (B, J*3) inputs:
+#   mm-fit / H36M 3D poses: joints [x, y, z], hip is joint 0
+#   MoveNet keypoints:      joints [y, x, score], hips are joints 11 and 12
+H36M_LAYOUT = {'center_joints': [0], 'score_channel': None}
+MOVENET_LAYOUT = {'center_joints': [11, 12], 'score_channel': 2}
+MIN_SCORE = 0.3  # same cutoff as the browser's keypoint smoothing
+EPSILON = 1e-6
+
+
+@tf.keras.utils.register_keras_serializable(package='formsense')
+class PoseNormalization(tf.keras.layers.Layer):
+    """Center each pose on its hip, scale it to unit radius and zero joints
+    whose confidence is below min_score.
+
+    The radius is the largest distance of a kept joint from the center, so
+    every pose is normalized on its own, as in reference_index. The
+    confidence channel, if any, is passed through unchanged.
+    """
+
+    def __init__(self, num_joints=17, center_joints=(0,), score_channel=None,
+                 min_score=MIN_SCORE, epsilon=EPSILON, **kwargs):
+        super().__init__(**kwargs)
+        self.num_joints = num_joints
+        self.center_joints = list(center_joints)
+        self.score_channel = score_channel
+        self.min_score = min_score
+        self.epsilon = epsilon
+        coord_mask = np.ones((1, 1, 3), dtype=np.float32)
+        if score_channel is not None:
+            coord_mask[..., score_channel] = 0
+        self._coord_mask = coord_mask
+
+    def call(self, inputs):
+        joints = tf.reshape(inputs, [-1, self.num_joints, 3])
+        coord_mask = tf.constant(self._coord_mask, dtype=joints.dtype)
+        centers = tf.reduce_mean(tf.gather(joints, self.center_joints, axis=1), axis=1, keepdims=True)
+        centered = (joints - centers) * coord_mask
+        if self.score_channel is not None:
+            scores = joints[..., self.score_channel:self.score_channel + 1]
+            centered = centered * tf.cast(scores >= self.min_score, joints.dtype)
+        radius = tf.reduce_max(tf.norm(centered, axis=-1, keepdims=True), axis=1, keepdims=True)
+        normalized = centered / tf.maximum(radius, self.epsilon)
+        if self.score_channel is not None:
+            normalized = normalized + joints * (1 - coord_mask)
+        return tf.reshape(normalized, [-1, self.num_joints * 3])
+
+    def compute_output_shape(self, input_shape):
+        return input_shape
+
+    def get_config(self):
+        config = super().get_config()
+        config.update({'num_joints': self.num_joints, 'center_joints': self.center_joints,
+                       'score_channel': self.score_channel, 'min_score': self.min_score,
+                       'epsilon': self.epsilon})
+        return config
+
+
+def normalize_pose_array(poses, center_joints=(0,), score_channel=None, min_score=MIN_SCORE,
+                         epsilon=EPSILON):
+    """NumPy version of PoseNormalization for (N, J*3) or (N, J, 3) poses;
+    returns the same shape"""
+    poses = np.asarray(poses, dtype=np.float32)
+    joints = poses.reshape(len(poses), -1, 3)
+    coord_mask = np.ones(3, dtype=np.float32)
+    if score_channel is not None:
+        coord_mask[score_channel] = 0
+    centers = joints[:, list(center_joints)].mean(axis=1, keepdims=True)
+    centered = (joints - centers) * coord_mask
+    if score_channel is not None:
+        centered *= joints[..., score_channel:score_channel + 1] >= min_score
+    radius = np.sqrt(np.sum(centered**2, axis=-1)).max(axis=1)[:, None, None]
+    normalized = centered / np.maximum(radius, epsilon) + joints * (1 - coord_mask)
+    return normalized.reshape(poses.shape)
@@ -0,0 +1,201 @@
+import os
+import json
+import argparse
+import numpy as np
+from pathlib import Path
+
+# A pose store is a directory of plain .npy arrays so every column can be
+# opened with np.load(mmap_mode='r'):
+#   poses.npy    float32 (N, 17, 3)
+#   labels.npy   int16   (N,)      index into index.json['exercises']
+#   correct.npy  bool    (N,)
+#   offsets.npy  int64   (W + 1,)  frames of workout i are offsets[i]:offsets[i+1]
+#   index.json   {'version', 'exercises', 'workouts'}
+POSE_STORE_VERSION = 1
+DEFAULT_STORE_DIR = 'data/processed_mmfit'
+NUM_JOINTS = 17
+
+
+class PoseStore:
+    """Read-only view over a pose store directory"""
+
+    def __init__(self, store_dir, mmap_mode='r'):
+        self.store_dir = Path(store_dir)
+        with open(self.store_dir / 'index.json', 'r') as f:
+            index = json.load(f)
+        if index.get('version') != POSE_STORE_VERSION:
+            raise ValueError(f"Unsupported pose store version in {self.store_dir}: {index.get('version')}")
+
+        self.exercises = index['exercises']
+        self.workouts = index['workouts']
+        self.poses = np.load(self.store_dir / 'poses.npy', mmap_mode=mmap_mode)
+        self.labels = np.load(self.store_dir / 'labels.npy', mmap_mode=mmap_mode)
+        self.correct = np.load(self.store_dir / 'correct.npy', mmap_mode=mmap_mode)
+        self.offsets = np.load(self.store_dir / 'offsets.npy')
+
+    def __len__(self):
+        return len(self.poses)
+
+    def workout_slice(self, workout):
+        """Return the frame slice belonging to a workout"""
+        i = self.workouts.index(workout)
+        return slice(int(self.offsets[i]), int(self.offsets[i + 1]))
+
+    def segments(self, workout):
+        """Yield (exercise, poses, correct) for each run of frames in a workout"""
+        frames = self.workout_slice(workout)
+        labels = np.asarray(self.labels[frames])
+        correct = np.asarray(self.correct[frames])
+        changes = np.flatnonzero((labels[1:] != labels[:-1]) | (correct[1:] != correct[:-1])) + 1
+        bounds = [0] + changes.tolist() + [len(labels)]
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            if end > start:
+                yield (self.exercises[labels[start]],
+                       self.poses[frames.start + start:frames.start + end],
+                       bool(correct[start]))
+
+
+def open_pose_store(store_dir=DEFAULT_STORE_DIR, mmap_mode='r'):
+    """Open a pose store; the arrays are memory-mapped, not read"""
+    return PoseStore(store_dir, mmap_mode=mmap_mode)
+
+
+def pose_store_exists(store_dir=DEFAULT_STORE_DIR):
+    return (Path(store_dir) / 'index.json').exists()
+
+
+class PoseStoreWriter:
+    """Stream pose segments into a pose store.
+
+    Poses are appended to a raw float32 file as they arrive, so only the
+    per-segment run lengths are kept in memory. Segments of one workout must
+    be appended contiguously.
+    """
+
+    def __init__(self, store_dir=DEFAULT_STORE_DIR):
+        self.store_dir = Path(store_dir)
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        self._raw_path = self.store_dir / 'poses.raw'
+        self._raw = open(self._raw_path, 'wb')
+        self._exercise_codes = {}
+        self._runs = []  # (exercise code, correct, num frames)
+        self._workouts = []
+        self._offsets = []
+        self.num_frames = 0
+
+    def append(self, workout, exercise, poses, correct=True):
+        """Append the (F, 17, 3) frames of one exercise segment"""
+        poses = np.ascontiguousarray(poses, dtype=np.float32)
+        if poses.ndim != 3 or poses.shape[1:] != (NUM_JOINTS, 3):
+            raise ValueError(f"Expected poses of shape (F, {NUM_JOINTS}, 3), got {poses.shape}")
+
+        if not self._workouts or self._workouts[-1] != workout:
+            if workout in self._workouts:
+                raise ValueError(f"Workout {workout} was already written")
+            self._workouts.append(workout)
+            self._offsets.append(self.num_frames)
+
+        if len(poses) == 0:
+            return
+        code = self._exercise_codes.setdefault(exercise, len(self._exercise_codes))
+        self._raw.write(poses.tobytes())
+        self._runs.append((code, bool(correct), len(poses)))
+        self.num_frames += len(poses)
+
+    def close(self):
+        """Write the final .npy columns and the index"""
+        if self._raw.closed:
+            return
+        self._raw.close()
+
+        # Sort exercise names so codes match the alphabetical class order
+        # used for training
+        exercises = sorted(self._exercise_codes)
+        remap = np.zeros(len(exercises), dtype=np.int16)
+        for code_new, name in enumerate(exercises):
+            remap[self._exercise_codes[name]] = code_new
+
+        run_codes = np.array([r[0] for r in self._runs], dtype=np.int64)
+        run_correct = np.array([r[1] for r in self._runs], dtype=bool)
+        run_lengths = np.array([r[2] for r in self._runs], dtype=np.int64)
+        labels = np.repeat(remap[run_codes], run_lengths).astype(np.int16)
+        correct = np.repeat(run_correct, run_lengths)
+
+        # Copy the raw frames behind a .npy header in chunks
+        n = self.num_frames
+        if n:
+            poses = np.lib.format.open_memmap(
+                self.store_dir / 'poses.npy', mode='w+', dtype=np.float32, shape=(n, NUM_JOINTS, 3)
+            )
+            raw = np.memmap(self._raw_path, dtype=np.float32, mode='r', shape=(n, NUM_JOINTS, 3))
+            chunk = 1 << 16
+            for i in range(0, n, chunk):
+                poses[i:i + chunk] = raw[i:i + chunk]
+            poses.flush()
+            del raw, poses
+        else:
+            np.save(self.store_dir / 'poses.npy', np.zeros((0, NUM_JOINTS, 3), dtype=np.float32))
+        os.remove(self._raw_path)
+
+        np.save(self.store_dir / 'labels.npy', labels)
+        np.save(self.store_dir / 'correct.npy', correct)
+        np.save(self.store_dir / 'offsets.npy', np.array(self._offsets + [n], dtype=np.int64))
+        with open(self.store_dir / 'index.json', 'w') as f:
+            json.dump({
+                'version': POSE_STORE_VERSION,
+                'exercises': exercises,
+                'workouts': self._workouts,
+            }, f, indent=2)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._raw.close()
+            if self._raw_path.exists():
+                os.remove(self._raw_path)
+        return False
+
+
+def write_items(writer, items, default_workout='mmfit'):
+    """Append legacy pose dicts ({'exercise', 'pose', 'correct'[, 'workout']})
+    to a writer, one segment per run of identical workout/exercise/correct"""
+    def key(item):
+        return (item.get('workout', default_workout), item['exercise'], item.get('correct', True))
+
+    start = 0
+    for i in range(1, len(items) + 1):
+        if i == len(items) or key(items[i]) != key(items[start]):
+            workout, exercise, correct = key(items[start])
+            poses = np.array([item['pose'] for item in items[start:i]], dtype=np.float32)
+            writer.append(workout, exercise, poses.reshape(-1, NUM_JOINTS, 3), correct=correct)
+            start = i
+
+
+def convert_json(json_path='data/processed_mmfit.json', store_dir=DEFAULT_STORE_DIR):
+    """One-shot conversion of a legacy processed_mmfit.json into a pose store.
+
+    The JSON format does not record workouts, so all frames go into a single
+    workout named after the file.
+    """
+    with open(json_path, 'r') as f:
+        data = json.load(f)
+
+    with PoseStoreWriter(store_dir) as writer:
+        write_items(writer, data, default_workout=Path(json_path).stem)
+    print(f"Converted {len(data)} poses from {json_path} to {store_dir}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert processed_mmfit.json to a pose store')
+    parser.add_argument('json_path', nargs='?', default='data/processed_mmfit.json')
+    parser.add_argument('--out', default=DEFAULT_STORE_DIR)
+    args = parser.parse_args()
+    convert_json(args.json_path, args.out)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+import os
+import json
+import hashlib
+from pathlib import Path
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """SHA-256 of a file's contents"""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class PreprocessCache:
+    """Manifest of preprocessing outputs keyed by input content.
+
+    Each entry records the hashes of its input files, the extractor version
+    and parameters, and the output files it produced. An entry is fresh when
+    all three still match and its outputs exist; otherwise the caller
+    reprocesses it. File hashes are only recomputed when a file's size or
+    mtime changed since the last run.
+    """
+
+    def __init__(self, manifest_path, version, params=None):
+        self.manifest_path = Path(manifest_path)
+        self.version = version
+        self.params = params or {}
+        self.entries = {}
+        self.files = {}
+        if self.manifest_path.exists():
+            try:
+                with open(self.manifest_path, 'r') as f:
+                    manifest = json.load(f)
+                self.entries = manifest.get('entries', {})
+                self.files = manifest.get('files', {})
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable cache manifest {self.manifest_path}: {str(e)}")
+
+    def _hash(self, path):
+        path = str(path)
+        stat = os.stat(path)
+        cached = self.files.get(path)
+        if cached and cached['size'] == stat.st_size and cached['mtime_ns'] == stat.st_mtime_ns:
+            return cached['sha256']
+        digest = file_hash(path)
+        self.files[path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest}
+        return digest
+
+    def key(self, inputs):
+        """Cache key for a set of input files under the current version and params"""
+        payload = {
+            'inputs': [self._hash(p) for p in inputs],
+            'version': self.version,
+            'params': self.params,
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+    def is_fresh(self, name, inputs, outputs=()):
+        """True if `name` was already processed from these exact inputs"""
+        entry = self.entries.get(name)
+        if entry is None or not all(os.path.exists(p) for p in inputs):
+            return False
+        if entry['key'] != self.key(inputs):
+            return False
+        return all(os.path.exists(p) for p in outputs)
+
+    def invalidate(self, name):
+        """Forget an entry and delete the outputs it produced"""
+        entry = self.entries.pop(name, None)
+        if entry is None:
+            return
+        for path in entry.get('outputs', []):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def record(self, name, inputs, outputs=()):
+        self.entries[name] = {
+            'key': self.key(inputs),
+            'inputs': [str(p) for p in inputs],
+            'outputs': [str(p) for p in outputs],
+        }
+
+    def prune(self, keep):
+        """Invalidate every entry whose name is not in `keep`; returns their names"""
+        keep = set(keep)
+        stale = [name for name in self.entries if name not in keep]
+        for name in stale:
+            self.invalidate(name)
+        return stale
+
+    def save(self):
+        # Drop hashes of files no entry refers to any more
+        live = {p for entry in self.entries.values() for p in entry['inputs']}
+        self.files = {p: v for p, v in self.files.items() if p in live}
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.manifest_path.with_name(self.manifest_path.name + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump({'entries': self.entries, 'files': self.files}, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
@@ -1,68 +1,136 @@
 import os
+import shutil
 import zipfile
+import argparse
 import numpy as np
-import json
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 from tqdm import tqdm
+from pose_store import PoseStoreWriter, open_pose_store, pose_store_exists, DEFAULT_STORE_DIR
+from preprocess_cache import PreprocessCache
 
-def extract_mmfit():
+# Bump when the conversion output changes so cached workouts are rebuilt
+PROCESS_VERSION = 2
+MMFIT_ZIP = 'mm-fit.zip'
+MMFIT_DIR = 'data/mm-fit'
+
+def extract_mmfit(zip_path=MMFIT_ZIP, data_dir=MMFIT_DIR):
     """Extract the mm-fit dataset from zip file"""
     print("Extracting mm-fit dataset...")
-    with zipfile.ZipFile('mm-fit.zip', 'r') as zip_ref:
-        zip_ref.extractall('data/mm-fit')
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        zip_ref.extractall(data_dir)
     print("Extraction complete!")
 
-def process_mmfit_data():
-    """Process the mm-fit dataset and convert it to our format"""
-    base_path = Path('data/mm-fit/mm-fit')
-    processed_data = []
+def process_workout(workout_dir):
+    """Convert one workout directory into a list of (exercise, poses) segments"""
+    workout_dir = Path(workout_dir)
+    try:
+        # Load labels
+        labels_file = workout_dir / f"{workout_dir.name}_labels.csv"
+        if not labels_file.exists():
+            return None
+            
+        # Read CSV with correct column names
+        labels = pd.read_csv(labels_file, header=None, 
+                           names=['start_frame', 'end_frame', 'reps', 'exercise'])
+        
+        # Load 3D poses
+        poses_3d_file = workout_dir / f"{workout_dir.name}_pose_3d.npy"
+        if not poses_3d_file.exists():
+            return None
+            
+        poses_3d = np.load(poses_3d_file, mmap_mode='r')
+        # Reshape the poses to combine the first two dimensions (3 and num_frames)
+        poses_3d = poses_3d.transpose(1, 0, 2)  # (num_frames, 3, 18)
+        
+        # Convert each exercise segment in one vectorized step
+        segments = []
+        for start_frame, end_frame, exercise in zip(labels['start_frame'].to_numpy(),
+                                                    labels['end_frame'].to_numpy(),
+                                                    labels['exercise'].to_numpy()):
+            exercise_poses = poses_3d[int(start_frame):int(end_frame)]
+            segments.append((exercise, convert_pose_sequence(exercise_poses)))
+        return segments
+                    
+    except Exception as e:
+        print(f"Error processing {workout_dir}: {str(e)}")
+        return None
+
+def workout_inputs(workout_dir):
+    """Files a workout's processed poses are derived from"""
+    workout_dir = Path(workout_dir)
+    return [workout_dir / f"{workout_dir.name}_labels.csv",
+            workout_dir / f"{workout_dir.name}_pose_3d.npy"]
+
+def process_mmfit_data(output_dir=DEFAULT_STORE_DIR, workers=None, force=False, data_dir=MMFIT_DIR):
+    """Process the mm-fit dataset and stream it into a pose store.
+
+    Workouts are converted in a process pool and written as they complete,
+    so only a few workouts are held in memory at once. Workouts whose input
+    files are unchanged since the last run are copied from the existing store
+    instead of being reprocessed. Returns the number of poses written.
+    """
+    base_path = Path(data_dir) / 'mm-fit'
+    workout_dirs = sorted(base_path.glob('w*'))
     
-    # Process each workout directory
-    for workout_dir in tqdm(list(base_path.glob('w*')), desc="Processing workouts"):
-        try:
-            # Load labels
-            labels_file = workout_dir / f"{workout_dir.name}_labels.csv"
-            if not labels_file.exists():
+    output_dir = Path(output_dir)
+    cache = PreprocessCache(output_dir / 'manifest.json', version=PROCESS_VERSION)
+    old_store = None
+    if pose_store_exists(output_dir) and not force:
+        old_store = open_pose_store(output_dir)
+    
+    def is_cached(workout_dir):
+        return (old_store is not None and workout_dir.name in old_store.workouts
+                and cache.is_fresh(workout_dir.name, workout_inputs(workout_dir)))
+    
+    cached = {d.name for d in workout_dirs if is_cached(d)}
+    stale = [d for d in workout_dirs if d.name not in cached]
+    print(f"{len(cached)} workouts cached, {len(stale)} to process")
+    
+    # Build the new store next to the old one, which is still being read
+    tmp_dir = output_dir.with_name(output_dir.name + '.tmp')
+    with PoseStoreWriter(tmp_dir) as writer, \
+            ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(process_workout, stale)
+        for workout_dir in tqdm(workout_dirs, desc="Processing workouts"):
+            if workout_dir.name in cached:
+                for exercise, poses, correct in old_store.segments(workout_dir.name):
+                    writer.append(workout_dir.name, exercise, poses, correct=correct)
                 continue
-                
-            # Read CSV with correct column names
-            labels = pd.read_csv(labels_file, header=None, 
-                               names=['start_frame', 'end_frame', 'reps', 'exercise'])
             
-            # Load 3D poses
-            poses_3d_file = workout_dir / f"{workout_dir.name}_pose_3d.npy"
-            if not poses_3d_file.exists():
+            segments = next(results)
+            cache.invalidate(workout_dir.name)
+            if segments is None:
                 continue
-                
-            poses_3d = np.load(poses_3d_file)
-            # Reshape the poses to combine the first two dimensions (3 and num_frames)
-            poses_3d = poses_3d.transpose(1, 0, 2)  # (num_frames, 3, 18)
-            
-            # Process each exercise in the workout
-            for _, row in labels.iterrows():
-                start_frame = int(row['start_frame'])
-                end_frame = int(row['end_frame'])
-                exercise = row['exercise']
-                
-                # Extract pose sequence for this exercise
-                exercise_poses = poses_3d[start_frame:end_frame]
-                
-                # Convert poses to our format (17 keypoints)
-                for pose in exercise_poses:
-                    processed_pose = convert_pose_format(pose)
-                    if processed_pose is not None:
-                        processed_data.append({
-                            'exercise': exercise,
-                            'pose': processed_pose.tolist(),
-                            'correct': True  # mm-fit contains correct form data
-                        })
-                        
-        except Exception as e:
-            print(f"Error processing {workout_dir}: {str(e)}")
-            continue
+            for exercise, poses in segments:
+                # mm-fit contains correct form data
+                writer.append(workout_dir.name, exercise, poses, correct=True)
+            cache.record(workout_dir.name, workout_inputs(workout_dir))
+    
+    del old_store
+    if output_dir.exists():
+        shutil.rmtree(output_dir)
+    os.replace(tmp_dir, output_dir)
+    cache.prune(d.name for d in workout_dirs)
+    cache.save()
     
-    return processed_data
+    print(f"Saved {writer.num_frames} processed poses to {output_dir}")
+    return writer.num_frames
+
+def convert_pose_sequence(poses):
+    """Convert a (F, 3, 18) mm-fit pose sequence to (F, 17, 3) in one pass.
+
+    Same layout as convert_pose_format: x and y come from rows 1 and 2, z is
+    zero, and joints beyond the 17th are dropped.
+    """
+    poses = np.asarray(poses)
+    output_poses = np.zeros((len(poses), 17, 3), dtype=np.float32)
+    num_keypoints = min(17, poses.shape[2]) if poses.ndim == 3 else 0
+    if len(poses) and num_keypoints:
+        output_poses[:, :num_keypoints, 0] = poses[:, 1, :num_keypoints]
+        output_poses[:, :num_keypoints, 1] = poses[:, 2, :num_keypoints]
+    return output_poses
 
 def convert_pose_format(pose):
     """Convert mm-fit pose format to our 17-keypoint format"""
@@ -94,30 +162,30 @@ def convert_pose_format(pose):
         print(f"Error converting pose: {str(e)}")
         return None
 
-def save_processed_data(data):
-    """Save processed data to JSON file"""
-    output_file = 'data/processed_mmfit.json'
-    os.makedirs(os.path.dirname(output_file), exist_ok=True)
-    
-    with open(output_file, 'w') as f:
-        json.dump(data, f)
-    print(f"Saved {len(data)} processed poses to {output_file}")
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Convert the mm-fit dataset to a pose store')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Worker processes (default: one per CPU)')
+    parser.add_argument('--zip', default=MMFIT_ZIP, help='mm-fit archive, extracted when it changes')
+    parser.add_argument('--data-dir', default=MMFIT_DIR, help='Where the archive is extracted')
+    parser.add_argument('--out', default=DEFAULT_STORE_DIR)
+    parser.add_argument('--force', action='store_true',
+                        help='Reprocess every workout, ignoring the cache')
+    args = parser.parse_args(argv)
 
-def main():
-    # Create necessary directories
-    os.makedirs('data/mm-fit', exist_ok=True)
-    
-    # Extract dataset if not already extracted
-    if not os.path.exists('data/mm-fit'):
-        extract_mmfit()
-    
-    # Process the data
-    processed_data = process_mmfit_data()
+    # Extract the dataset if the zip is new or has changed since the last run
+    cache = PreprocessCache(os.path.join(args.data_dir, 'manifest.json'), version=PROCESS_VERSION)
+    if os.path.exists(args.zip) and (args.force or not cache.is_fresh('mm-fit.zip', [args.zip])):
+        os.makedirs(args.data_dir, exist_ok=True)
+        extract_mmfit(args.zip, args.data_dir)
+        cache.record('mm-fit.zip', [args.zip])
+        cache.save()
     
-    # Save processed data
-    save_processed_data(processed_data)
+    # Process the data and stream it to disk
+    num_poses = process_mmfit_data(args.out, workers=args.workers, force=args.force,
+                                   data_dir=args.data_dir)
     
-    print(f"Processed {len(processed_data)} poses from mm-fit dataset")
+    print(f"Processed {num_poses} poses from mm-fit dataset")
 
 if __name__ == '__main__':
-    main() 
\ No newline at end of file
+    main()
@@ -5,10 +5,70 @@ let selectedExercise = null;
 const SMOOTHING_WINDOW_SIZE = 10;
 const CONFIDENCE_THRESHOLD = 0.2;
 const MIN_POSE_SCORE = 0.25;
+// pose_normalization.MOVENET_LAYOUT, MIN_SCORE and EPSILON
+const POSE_CENTER_JOINTS = [11, 12];
+const POSE_MIN_SCORE = 0.3;
+const POSE_EPSILON = 1e-6;
 
 const videoElement = document.querySelector(".input_video");
 const canvasElement = document.querySelector(".output_canvas");
 const predictionBox = document.getElementById("predictionBox");
+
+// TF.js twin of pose_normalization.PoseNormalization, the first layer of the
+// exported classifiers: models take raw keypoints and normalize them on the
+// tfjs backend. The parameters come from model.json (tfjs camel-cases the
+// Python config keys); keep the math in sync with the Python layer and with
+// normalizeKeypoints, which runs it per frame for the rule checks.
+class PoseNormalization extends tf.layers.Layer {
+  constructor(config) {
+    super(config);
+    this.numJoints = config.numJoints;
+    this.centerJoints = config.centerJoints;
+    this.scoreChannel = config.scoreChannel;
+    this.minScore = config.minScore;
+    this.epsilon = config.epsilon;
+    this.coordMask = [0, 1, 2].map(c => (c === this.scoreChannel ? 0 : 1));
+  }
+
+  call(inputs) {
+    return tf.tidy(() => {
+      const x = Array.isArray(inputs) ? inputs[0] : inputs;
+      const joints = x.reshape([-1, this.numJoints, 3]);
+      const coordMask = tf.tensor(this.coordMask, [1, 1, 3]);
+      const centers = tf.gather(joints, this.centerJoints, 1).mean(1, true);
+      let centered = joints.sub(centers).mul(coordMask);
+      if (this.scoreChannel !== null && this.scoreChannel !== undefined) {
+        const scores = joints.slice([0, 0, this.scoreChannel], [-1, -1, 1]);
+        centered = centered.mul(scores.greaterEqual(this.minScore).cast("float32"));
+      }
+      const radius = centered.square().sum(-1, true).sqrt().max(1, true);
+      let normalized = centered.div(radius.maximum(this.epsilon));
+      normalized = normalized.add(joints.mul(tf.scalar(1).sub(coordMask)));
+      return normalized.reshape([-1, this.numJoints * 3]);
+    });
+  }
+
+  computeOutputShape(inputShape) {
+    return inputShape;
+  }
+
+  getConfig() {
+    return {
+      ...super.getConfig(),
+      numJoints: this.numJoints,
+      centerJoints: this.centerJoints,
+      scoreChannel: this.scoreChannel,
+      minScore: this.minScore,
+      epsilon: this.epsilon
+    };
+  }
+
+  static get className() {
+    return "PoseNormalization";
+  }
+}
+tf.serialization.registerClass(PoseNormalization);
+
 const formScoreInput = document.getElementById("formScore");
 const workoutNameInput = document.getElementById("workoutName");
 const exerciseSelectInput = document.getElementById("exerciseSelect");
@@ -1031,41 +1091,28 @@ function populateExerciseList() {
   });
 }
 
+// Same math as PoseNormalization with MOVENET_LAYOUT, on keypoint objects so
+// the rule checks can run it every frame without allocating tensors: center
+// on the hip midpoint, zero joints scored below POSE_MIN_SCORE and scale the
+// kept joints to unit radius. Keypoints and corrected poses from the server
+// are then in the same units as the reference index.
 function normalizeKeypoints(keypoints) {
-  // Center the pose around the hip center
-  const leftHip = keypoints[11];
-  const rightHip = keypoints[12];
-  const hipCenter = {
-    x: (leftHip.x + rightHip.x) / 2,
-    y: (leftHip.y + rightHip.y) / 2
-  };
-  
-  // Calculate scale using multiple body measurements for better stability
-  const leftShoulder = keypoints[5];
-  const rightShoulder = keypoints[6];
-  const shoulderWidth = Math.sqrt(
-    Math.pow(rightShoulder.x - leftShoulder.x, 2) +
-    Math.pow(rightShoulder.y - leftShoulder.y, 2)
-  );
-  
-  const leftKnee = keypoints[13];
-  const rightKnee = keypoints[14];
-  const kneeWidth = Math.sqrt(
-    Math.pow(rightKnee.x - leftKnee.x, 2) +
-    Math.pow(rightKnee.y - leftKnee.y, 2)
-  );
-  
-  // Use average of shoulder and knee width for more stable scaling
-  const scale = (shoulderWidth + kneeWidth) / 2;
-  
-  // Normalize each keypoint with improved scaling
-  return keypoints.map(kp => ({
-    x: (kp.x - hipCenter.x) / scale,
-    y: (kp.y - hipCenter.y) / scale,
-    score: kp.score
-  }));
+  const centers = POSE_CENTER_JOINTS.map(i => keypoints[i]);
+  const cx = centers.reduce((sum, kp) => sum + kp.x, 0) / centers.length;
+  const cy = centers.reduce((sum, kp) => sum + kp.y, 0) / centers.length;
+
+  const centered = keypoints.map(kp => {
+    const kept = kp.score >= POSE_MIN_SCORE;
+    return { x: kept ? kp.x - cx : 0, y: kept ? kp.y - cy : 0, score: kp.score };
+  });
+  const radius = Math.max(POSE_EPSILON, ...centered.map(kp => Math.hypot(kp.x, kp.y)));
+
+  return centered.map(kp => ({ x: kp.x / radius, y: kp.y / radius, score: kp.score }));
 }
 
+// Training keypoints get the same filter (keypoint_filters.ema_filter); keep
+// smoothingFactor and the 0.3 score cutoff in sync with EMA_ALPHA and
+// EMA_MIN_SCORE there.
 function smoothKeypoints(keypoints, prevKeypoints) {
   if (!prevKeypoints) return keypoints;
   
@@ -1671,8 +1718,8 @@ async function correctPose(keypoints) {
             return null;
         }
 
-        // Convert keypoints to the format expected by the model
-        const normalizedPose = normalizePose(convertToH36MFormat(keypoints));
+        // MoveNet keypoints as the classifiers were trained on them
+        const pose = toMoveNetPose(keypoints);
         
         // Send pose to server for correction
         const response = await fetch('/api/correct-pose', {
@@ -1681,7 +1728,8 @@ async function correctPose(keypoints) {
                 'Content-Type': 'application/json',
             },
             body: JSON.stringify({
-                pose: normalizedPose,
+                pose: pose,
+                layout: 'movenet',
                 exercise: selectedExercise
             })
         });
@@ -1699,12 +1747,7 @@ async function correctPose(keypoints) {
         }
 
         // Convert corrected pose back to keypoint format
-        const correctedKeypoints = data.correctedPose.map((point, i) => ({
-            x: point[0],
-            y: point[1],
-            z: point[2],
-            score: 1.0
-        }));
+        const correctedKeypoints = fromMoveNetPose(data.correctedPose);
 
         return correctedKeypoints;
     } catch (error) {
@@ -1721,106 +1764,19 @@ function updateExerciseConfidence(confidence) {
     }
 }
 
-function convertToH36MFormat(keypoints) {
-  // Map MediaPipe keypoints to H36M format
-  // This is a simplified mapping - you'll need to adjust based on your needs
-  const h36mJoints = 17;
-  const h36mPose = new Array(h36mJoints).fill(null);
-  
-  // Example mapping (adjust based on your needs):
-  // H36M: 0=hip, 1=spine, 2=chest, 3=neck, 4=head, 5=left shoulder, 6=left elbow, 7=left wrist,
-  // 8=right shoulder, 9=right elbow, 10=right wrist, 11=left hip, 12=left knee, 13=left ankle,
-  // 14=right hip, 15=right knee, 16=right ankle
-  
-  // Map MediaPipe keypoints to H36M format
-  if (keypoints[23]) h36mPose[0] = keypoints[23];  // hip
-  if (keypoints[11]) h36mPose[5] = keypoints[11];  // left shoulder
-  if (keypoints[13]) h36mPose[6] = keypoints[13];  // left elbow
-  if (keypoints[15]) h36mPose[7] = keypoints[15];  // left wrist
-  if (keypoints[12]) h36mPose[8] = keypoints[12];  // right shoulder
-  if (keypoints[14]) h36mPose[9] = keypoints[14];  // right elbow
-  if (keypoints[16]) h36mPose[10] = keypoints[16]; // right wrist
-  if (keypoints[23]) h36mPose[11] = keypoints[23]; // left hip
-  if (keypoints[25]) h36mPose[12] = keypoints[25]; // left knee
-  if (keypoints[27]) h36mPose[13] = keypoints[27]; // left ankle
-  if (keypoints[24]) h36mPose[14] = keypoints[24]; // right hip
-  if (keypoints[26]) h36mPose[15] = keypoints[26]; // right knee
-  if (keypoints[28]) h36mPose[16] = keypoints[28]; // right ankle
-  
-  // Fill in missing joints with interpolated values
-  for (let i = 0; i < h36mJoints; i++) {
-    if (!h36mPose[i]) {
-      // Find the closest non-null joints
-      let leftIdx = i - 1;
-      let rightIdx = i + 1;
-      
-      while (leftIdx >= 0 && !h36mPose[leftIdx]) leftIdx--;
-      while (rightIdx < h36mJoints && !h36mPose[rightIdx]) rightIdx++;
-      
-      if (leftIdx >= 0 && rightIdx < h36mJoints) {
-        // Interpolate between the two points
-        const leftPoint = h36mPose[leftIdx];
-        const rightPoint = h36mPose[rightIdx];
-        const ratio = (i - leftIdx) / (rightIdx - leftIdx);
-        
-        h36mPose[i] = {
-          x: leftPoint.x + (rightPoint.x - leftPoint.x) * ratio,
-          y: leftPoint.y + (rightPoint.y - leftPoint.y) * ratio,
-          z: leftPoint.z + (rightPoint.z - leftPoint.z) * ratio,
-          score: Math.min(leftPoint.score, rightPoint.score)
-        };
-      } else if (leftIdx >= 0) {
-        // Use the left point
-        h36mPose[i] = {...h36mPose[leftIdx]};
-      } else if (rightIdx < h36mJoints) {
-        // Use the right point
-        h36mPose[i] = {...h36mPose[rightIdx]};
-      } else {
-        // Default to origin if no points are available
-        h36mPose[i] = {x: 0, y: 0, z: 0, score: 0};
-      }
-    }
-  }
-  
-  return h36mPose;
+// MoveNet detector keypoints (COCO order, pixel coordinates) as [y, x, score]
+// rows in normalized image coordinates, the layout of training/keypoints and
+// of pose_normalization.MOVENET_LAYOUT
+function toMoveNetPose(keypoints) {
+  const width = videoElement.videoWidth || 1;
+  const height = videoElement.videoHeight || 1;
+  return keypoints.map(kp => [kp.y / height, kp.x / width, kp.score ?? 0]);
 }
 
-function normalizePose(pose) {
-  // Center around hip
-  const hip = pose[0];
-  if (!hip) return pose;
-  
-  const centeredPose = pose.map(point => {
-    if (!point) return null;
-    return {
-      x: point.x - hip.x,
-      y: point.y - hip.y,
-      z: point.z - hip.z,
-      score: point.score
-    };
-  });
-  
-  // Scale to unit size
-  let maxDist = 0;
-  centeredPose.forEach(point => {
-    if (!point) return;
-    const dist = Math.sqrt(point.x * point.x + point.y * point.y + point.z * point.z);
-    maxDist = Math.max(maxDist, dist);
-  });
-  
-  if (maxDist > 0) {
-    return centeredPose.map(point => {
-      if (!point) return null;
-      return {
-        x: point.x / maxDist,
-        y: point.y / maxDist,
-        z: point.z / maxDist,
-        score: point.score
-      };
-    });
-  }
-  
-  return centeredPose;
+function fromMoveNetPose(pose) {
+  const width = videoElement.videoWidth || 1;
+  const height = videoElement.videoHeight || 1;
+  return pose.map(([y, x, score]) => ({ x: x * width, y: y * height, score }));
 }
 
 // Add a function to visualize the corrected pose
@@ -0,0 +1,259 @@
+import os
+import json
+import time
+import argparse
+import numpy as np
+from pathlib import Path
+from pose_store import open_pose_store, DEFAULT_STORE_DIR, NUM_JOINTS
+from keypoint_files import load_keypoint_files
+from pose_normalization import H36M_LAYOUT, MOVENET_LAYOUT, MIN_SCORE
+
+# A reference index is a directory next to the model, laid out like a pose
+# store so it opens memory-mapped:
+#   poses.npy    float32 (M, 51)     normalized correct poses, grouped by exercise
+#   norms.npy    float32 (M, 17)     squared norm of each joint's coordinates
+#   offsets.npy  int64   (E + 1,)    rows of exercise i are offsets[i]:offsets[i+1]
+#   index.json   {'version', 'layout', 'exercises', 'source'}
+#
+# Poses are normalized with PoseNormalization's math for their layout: the
+# mm-fit store holds H36M poses ([x, y, z], hip at joint 0), the keypoint
+# files MoveNet keypoints ([y, x, score], hips at joints 11 and 12, joints
+# scored below MIN_SCORE dropped). Queries must use the index's layout.
+REFERENCE_INDEX_VERSION = 2
+LAYOUTS = {'h36m': H36M_LAYOUT, 'movenet': MOVENET_LAYOUT}
+DEFAULT_INDEX_DIRS = {'h36m': 'models/reference_index', 'movenet': 'models/reference_index_movenet'}
+DEFAULT_INDEX_DIR = DEFAULT_INDEX_DIRS['h36m']
+DEFAULT_KEYPOINTS_DIR = 'training/keypoints'
+MAX_PER_EXERCISE = 20000
+
+
+def coord_mask(layout):
+    """(3,) 1 for position channels, 0 for the score channel"""
+    mask = np.ones(3, dtype=np.float32)
+    if LAYOUTS[layout]['score_channel'] is not None:
+        mask[LAYOUTS[layout]['score_channel']] = 0
+    return mask
+
+
+def reliable_joints(poses, layout):
+    """(B, 17) bool, joints at least MIN_SCORE; all True without scores"""
+    joints = np.asarray(poses, dtype=np.float32).reshape(-1, NUM_JOINTS, 3)
+    score_channel = LAYOUTS[layout]['score_channel']
+    if score_channel is None:
+        return np.ones(joints.shape[:2], dtype=bool)
+    return joints[..., score_channel] >= MIN_SCORE
+
+
+def normalize_poses(poses, layout='h36m'):
+    """Center (B, 17, 3) poses on their hip and scale each to unit radius,
+    as pose_normalization.normalize_pose_array does for the layout.
+
+    Returns (normalized poses, centers (B, 1, 3), scales (B, 1, 1)); the
+    positions of reliable joints map back with `normalized * scales + centers`
+    and the score channel, if any, is passed through.
+    """
+    poses = np.asarray(poses, dtype=np.float32).reshape(-1, NUM_JOINTS, 3)
+    mask = coord_mask(layout)
+    centers = poses[:, LAYOUTS[layout]['center_joints']].mean(axis=1, keepdims=True) * mask
+    centered = (poses - centers) * mask * reliable_joints(poses, layout)[..., None]
+    scales = np.sqrt(np.sum(centered**2, axis=2)).max(axis=1)[:, None, None]
+    scales = np.where(scales > 0, scales, 1).astype(np.float32)
+    return centered / scales + poses * (1 - mask), centers, scales
+
+
+class ReferencePoseIndex:
+    """Per-exercise brute-force nearest-neighbour search over reference poses.
+
+    Distances come from BLAS matrix products per query batch,
+    |q - r|^2 = |q|^2 - 2 q.r + |r|^2, over the positions of the joints
+    the query detected reliably; the per-joint |r_j|^2 are precomputed.
+    For the index sizes here (tens of thousands of rows in 51 dimensions)
+    this is faster than a KD-tree, which degrades in high dimensions.
+    """
+
+    def __init__(self, exercises, poses, offsets, norms=None, layout='h36m'):
+        self.exercises = list(exercises)
+        self.poses = poses
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.layout = layout
+        self._coord_mask = coord_mask(layout)
+        if norms is None:
+            positions = np.asarray(poses).reshape(-1, NUM_JOINTS, 3) * self._coord_mask
+            norms = np.sum(positions**2, axis=2)
+        self.norms = norms
+        self._exercise_ids = {name: i for i, name in enumerate(self.exercises)}
+
+    def __len__(self):
+        return len(self.poses)
+
+    def __contains__(self, exercise):
+        return exercise in self._exercise_ids
+
+    def _rows(self, exercise):
+        i = self._exercise_ids[exercise]
+        return slice(int(self.offsets[i]), int(self.offsets[i + 1]))
+
+    def query(self, exercise, poses):
+        """Find the closest reference pose for each of a batch of (B, 17, 3) poses.
+
+        Returns a dict of arrays:
+          index     (B,)        row of the match within the exercise
+          distance  (B,)        Euclidean distance in normalized units
+          reference (B, 17, 3)  the matched pose in each query's own coordinates
+          deltas    (B, 17, 3)  reference - query, per joint, in query coordinates
+
+        Joints unreliable in the query or the match keep the query's position
+        in `reference` and have zero deltas; score channels are not moved.
+        """
+        poses = np.asarray(poses, dtype=np.float32).reshape(-1, NUM_JOINTS, 3)
+        normalized, centers, scales = normalize_poses(poses, self.layout)
+        reliable = reliable_joints(poses, self.layout)
+        q = (normalized * self._coord_mask).reshape(len(normalized), -1)
+        rows = self._rows(exercise)
+        refs = self.poses[rows]
+        if len(refs) == 0:
+            raise ValueError(f"No reference poses for '{exercise}'")
+
+        d2 = q @ refs.T
+        d2 *= -2
+        d2 += reliable.astype(np.float32) @ np.asarray(self.norms[rows]).T
+        best = np.argmin(d2, axis=1)
+        dist2 = d2[np.arange(len(q)), best] + np.einsum('ij,ij->i', q, q)
+
+        matched = np.asarray(refs[best]).reshape(-1, NUM_JOINTS, 3)
+        moved = (reliable & reliable_joints(matched, self.layout))[..., None] * self._coord_mask
+        reference = np.where(moved > 0, matched * scales + centers, poses)
+        return {
+            'index': best,
+            'distance': np.sqrt(np.maximum(dist2, 0)),
+            'reference': reference,
+            'deltas': reference - poses,
+        }
+
+    def save(self, index_dir=DEFAULT_INDEX_DIR, source=None):
+        index_dir = Path(index_dir)
+        index_dir.mkdir(parents=True, exist_ok=True)
+        np.save(index_dir / 'poses.npy', np.ascontiguousarray(self.poses, dtype=np.float32))
+        np.save(index_dir / 'norms.npy', np.asarray(self.norms, dtype=np.float32))
+        np.save(index_dir / 'offsets.npy', self.offsets)
+        with open(index_dir / 'index.json', 'w') as f:
+            json.dump({'version': REFERENCE_INDEX_VERSION, 'layout': self.layout,
+                       'exercises': self.exercises, 'source': source}, f, indent=2)
+
+
+def load_reference_index(index_dir=DEFAULT_INDEX_DIR, mmap_mode='r'):
+    """Open a saved index; the arrays are memory-mapped, so this is instant"""
+    index_dir = Path(index_dir)
+    with open(index_dir / 'index.json', 'r') as f:
+        index = json.load(f)
+    if index.get('version') != REFERENCE_INDEX_VERSION:
+        raise ValueError(f"Unsupported reference index version in {index_dir}: {index.get('version')}; "
+                         "rebuild it with reference_index.py")
+    return ReferencePoseIndex(index['exercises'],
+                              np.load(index_dir / 'poses.npy', mmap_mode=mmap_mode),
+                              np.load(index_dir / 'offsets.npy'),
+                              np.load(index_dir / 'norms.npy', mmap_mode=mmap_mode),
+                              layout=index['layout'])
+
+
+def _index_exercises(exercises, exercise_rows, read_poses, layout, max_per_exercise, seed):
+    """ReferencePoseIndex over the given rows of each exercise; exercises with
+    more than `max_per_exercise` rows are evenly subsampled"""
+    rng = np.random.default_rng(seed)
+    names, chunks, counts = [], [], []
+    for exercise, rows in zip(exercises, exercise_rows):
+        if len(rows) > max_per_exercise:
+            rows = np.sort(rng.choice(rows, max_per_exercise, replace=False))
+        if len(rows) == 0:
+            continue
+        normalized, _, _ = normalize_poses(read_poses(rows), layout)
+        names.append(exercise)
+        chunks.append(normalized.reshape(len(rows), -1))
+        counts.append(len(rows))
+
+    poses = np.concatenate(chunks) if chunks else np.zeros((0, NUM_JOINTS * 3), np.float32)
+    offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+    return ReferencePoseIndex(names, poses, offsets, layout=layout)
+
+
+def build_reference_index(store_dir=DEFAULT_STORE_DIR, max_per_exercise=MAX_PER_EXERCISE, seed=0):
+    """Index the correct H36M poses of a pose store, grouped by exercise.
+
+    Consecutive frames at mm-fit's frame rate are near-duplicates, so large
+    exercises are subsampled.
+    """
+    store = open_pose_store(store_dir)
+    labels = np.asarray(store.labels)
+    correct = np.asarray(store.correct)
+    rows = [np.flatnonzero((labels == code) & correct) for code in range(len(store.exercises))]
+    return _index_exercises(store.exercises, rows, lambda r: store.poses[r], 'h36m',
+                            max_per_exercise, seed)
+
+
+def build_keypoint_reference_index(keypoints_dir=DEFAULT_KEYPOINTS_DIR, max_per_exercise=MAX_PER_EXERCISE,
+                                   seed=0):
+    """Index the MoveNet keypoint files, all correct-form demonstrations,
+    grouped by exercise; the layout the browser and the classifiers use"""
+    X, y, classes = load_keypoint_files(keypoints_dir)
+    rows = [np.flatnonzero(y == i) for i in range(len(classes))]
+    return _index_exercises([str(c) for c in classes], rows, lambda r: X[r], 'movenet',
+                            max_per_exercise, seed)
+
+
+def benchmark(sizes=(1000, 10000, 100000), batch_sizes=(1, 64), repeats=200, seed=0):
+    """Queries/sec against index size on synthetic poses"""
+    rng = np.random.default_rng(seed)
+    results = []
+    for size in sizes:
+        refs = normalize_poses(rng.normal(size=(size, NUM_JOINTS, 3)))[0].reshape(size, -1)
+        index = ReferencePoseIndex(['bench'], refs, [0, size])
+        for batch_size in batch_sizes:
+            queries = rng.normal(size=(batch_size, NUM_JOINTS, 3)).astype(np.float32)
+            index.query('bench', queries)
+            start = time.perf_counter()
+            for _ in range(repeats):
+                index.query('bench', queries)
+            elapsed = time.perf_counter() - start
+            results.append({
+                'index_size': size,
+                'batch_size': batch_size,
+                'ms_per_batch': 1000 * elapsed / repeats,
+                'queries_per_sec': batch_size * repeats / elapsed,
+            })
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build or benchmark the reference-pose index')
+    parser.add_argument('--layout', choices=list(LAYOUTS), default='h36m',
+                        help="'h36m' indexes the mm-fit pose store, 'movenet' the keypoint files")
+    parser.add_argument('--store', default=DEFAULT_STORE_DIR, help='Pose store to index (h36m)')
+    parser.add_argument('--keypoints', default=DEFAULT_KEYPOINTS_DIR, help='Keypoint files to index (movenet)')
+    parser.add_argument('--out', default=None, help='Default models/reference_index[_movenet]')
+    parser.add_argument('--max-per-exercise', type=int, default=MAX_PER_EXERCISE)
+    parser.add_argument('--benchmark', action='store_true',
+                        help='Measure queries/sec on synthetic indexes instead of building')
+    args = parser.parse_args(argv)
+
+    if args.benchmark:
+        print(f"{'index size':>10s} {'batch':>6s} {'ms/batch':>9s} {'queries/s':>11s}")
+        for r in benchmark():
+            print(f"{r['index_size']:>10d} {r['batch_size']:>6d} "
+                  f"{r['ms_per_batch']:>9.3f} {r['queries_per_sec']:>11,.0f}")
+        return
+
+    out = args.out or DEFAULT_INDEX_DIRS[args.layout]
+    source = args.store if args.layout == 'h36m' else args.keypoints
+    print(f"Building {args.layout} reference index from {source}...")
+    if args.layout == 'h36m':
+        index = build_reference_index(args.store, args.max_per_exercise)
+    else:
+        index = build_keypoint_reference_index(args.keypoints, args.max_per_exercise)
+    index.save(out, source=os.path.abspath(source))
+    for i, exercise in enumerate(index.exercises):
+        print(f"  {exercise}: {index.offsets[i + 1] - index.offsets[i]} poses")
+    print(f"✅ Indexed {len(index)} reference poses in {out}")
+
+
+if __name__ == '__main__':
+    main()
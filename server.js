@@ -1,4 +1,5 @@
 const express = require('express');
+const http = require('http');
 const cors = require('cors');
 const dotenv = require('dotenv');
 const bcrypt = require('bcryptjs');
@@ -47,6 +48,48 @@ const workoutSchema = new mongoose.Schema({
 
 const Workout = mongoose.model('Workout', workoutSchema);
 
+// Python inference service (inference_server.py); one pooled keep-alive agent
+// so each pose does not pay for a new TCP connection
+const INFERENCE_URL = new URL(process.env.INFERENCE_URL || 'http://127.0.0.1:5001');
+const inferenceAgent = new http.Agent({ keepAlive: true, maxSockets: 64 });
+const INFERENCE_HEADERS = ['x-queue-ms', 'x-inference-ms', 'x-batch-size', 'x-total-ms'];
+
+function predictPose(pose, layout, exercise) {
+    return new Promise((resolve, reject) => {
+        const body = JSON.stringify({ pose: pose.flat(), layout, exercise });
+        const request = http.request({
+            hostname: INFERENCE_URL.hostname,
+            port: INFERENCE_URL.port,
+            path: '/predict',
+            method: 'POST',
+            agent: inferenceAgent,
+            timeout: 2000,
+            headers: {
+                'Content-Type': 'application/json',
+                'Content-Length': Buffer.byteLength(body)
+            }
+        }, response => {
+            let data = '';
+            response.setEncoding('utf8');
+            response.on('data', chunk => { data += chunk; });
+            response.on('end', () => {
+                try {
+                    const result = JSON.parse(data);
+                    if (response.statusCode !== 200) {
+                        return reject(Object.assign(new Error(result.error), { status: response.statusCode }));
+                    }
+                    resolve({ result, headers: response.headers });
+                } catch (err) {
+                    reject(err);
+                }
+            });
+        });
+        request.on('timeout', () => request.destroy(new Error('Inference service timed out')));
+        request.on('error', reject);
+        request.end(body);
+    });
+}
+
 // Authentication middleware
 function authenticateToken(req, res, next) {
     const authHeader = req.headers['authorization'];
@@ -68,21 +111,30 @@ function authenticateToken(req, res, next) {
 // Pose correction endpoint
 app.post('/api/correct-pose', async (req, res) => {
     try {
-        const { pose, exercise } = req.body;
+        const { pose, layout, exercise } = req.body;
         
-        if (!pose || !exercise) {
-            return res.status(400).json({ error: 'Pose and exercise are required' });
+        if (!pose || !layout || !exercise) {
+            return res.status(400).json({ error: 'Pose, layout and exercise are required' });
         }
 
-        // For now, return a simple response
-        // In a real implementation, this would use the trained model
-        res.json({ 
-            correctedPose: pose,
-            exerciseConfidence: 0.8
+        const { result, headers } = await predictPose(pose, layout, exercise);
+        INFERENCE_HEADERS.forEach(name => {
+            if (headers[name]) res.set(name, headers[name]);
+        });
+        res.json({
+            correctedPose: result.referencePose || pose,
+            jointDeltas: result.jointDeltas,
+            // null when the selected exercise is not one of the classifier's labels
+            exerciseConfidence: [result.exerciseConfidence ?? null],
+            predictedExercise: result.exercise,
+            probabilities: result.probabilities
         });
     } catch (error) {
         console.error('Error correcting pose:', error);
-        res.status(500).json({ error: 'Failed to correct pose' });
+        if (error.status === 400) {
+            return res.status(400).json({ error: error.message });
+        }
+        res.status(503).json({ error: 'Inference service unavailable' });
     }
 });
 
@@ -0,0 +1,234 @@
+import os
+import json
+import argparse
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras import layers, models
+from pose_store import open_pose_store, pose_store_exists, DEFAULT_STORE_DIR
+from keypoint_files import load_keypoint_files
+from export_model import export_tfjs
+
+# The shipped GIF segments are 12-30 frames long (median 12); a 6-frame window
+# leaves every segment one training and one validation window. Use --window
+# for longer recordings such as the mm-fit pose store.
+WINDOW = 6
+STRIDE = 1
+VALIDATION_SPLIT = 0.2
+# Running sums are recomputed from the ring buffer this often, so float
+# rounding cannot accumulate over a long stream
+RESYNC_EVERY = 4096
+
+
+def sliding_windows(frames, window=WINDOW):
+    """(N, D) frames -> (N - window + 1, window, D) windows, as a view (no copy)"""
+    views = np.lib.stride_tricks.sliding_window_view(frames, window, axis=0)
+    return views.transpose(0, 2, 1)
+
+
+def segment_bounds(labels, offsets=None):
+    """Start/end of the runs of frames that windows must not cross: label
+    changes, plus any explicit source boundaries such as workout offsets"""
+    labels = np.asarray(labels)
+    cuts = set(np.flatnonzero(labels[1:] != labels[:-1]) + 1)
+    if offsets is not None:
+        cuts.update(int(o) for o in offsets)
+    cuts = sorted(c for c in cuts | {0, len(labels)} if 0 <= c <= len(labels))
+    return list(zip(cuts[:-1], cuts[1:]))
+
+
+def window_starts(bounds, window=WINDOW, stride=STRIDE, validation_split=VALIDATION_SPLIT):
+    """Window start indices for (train, validation).
+
+    The last `validation_split` of every segment, and at least one window,
+    is held out and no window straddles the cut, so overlapping windows
+    cannot leak across the split. Segments too short for a window on each
+    side of the cut go to training whole.
+    """
+    train, val = [], []
+    for start, end in bounds:
+        held_out = 0
+        if validation_split > 0 and end - start >= 2 * window:
+            held_out = max(int(round(validation_split * (end - start))), window)
+        cut = end - held_out
+        train.append(np.arange(start, cut - window + 1, stride))
+        val.append(np.arange(cut, end - window + 1, stride))
+    return np.concatenate(train).astype(np.int64), np.concatenate(val).astype(np.int64)
+
+
+def windows_dataset(windows, labels, starts, window=WINDOW, batch_size=32, shuffle=True):
+    """tf.data over strided window views; a window is only copied when its
+    batch is gathered"""
+    window_labels = labels[starts + window - 1].astype(np.int32)
+    dim = windows.shape[2]
+
+    def batches():
+        order = np.random.permutation(len(starts)) if shuffle else np.arange(len(starts))
+        for i in range(0, len(order), batch_size):
+            idx = order[i:i + batch_size]
+            yield windows[starts[idx]].astype(np.float32, copy=False), window_labels[idx]
+
+    dataset = tf.data.Dataset.from_generator(batches, output_signature=(
+        tf.TensorSpec([None, window, dim], tf.float32), tf.TensorSpec([None], tf.int32)))
+    return dataset.prefetch(tf.data.AUTOTUNE)
+
+
+def create_temporal_model(window, input_dim, num_classes, learning_rate=0.001):
+    """Per-frame encoder followed by window statistics that can be updated in
+    O(1) per frame: the mean and mean square of the frame embeddings, and the
+    change from the oldest to the newest frame"""
+    inputs = layers.Input(shape=(window, input_dim), name='window_input')
+    x = layers.Dense(128, activation='relu', name='frame_dense_1')(inputs)
+    x = layers.Dense(64, activation='relu', name='frame_dense_2')(x)
+
+    mean = layers.GlobalAveragePooling1D(name='window_mean')(x)
+    mean_sq = layers.GlobalAveragePooling1D(name='window_mean_sq')(layers.Multiply()([x, x]))
+    last = layers.Flatten()(layers.Cropping1D((window - 1, 0), name='newest_frame')(x))
+    first = layers.Flatten()(layers.Cropping1D((0, window - 1), name='oldest_frame')(x))
+    delta = layers.Subtract(name='window_delta')([last, first])
+
+    h = layers.Concatenate()([mean, mean_sq, delta])
+    h = layers.Dense(64, activation='relu', name='head_dense')(h)
+    h = layers.Dropout(0.3)(h)
+    outputs = layers.Dense(num_classes, activation='softmax', dtype='float32', name='head_output')(h)
+
+    model = models.Model(inputs, outputs, name='temporal_classifier')
+    model.compile(optimizer=tf.keras.optimizers.Adam(learning_rate=learning_rate),
+                  loss='sparse_categorical_crossentropy', metrics=['accuracy'])
+    return model
+
+
+def _relu(x):
+    return np.maximum(x, 0)
+
+
+def _softmax(x):
+    e = np.exp(x - x.max())
+    return e / e.sum()
+
+
+class StreamingClassifier:
+    """Frame-by-frame inference with a trained temporal model.
+
+    Keeps a ring buffer of the last `window` frame embeddings and running
+    sums of them, so each new frame costs one encoder pass plus O(1) window
+    updates instead of re-running the whole window. Once the buffer is full,
+    `update` returns the same probabilities as the Keras model on the window.
+    """
+
+    def __init__(self, model):
+        self.window = model.input_shape[1]
+        weights = lambda name: [w.astype(np.float64) for w in model.get_layer(name).get_weights()]
+        self.encoder = [weights('frame_dense_1'), weights('frame_dense_2')]
+        self.head = [weights('head_dense'), weights('head_output')]
+        self.embedding_dim = self.encoder[-1][1].shape[0]
+        self.reset()
+
+    def reset(self):
+        self.ring = np.zeros((self.window, self.embedding_dim))
+        self.total = np.zeros(self.embedding_dim)
+        self.total_sq = np.zeros(self.embedding_dim)
+        self.pos = 0
+        self.count = 0
+        self.updates = 0
+
+    def _encode(self, frame):
+        x = np.asarray(frame, dtype=np.float64).reshape(-1)
+        for kernel, bias in self.encoder:
+            x = _relu(x @ kernel + bias)
+        return x
+
+    def update(self, frame):
+        """Add one (D,) frame; returns class probabilities, or None until
+        `window` frames have been seen"""
+        e = self._encode(frame)
+        if self.count == self.window:
+            old = self.ring[self.pos]
+            self.total -= old
+            self.total_sq -= old * old
+        self.ring[self.pos] = e
+        self.total += e
+        self.total_sq += e * e
+        self.pos = (self.pos + 1) % self.window
+        self.count = min(self.count + 1, self.window)
+        self.updates += 1
+        if self.updates % RESYNC_EVERY == 0:
+            self.total = self.ring.sum(axis=0)
+            self.total_sq = np.square(self.ring).sum(axis=0)
+        if self.count < self.window:
+            return None
+
+        # After the write, pos points at the oldest frame in the buffer
+        features = np.concatenate([self.total / self.window, self.total_sq / self.window,
+                                   e - self.ring[self.pos]])
+        (k1, b1), (k2, b2) = self.head
+        return _softmax(_relu(features @ k1 + b1) @ k2 + b2)
+
+
+def load_frames(source):
+    """(frames (N, D), labels (N,), class names, segment bounds) from a keypoint
+    directory or a pose store"""
+    if pose_store_exists(source):
+        store = open_pose_store(source)
+        frames = np.asarray(store.poses, dtype=np.float32).reshape(len(store), -1)
+        labels = np.asarray(store.labels, dtype=np.int32)
+        return frames, labels, np.array(store.exercises), segment_bounds(labels, store.offsets)
+    frames, labels, classes = load_keypoint_files(source)
+    return frames, labels, classes, segment_bounds(labels)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Train a streaming temporal exercise classifier')
+    parser.add_argument('--data', default='training/keypoints',
+                        help=f'Keypoint directory or pose store (e.g. {DEFAULT_STORE_DIR})')
+    parser.add_argument('--window', type=int, default=WINDOW)
+    parser.add_argument('--stride', type=int, default=STRIDE, help='Frames between training windows')
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--epochs', type=int, default=50)
+    parser.add_argument('--out', default='temporal_classifier.h5')
+    parser.add_argument('--tfjs-out', default='public/temporal_model')
+    args = parser.parse_args(argv)
+
+    print(f"Loading frames from {args.data}...")
+    frames, labels, classes, bounds = load_frames(args.data)
+    train_starts, val_starts = window_starts(bounds, args.window, args.stride)
+    lengths = np.array([end - start for start, end in bounds])
+    segments = (f"{len(lengths)} segments of {lengths.min()}-{lengths.max()} frames "
+                f"(median {int(np.median(lengths))})")
+    if len(train_starts) == 0:
+        parser.error(f"No {args.window}-frame training windows in {args.data}: {segments}. "
+                     f"Use a --window of at most {lengths.max()}.")
+    if len(val_starts) == 0:
+        print(f"⚠️ No validation windows: {segments}; a segment needs {2 * args.window} frames "
+              f"for a window on each side of the split")
+    windows = sliding_windows(frames, args.window)
+    print(f"{len(frames)} frames, {len(classes)} classes, {segments}, "
+          f"{len(train_starts)} training / {len(val_starts)} validation windows")
+
+    train_ds = windows_dataset(windows, labels, train_starts, args.window, args.batch_size)
+    val_ds = windows_dataset(windows, labels, val_starts, args.window, args.batch_size, shuffle=False)
+
+    model = create_temporal_model(args.window, frames.shape[1], len(classes))
+    model.summary()
+    callbacks = []
+    if len(val_starts):
+        callbacks = [
+            tf.keras.callbacks.EarlyStopping(monitor='val_accuracy', patience=10, restore_best_weights=True),
+            tf.keras.callbacks.ModelCheckpoint(args.out, monitor='val_accuracy', save_best_only=True),
+        ]
+    model.fit(train_ds, validation_data=val_ds if len(val_starts) else None,
+              epochs=args.epochs, callbacks=callbacks)
+    model.save(args.out)
+
+    labels_path = os.path.splitext(args.out)[0] + '_labels.json'
+    with open(labels_path, 'w') as f:
+        json.dump({'classes': classes.tolist(), 'window': args.window}, f)
+
+    print("\nConverting to TensorFlow.js format...")
+    export_tfjs(model, args.tfjs_out)
+
+    print(f"\n✅ Temporal model saved as '{args.out}', labels in '{labels_path}'")
+    print(f"✅ TensorFlow.js model saved in '{args.tfjs_out}'")
+
+
+if __name__ == '__main__':
+    main()
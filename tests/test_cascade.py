@@ -0,0 +1,30 @@
+import numpy as np
+from cascade import cascade_curve, calibrate_threshold, top1_margin
+
+
+def random_probs(rng, n, num_classes):
+    logits = rng.normal(0, 2, (n, num_classes))
+    probs = np.exp(logits) / np.exp(logits).sum(axis=1, keepdims=True)
+    return np.round(probs, 2)  # rounding makes tied margins
+
+
+def brute_force(fast_probs, full_probs, labels, threshold):
+    accepted = top1_margin(fast_probs) >= threshold
+    pred = np.where(accepted, np.argmax(fast_probs, axis=1), np.argmax(full_probs, axis=1))
+    return accepted.mean(), np.mean(pred == labels)
+
+
+def test_cascade_curve_matches_brute_force():
+    rng = np.random.default_rng(0)
+    labels = rng.integers(0, 4, 300)
+    fast_probs, full_probs = random_probs(rng, 300, 4), random_probs(rng, 300, 4)
+    thresholds, accept_rates, accuracies = cascade_curve(fast_probs, full_probs, labels)
+
+    assert np.isinf(thresholds[0]) and accept_rates[0] == 0 and accept_rates[-1] == 1
+    for threshold, rate, accuracy in zip(thresholds, accept_rates, accuracies):
+        expected_rate, expected_accuracy = brute_force(fast_probs, full_probs, labels, threshold)
+        assert np.isclose(rate, expected_rate) and np.isclose(accuracy, expected_accuracy)
+
+    threshold, rate, accuracy = calibrate_threshold(fast_probs, full_probs, labels, accuracies[0] - 0.02)
+    assert accuracy >= accuracies[0] - 0.02
+    assert np.isclose(brute_force(fast_probs, full_probs, labels, threshold)[0], rate)
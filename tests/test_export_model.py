@@ -0,0 +1,38 @@
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras import layers
+from export_model import fold_batchnorm
+from pose_normalization import PoseNormalization, MOVENET_LAYOUT
+
+
+def randomize_batchnorm(model, rng):
+    """Non-trivial moving statistics, as after training"""
+    for layer in model.layers:
+        if isinstance(layer, layers.BatchNormalization):
+            size = layer.get_weights()[0].shape
+            layer.set_weights([rng.uniform(0.5, 2.0, size), rng.normal(0, 0.5, size),
+                               rng.normal(0, 0.5, size), rng.uniform(0.5, 2.0, size)])
+
+
+def test_fold_batchnorm_matches_the_original_model():
+    rng = np.random.default_rng(0)
+    # The layer order of training/train_model.py's classifier
+    model = tf.keras.Sequential([
+        layers.Input(shape=(51,)),
+        PoseNormalization(num_joints=17, **MOVENET_LAYOUT),
+        layers.BatchNormalization(),
+        layers.Dense(32, activation='relu'),
+        layers.Dropout(0.3),
+        layers.BatchNormalization(),
+        layers.Dense(16, activation='relu'),
+        layers.Dropout(0.3),
+        layers.BatchNormalization(),
+        layers.Dense(5, activation='softmax'),
+    ])
+    randomize_batchnorm(model, rng)
+    folded = fold_batchnorm(model)
+
+    X = rng.random((64, 51)).astype(np.float32)
+    np.testing.assert_allclose(folded.predict(X, verbose=0), model.predict(X, verbose=0), atol=1e-5)
+    assert not any(isinstance(l, (layers.BatchNormalization, layers.Dropout)) for l in folded.layers)
+    assert isinstance(folded.layers[1], PoseNormalization)
@@ -0,0 +1,40 @@
+import os
+import numpy as np
+from PIL import Image
+from frame_cache import build_frame_cache, frames_path
+
+
+def write_gif(path, num_frames=3, size=(32, 24)):
+    rng = np.random.default_rng(0)
+    frames = [Image.fromarray(rng.integers(0, 255, size + (3,), dtype=np.uint8)) for _ in range(num_frames)]
+    frames[0].save(path, save_all=True, append_images=frames[1:], duration=100)
+
+
+def test_removed_sources_are_pruned(tmp_path):
+    input_dir, cache_dir = tmp_path / 'gifs', tmp_path / 'cache'
+    input_dir.mkdir()
+    write_gif(input_dir / 'squat.gif')
+    write_gif(input_dir / 'lunge.gif')
+    cache = build_frame_cache(str(input_dir), str(cache_dir), size=(16, 16), workers=1)
+    assert cache.files == ['lunge.gif', 'squat.gif']
+    assert cache.frames('squat.gif').shape == (3, 16, 16, 3)
+    stale = frames_path('lunge.gif', str(cache_dir))
+    assert os.path.exists(stale)
+
+    os.remove(input_dir / 'lunge.gif')
+    cache = build_frame_cache(str(input_dir), str(cache_dir), size=(16, 16), workers=1)
+    assert cache.files == ['squat.gif']
+    assert not os.path.exists(stale)
+    assert 'lunge.gif' not in cache.manifest.entries
+    assert cache.is_fresh(str(input_dir / 'squat.gif'))
+
+
+def test_sources_differing_by_extension_do_not_collide(tmp_path):
+    input_dir, cache_dir = tmp_path / 'gifs', tmp_path / 'cache'
+    input_dir.mkdir()
+    write_gif(input_dir / 'squat.gif', num_frames=3)
+    write_gif(input_dir / 'squat.GIF', num_frames=5)
+    cache = build_frame_cache(str(input_dir), str(cache_dir), size=(16, 16), workers=1)
+    assert frames_path('squat.gif', str(cache_dir)) != frames_path('squat.GIF', str(cache_dir))
+    assert len(cache.frames('squat.gif')) == 3 and len(cache.frames('squat.GIF')) == 5
+    assert cache.is_fresh(str(input_dir / 'squat.gif')) and cache.is_fresh(str(input_dir / 'squat.GIF'))
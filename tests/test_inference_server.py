@@ -0,0 +1,46 @@
+import json
+import threading
+import urllib.request
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras import layers
+from inference_server import MicroBatcher, InferenceServer, make_handler, model_layout
+from pose_normalization import PoseNormalization, MOVENET_LAYOUT
+from reference_index import build_keypoint_reference_index
+
+
+def test_movenet_request_gets_a_reference_pose(tmp_path):
+    rng = np.random.default_rng(0)
+    keypoints_dir = tmp_path / 'keypoints'
+    keypoints_dir.mkdir()
+    for exercise in ['lunge', 'squat']:
+        poses = rng.random((20, 17, 3)).astype(np.float32)
+        poses[..., 2] = 0.9
+        np.save(keypoints_dir / f"{exercise}_keypoints.npy", poses)
+    index = build_keypoint_reference_index(str(keypoints_dir))
+
+    model = tf.keras.Sequential([layers.Input(shape=(51,)), PoseNormalization(num_joints=17, **MOVENET_LAYOUT),
+                                 layers.Dense(2, activation='softmax')])
+    layout = model_layout(model)
+    server = InferenceServer(('127.0.0.1', 0), make_handler(MicroBatcher(model), ['lunge', 'squat'],
+                                                            {index.layout: index}, layout))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        pose = rng.random((17, 3)).astype(np.float32)
+        pose[:, 2] = 0.9
+        request = urllib.request.Request(
+            f"http://127.0.0.1:{server.server_address[1]}/predict",
+            data=json.dumps({'pose': pose.tolist(), 'layout': 'movenet', 'exercise': 'squat'}).encode(),
+            headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request) as response:
+            body = json.load(response)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert layout == 'movenet'
+    reference, deltas = np.array(body['referencePose']), np.array(body['jointDeltas'])
+    assert reference.shape == deltas.shape == (17, 3)
+    assert not np.allclose(reference, pose)
+    np.testing.assert_allclose(reference - pose, deltas, atol=1e-5)
+    assert np.abs(deltas[:, :2]).max() > 0 and not deltas[:, 2].any()
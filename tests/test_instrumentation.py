@@ -0,0 +1,19 @@
+import instrumentation
+
+
+def test_nested_span_keeps_outer_alloc_peak():
+    instrumentation.reset()
+    instrumentation.enable(memory=True)
+    try:
+        with instrumentation.span('outer'):
+            big = bytearray(20_000_000)
+            del big
+            with instrumentation.span('inner'):
+                small = bytearray(1_000_000)
+                del small
+    finally:
+        instrumentation.disable()
+    stats = instrumentation.summary()
+    # The inner span reset tracemalloc's peak after the 20 MB buffer was freed
+    assert stats['outer']['alloc_peak_mb'] >= 19.9
+    assert 0.9 <= stats['inner']['alloc_peak_mb'] < 19.9
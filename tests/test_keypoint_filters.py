@@ -0,0 +1,39 @@
+import numpy as np
+from keypoint_filters import moving_average, ema_filter, EMA_ALPHA, EMA_MIN_SCORE
+
+
+def random_keypoints(num_frames, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.random((num_frames, 17 * 3)).astype(np.float32)
+
+
+def reference_moving_average(keypoints, window):
+    """The per-frame loop moving_average replaced"""
+    half = window // 2
+    return np.array([np.mean(keypoints[max(0, i - half):i + half + 1], axis=0)
+                     for i in range(len(keypoints))])
+
+
+def reference_ema(keypoints, alpha=EMA_ALPHA, min_score=EMA_MIN_SCORE):
+    """smoothKeypoints in public/app.js, one frame at a time"""
+    joints = keypoints.reshape(len(keypoints), -1, 3).astype(np.float64)
+    smoothed = joints.copy()
+    for t in range(1, len(joints)):
+        keep = joints[t, :, 2] >= min_score
+        smoothed[t, keep, :2] = (1 - alpha) * joints[t, keep, :2] + alpha * smoothed[t - 1, keep, :2]
+    return smoothed.reshape(keypoints.shape)
+
+
+def test_moving_average_matches_loop():
+    keypoints = random_keypoints(50)
+    for window in [1, 3, 5, 8]:
+        np.testing.assert_allclose(moving_average(keypoints, window),
+                                   reference_moving_average(keypoints, window), atol=1e-5)
+
+
+def test_ema_filter_matches_loop():
+    # Long enough to span several closed-form blocks in _ema_scan
+    keypoints = random_keypoints(2000)
+    for alpha in [EMA_ALPHA, 0.05, 0.9]:
+        np.testing.assert_allclose(ema_filter(keypoints, alpha=alpha),
+                                   reference_ema(keypoints, alpha=alpha), atol=1e-5)
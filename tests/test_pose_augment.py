@@ -0,0 +1,45 @@
+import numpy as np
+from pose_augment import X_CHANNEL, mirror, scale, rotate, pose_centers, make_tf_augment
+
+NOSE, LEFT_SHOULDER, RIGHT_SHOULDER, LEFT_ANKLE, RIGHT_ANKLE = 0, 5, 6, 15, 16
+
+
+def standing_pose():
+    """One upright MoveNet pose, [y, x, score] per joint, y growing downwards"""
+    rng = np.random.default_rng(0)
+    pose = np.zeros((1, 17, 3), dtype=np.float32)
+    pose[0, :, 0] = np.linspace(0.1, 0.9, 17)  # head at the top, ankles at the bottom
+    pose[0, :, 1] = 0.4 + 0.1 * rng.random(17)
+    pose[0, 1::2, 1] -= 0.1  # left joints (odd COCO indices) on one side
+    pose[0, 2::2, 1] += 0.1
+    pose[0, :, 2] = 0.9
+    return pose
+
+
+def check_mirrored(pose, mirrored):
+    # Vertical order is kept: the head stays above the ankles
+    assert mirrored[0, NOSE, 0] < mirrored[0, LEFT_ANKLE, 0]
+    # Each joint takes its mirror joint's height and flipped x
+    np.testing.assert_allclose(mirrored[0, LEFT_SHOULDER, 0], pose[0, RIGHT_SHOULDER, 0])
+    np.testing.assert_allclose(mirrored[0, LEFT_SHOULDER, X_CHANNEL], 1 - pose[0, RIGHT_SHOULDER, X_CHANNEL],
+                               atol=1e-6)
+    np.testing.assert_allclose(mirrored[..., 2], pose[..., 2])
+
+
+def test_mirror_keeps_vertical_order():
+    pose = standing_pose()
+    check_mirrored(pose, mirror(pose))
+
+
+def test_tf_mirror_keeps_vertical_order():
+    pose = standing_pose()
+    augment = make_tf_augment(17, noise_std=0.0, scale_range=(1.0, 1.0), max_angle=0.0, mirror_prob=1.0)
+    mirrored, _ = augment(pose.reshape(1, -1), np.zeros(1))
+    check_mirrored(pose, mirrored.numpy().reshape(1, 17, 3))
+
+
+def test_scale_and_rotate_keep_pose_center():
+    poses = np.repeat(standing_pose(), 8, axis=0)
+    rng = np.random.default_rng(1)
+    for augmented in [scale(poses, rng), rotate(poses, rng)]:
+        np.testing.assert_allclose(pose_centers(augmented), pose_centers(poses), atol=1e-6)
@@ -0,0 +1,28 @@
+import numpy as np
+from pose_features import PoseFeatures, pose_features, frame_pairs, joint_angles, NUM_JOINTS
+
+
+def random_frames(num_frames=40, seed=0):
+    return np.random.default_rng(seed).random((num_frames, NUM_JOINTS * 3)).astype(np.float32)
+
+
+def test_layer_matches_numpy():
+    frames = random_frames()
+    expected = pose_features(frames)
+    actual = PoseFeatures()(frame_pairs(frames, [(0, len(frames))])).numpy()
+    np.testing.assert_allclose(actual, expected, atol=1e-5)
+
+
+def test_low_score_joint_zeroes_its_features():
+    joints = random_frames().reshape(-1, NUM_JOINTS, 3)
+    joints[..., 2] = 1.0
+    features = pose_features(joints)
+    np.testing.assert_allclose(features[:, :8] * np.pi, joint_angles(joints), atol=1e-5)
+
+    joints[:, 13, 2] = 0.1  # left knee
+    masked = pose_features(joints)
+    # hip (5, 11, 13) and knee (11, 13, 15) angles and velocities; thigh and shin ratios
+    for column in [4, 6, 8 + 4, 8 + 6, 16 + 4, 16 + 6]:
+        assert not masked[:, column].any()
+    # the right leg is untouched
+    np.testing.assert_array_equal(masked[:, 7], features[:, 7])
@@ -0,0 +1,23 @@
+import numpy as np
+from pose_normalization import PoseNormalization, normalize_pose_array, H36M_LAYOUT, MOVENET_LAYOUT
+
+
+def test_layer_matches_numpy():
+    rng = np.random.default_rng(0)
+    poses = rng.random((32, 17 * 3)).astype(np.float32)
+    for layout in [H36M_LAYOUT, MOVENET_LAYOUT]:
+        expected = normalize_pose_array(poses, **layout)
+        actual = PoseNormalization(num_joints=17, **layout)(poses).numpy()
+        np.testing.assert_allclose(actual, expected, atol=1e-5)
+
+
+def test_low_score_joints_are_zeroed_and_scores_kept():
+    rng = np.random.default_rng(1)
+    joints = rng.random((8, 17, 3)).astype(np.float32)
+    joints[..., 2] = 0.9
+    joints[:, 0, 2] = 0.1
+    normalized = normalize_pose_array(joints.reshape(8, -1), **MOVENET_LAYOUT).reshape(8, 17, 3)
+    assert not normalized[:, 0, :2].any()
+    np.testing.assert_array_equal(normalized[..., 2], joints[..., 2])
+    # Unit radius over the kept joints
+    np.testing.assert_allclose(np.linalg.norm(normalized[..., :2], axis=-1).max(axis=1), 1, atol=1e-5)
@@ -0,0 +1,49 @@
+import numpy as np
+from pose_normalization import normalize_pose_array
+from reference_index import (normalize_poses, reliable_joints, coord_mask, build_keypoint_reference_index,
+                             load_reference_index, LAYOUTS)
+
+
+def movenet_poses(n, seed=0):
+    rng = np.random.default_rng(seed)
+    poses = rng.random((n, 17, 3)).astype(np.float32)
+    poses[..., 2] = np.where(rng.random((n, 17)) < 0.2, 0.1, 0.9)
+    return poses
+
+
+def write_keypoints(keypoints_dir, exercises=('lunge', 'squat'), frames=30):
+    keypoints_dir.mkdir()
+    for i, exercise in enumerate(exercises):
+        np.save(keypoints_dir / f"{exercise}_keypoints.npy", movenet_poses(frames, seed=i))
+
+
+def test_normalize_poses_matches_pose_normalization():
+    poses = movenet_poses(16)
+    for layout in ['h36m', 'movenet']:
+        normalized, centers, scales = normalize_poses(poses, layout)
+        np.testing.assert_allclose(normalized.reshape(16, -1),
+                                   normalize_pose_array(poses.reshape(16, -1), **LAYOUTS[layout]), atol=1e-5)
+        # reliable positions map back to the input
+        back = normalized * scales + centers
+        kept = reliable_joints(poses, layout)[..., None] * coord_mask(layout) > 0
+        np.testing.assert_allclose(np.where(kept, back, 0), np.where(kept, poses, 0), atol=1e-5)
+
+
+def test_movenet_query_matches_brute_force(tmp_path):
+    write_keypoints(tmp_path / 'keypoints')
+    index = build_keypoint_reference_index(str(tmp_path / 'keypoints'))
+    index.save(tmp_path / 'index')
+    index = load_reference_index(tmp_path / 'index')
+    assert index.layout == 'movenet' and index.exercises == ['lunge', 'squat']
+
+    queries = movenet_poses(5, seed=7)
+    match = index.query('squat', queries)
+    refs = np.asarray(index.poses[index._rows('squat')]).reshape(-1, 17, 3)
+    normalized, _, _ = normalize_poses(queries, 'movenet')
+    reliable = reliable_joints(queries, 'movenet')[:, None, :, None]
+    diff = (normalized[:, None, :, :2] - refs[None, :, :, :2]) * reliable
+    distances = np.sqrt(np.sum(diff**2, axis=(2, 3)))
+    np.testing.assert_array_equal(match['index'], np.argmin(distances, axis=1))
+    np.testing.assert_allclose(match['distance'], distances.min(axis=1), atol=1e-4)
+    np.testing.assert_allclose(match['reference'] - queries, match['deltas'], atol=1e-6)
+    assert not match['deltas'][..., 2].any()
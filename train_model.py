@@ -1,10 +1,16 @@
 import os
-import numpy as np
+import argparse
 import tensorflow as tf
 from tensorflow.keras import layers, models
 import json
 import logging
 from pathlib import Path
+from pose_store import open_pose_store, pose_store_exists
+from pose_dataset import pose_store_dataset, train_val_datasets
+from fast_training import (add_fast_args, setup_fast_training, scaled_learning_rate, with_warmup,
+                           ThroughputLogger)
+from instrumentation import span, add_trace_args, setup_tracing, finish_tracing, keras_callback
+from pose_normalization import PoseNormalization, normalize_pose_array, H36M_LAYOUT
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -25,10 +31,6 @@ class Dataset:
         
         if len(self.X) == 0:
             raise ValueError("No data loaded from dataset")
-            
-        # Convert to numpy arrays
-        self.X = np.array(self.X)
-        self.y = np.array(self.y)
         
         # Normalize the data
         self._normalize_data()
@@ -37,61 +39,74 @@ class Dataset:
         logger.info(f"Found {self.num_exercises} unique exercises")
         
     def _load_mmfit_data(self):
-        """Load data from processed mm-fit dataset"""
-        mmfit_file = self.data_dir / 'processed_mmfit.json'
-        if not mmfit_file.exists():
+        """Load data from the processed mm-fit pose store"""
+        store_dir = self.data_dir / 'processed_mmfit'
+        if not pose_store_exists(store_dir):
+            if (self.data_dir / 'processed_mmfit.json').exists():
+                logger.warning("Found legacy processed_mmfit.json; convert it with `python pose_store.py`")
             logger.warning("Processed mm-fit data not found")
             return
             
         try:
-            with open(mmfit_file, 'r') as f:
-                data = json.load(f)
-                
-            # Create exercise mapping
-            unique_exercises = sorted(list(set(item['exercise'] for item in data)))
-            self.exercise_mapping = {ex: i for i, ex in enumerate(unique_exercises)}
-            self.num_exercises = len(unique_exercises)
+            # Memory-mapped: nothing is read until the arrays are touched
+            store = open_pose_store(store_dir)
+            
+            self.exercise_mapping = {ex: i for i, ex in enumerate(store.exercises)}
+            self.num_exercises = len(store.exercises)
             
             logger.info(f"Exercise mapping: {self.exercise_mapping}")
             
-            for item in data:
-                pose = np.array(item['pose'])
-                exercise_idx = self.exercise_mapping[item['exercise']]
-                
-                # Flatten the pose and append exercise index
-                pose_flat = pose.reshape(-1)  # Shape: (51,) for 17 joints * 3 coordinates
-                self.X.append(pose_flat)
-                
-                # Create one-hot encoded exercise label
-                exercise_label = np.zeros(self.num_exercises)
-                exercise_label[exercise_idx] = 1
-                self.y.append(exercise_label)
+            # Flatten the poses, shape: (N, 51) for 17 joints * 3 coordinates
+            self.X = store.poses.reshape(len(store), -1)
+            
+            # Sparse exercise labels
+            self.y = store.labels
                 
-            logger.info(f"Loaded {len(data)} poses from mm-fit dataset")
+            logger.info(f"Loaded {len(store)} poses from mm-fit dataset")
         except Exception as e:
             logger.error(f"Error loading mm-fit data: {str(e)}")
             
     def _normalize_data(self):
-        """Normalize pose data to be scale and translation invariant"""
-        # Center around hip joint (assuming it's the first joint)
-        hip = self.X[:, :3]  # First joint (x,y,z)
-        self.X = self.X.reshape(-1, 17, 3)  # Reshape to (N, 17, 3)
-        self.X = self.X - hip[:, np.newaxis, :]  # Center around hip
+        """Normalize pose data to be scale and translation invariant.
+
+        Models from create_model normalize their input themselves; this gives
+        the same (N, 51) values for code that works on the arrays directly.
+        """
+        self.X = normalize_pose_array(self.X, **H36M_LAYOUT)
+
+    def load_tf_data(self, batch_size=32, validation_split=0.2, shuffle_buffer=10000):
+        """Stream the pose store as (train, validation) tf.data pipelines.
+
+        Poses are left raw: the PoseNormalization layer at the input of
+        create_model's model normalizes them, in training and in serving.
+        """
+        store_dir = self.data_dir / 'processed_mmfit'
+        if not pose_store_exists(store_dir):
+            raise ValueError("No data loaded from dataset")
         
-        # Scale to unit size
-        max_dist = np.max(np.sqrt(np.sum(self.X**2, axis=2)))
-        self.X = self.X / max_dist
+        store = open_pose_store(store_dir)
+        if len(store) == 0:
+            raise ValueError("No data loaded from dataset")
+        self.exercise_mapping = {ex: i for i, ex in enumerate(store.exercises)}
+        self.num_exercises = len(store.exercises)
         
-        # Flatten back to (N, 51)
-        self.X = self.X.reshape(-1, 51)
+        logger.info(f"Exercise mapping: {self.exercise_mapping}")
+        logger.info(f"Streaming {len(store)} poses from mm-fit dataset")
+        
+        dataset, _ = pose_store_dataset(store_dir)
+        return train_val_datasets(dataset, validation_split, batch_size, shuffle_buffer)
 
-def create_model(num_exercises):
+def create_model(num_exercises, learning_rate=0.001, jit_compile=False):
     """Create a model for exercise classification"""
     # Input layer for pose
     pose_input = layers.Input(shape=(51,), name='pose_input')
     
+    # Hip-centered, unit-scale pose; saved with the model so serving matches
+    # (kept in float32 under a mixed precision policy)
+    x = PoseNormalization(**H36M_LAYOUT, dtype='float32', name='pose_normalization')(pose_input)
+    
     # Hidden layers
-    x = layers.Dense(256, activation='relu')(pose_input)
+    x = layers.Dense(256, activation='relu')(x)
     x = layers.BatchNormalization()(x)
     x = layers.Dropout(0.3)(x)
     
@@ -104,7 +119,9 @@ def create_model(num_exercises):
     x = layers.Dropout(0.3)(x)
     
     # Output layer for exercise classification
-    exercise_output = layers.Dense(num_exercises, activation='softmax', name='exercise_output')(x)
+    # (kept in float32 under a mixed precision policy)
+    exercise_output = layers.Dense(num_exercises, activation='softmax', dtype='float32',
+                                   name='exercise_output')(x)
     
     # Create model
     model = models.Model(
@@ -114,57 +131,73 @@ def create_model(num_exercises):
     
     # Compile model with classification loss and metrics
     model.compile(
-        optimizer='adam',
-        loss='categorical_crossentropy',
-        metrics=['accuracy']
+        optimizer=tf.keras.optimizers.Adam(learning_rate=learning_rate),
+        loss='sparse_categorical_crossentropy',
+        metrics=['accuracy'],
+        jit_compile=jit_compile
     )
     
     return model
 
-def main():
+def main(argv=None):
+    parser = add_fast_args(argparse.ArgumentParser(description='Train the mm-fit exercise classifier'))
+    parser.add_argument('--data-dir', default='data', help='Directory holding processed_mmfit/')
+    parser.add_argument('--out-dir', default='models')
+    add_trace_args(parser)
+    args = parser.parse_args(argv)
+    batch_size = setup_fast_training(args)
+    setup_tracing(args)
+    
     # Create dataset instance
-    dataset = Dataset()
+    dataset = Dataset(args.data_dir)
     
     try:
-        # Load and preprocess data
-        dataset.load_data()
+        # Stream normalized data from the pose store
+        with span('load'):
+            train_ds, val_ds = dataset.load_tf_data(batch_size=batch_size)
         
         # Create and train model
-        model = create_model(dataset.num_exercises)
+        model = create_model(dataset.num_exercises,
+                             learning_rate=with_warmup(scaled_learning_rate(0.001, batch_size), batch_size),
+                             jit_compile=args.fast)
         
         # Create models directory if it doesn't exist
-        os.makedirs('models', exist_ok=True)
+        os.makedirs(args.out_dir, exist_ok=True)
         
         # Train the model
-        model.fit(
-            dataset.X,
-            dataset.y,  # Exercise labels
-            epochs=50,
-            batch_size=32,
-            validation_split=0.2,
-            callbacks=[
-                tf.keras.callbacks.ModelCheckpoint(
-                    'models/exercise_classification_model.h5',
-                    save_best_only=True,
-                    monitor='val_accuracy'
-                ),
-                tf.keras.callbacks.EarlyStopping(
-                    monitor='val_accuracy',
-                    patience=5,
-                    restore_best_weights=True
-                )
-            ]
-        )
+        with span('fit'):
+            model.fit(
+                train_ds,
+                validation_data=val_ds,
+                epochs=50,
+                callbacks=[
+                    tf.keras.callbacks.ModelCheckpoint(
+                        os.path.join(args.out_dir, 'exercise_classification_model.h5'),
+                        save_best_only=True,
+                        monitor='val_accuracy'
+                    ),
+                    tf.keras.callbacks.EarlyStopping(
+                        monitor='val_accuracy',
+                        patience=5,
+                        restore_best_weights=True
+                    ),
+                    ThroughputLogger(batch_size),
+                    keras_callback()
+                ]
+            )
         
         # Save exercise mapping
-        with open('models/exercise_mapping.json', 'w') as f:
-            json.dump(dataset.exercise_mapping, f, indent=2)
+        with span('export'):
+            with open(os.path.join(args.out_dir, 'exercise_mapping.json'), 'w') as f:
+                json.dump(dataset.exercise_mapping, f, indent=2)
         
         logger.info("Model training completed successfully")
         
     except Exception as e:
         logger.error(f"Error during model training: {str(e)}")
         raise
+    finally:
+        finish_tracing(args)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
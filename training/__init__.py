@@ -0,0 +1,3 @@
+# Data and training scripts. They import the modules at the repo root, so run
+# them from the root as modules, e.g. `python -m training.train_model_v2`, or
+# through formsense.py; both put the root on sys.path.
@@ -1,7 +1,4 @@
-import numpy as np
-import json
+from convert_labels import export_labels
 
-labels = np.load("exercise_labels.npy")
-with open("public/exercise_labels.json", "w") as f:
-    json.dump(labels.tolist(), f)
-print("✅ Converted to exercise_labels.json")
+if __name__ == "__main__":
+    export_labels('exercise_labels.npy', 'public/exercise_labels.json')
@@ -1,43 +1,55 @@
 import os
-import cv2
+import argparse
+from functools import partial
 import numpy as np
 import mediapipe as mp
-from tqdm import tqdm
 
-# Initialize MediaPipe Pose
+from preprocess_cache import PreprocessCache
+from worker_pool import imap_safe
+from frame_source import iter_frames, list_media_files, add_sampling_args
+from keyframes import add_keyframe_args, keyframe_params, make_sampler
+
+# Bump when the extraction output changes so cached keypoints are rebuilt
+EXTRACTOR_VERSION = 'mediapipe-1'
+POSE_PARAMS = {
+    'static_image_mode': False,
+    'model_complexity': 2,
+    'enable_segmentation': False,
+    'min_detection_confidence': 0.5,
+    'min_tracking_confidence': 0.5
+}
+
 mp_pose = mp.solutions.pose
-pose = mp_pose.Pose(
-    static_image_mode=False,
-    model_complexity=2,
-    enable_segmentation=False,
-    min_detection_confidence=0.5,
-    min_tracking_confidence=0.5
-)
+pose = None
 
-def extract_keypoints_from_gif(gif_path, output_dir):
-    # Read GIF
-    cap = cv2.VideoCapture(gif_path)
-    frames = []
-    while cap.isOpened():
-        ret, frame = cap.read()
-        if not ret:
-            break
-        frames.append(frame)
-    cap.release()
-    
-    if not frames:
-        print(f"Warning: No frames found in {gif_path}")
-        return
-    
-    # Process each frame
+def init_pose():
+    """Initialize this process's MediaPipe Pose instance"""
+    global pose
+    pose = mp_pose.Pose(**POSE_PARAMS)
+
+def keypoints_path(gif_path, output_dir):
+    return os.path.join(output_dir, os.path.splitext(os.path.basename(gif_path))[0] + '_keypoints.npy')
+
+def extract_keypoints_from_gif(gif_path, output_dir, stride=1, target_fps=None, keyframes=None):
+    # Frames are decoded lazily (as RGB) and processed as they arrive, so
+    # long videos do not have to fit in memory
+    sampler = make_sampler(keyframes)
+    num_frames = 0
     keypoints_list = []
-    for frame in frames:
-        # Convert BGR to RGB
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    keypoints = None
+    for frame_rgb in iter_frames(gif_path, stride=stride, target_fps=target_fps):
+        num_frames += 1
+        
+        # Near-duplicate frames reuse the last keyframe's keypoints, or are dropped
+        if sampler is not None and not sampler.is_keyframe(frame_rgb):
+            if keyframes['keyframes'] == 'reuse' and keypoints is not None:
+                keypoints_list.append(keypoints)
+            continue
         
         # Process the frame
         results = pose.process(frame_rgb)
         
+        keypoints = None
         if results.pose_landmarks:
             # Extract keypoints (x, y, z)
             keypoints = []
@@ -45,26 +57,69 @@ def extract_keypoints_from_gif(gif_path, output_dir):
                 keypoints.extend([landmark.x, landmark.y, landmark.z])
             keypoints_list.append(keypoints)
     
+    if not num_frames:
+        print(f"Warning: No frames found in {gif_path}")
+        return False
+    
     if keypoints_list:
         # Save keypoints
-        output_path = os.path.join(output_dir, os.path.splitext(os.path.basename(gif_path))[0] + '_keypoints.npy')
+        output_path = keypoints_path(gif_path, output_dir)
         np.save(output_path, np.array(keypoints_list))
         print(f"Saved keypoints to {output_path}")
+        return True
+    
+    return False
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Extract MediaPipe keypoints from training GIFs')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Worker processes, each with its own MediaPipe instance')
+    parser.add_argument('--input-dir', default='training/gifs',
+                        help='Directory of GIFs and/or MP4/WebM videos')
+    parser.add_argument('--output-dir', default='training/keypoints')
+    add_sampling_args(parser)
+    add_keyframe_args(parser)
+    args = parser.parse_args(argv)
 
-def main():
     # Create output directory
-    output_dir = "training/keypoints"
+    output_dir = args.output_dir
     os.makedirs(output_dir, exist_ok=True)
     
     # Process all GIFs
-    gif_dir = "training/gifs"
-    gif_files = [f for f in os.listdir(gif_dir) if f.endswith('.gif')]
+    gif_dir = args.input_dir
+    gif_files = list_media_files(gif_dir)
+    
+    # Skip GIFs whose keypoints are up to date; drop keypoints of removed GIFs
+    cache = PreprocessCache(os.path.join(output_dir, '.manifest.json'),
+                            version=EXTRACTOR_VERSION,
+                            params={**POSE_PARAMS, 'stride': args.stride, 'fps': args.fps,
+                                    **keyframe_params(args)})
+    cache.prune(gif_files)
+    todo = [f for f in gif_files
+            if not cache.is_fresh(f, [os.path.join(gif_dir, f)],
+                                  [keypoints_path(f, output_dir)])]
     
-    print(f"Processing {len(gif_files)} GIFs...")
-    for gif_file in tqdm(gif_files):
-        gif_path = os.path.join(gif_dir, gif_file)
-        extract_keypoints_from_gif(gif_path, output_dir)
+    print(f"Processing {len(todo)} GIFs ({len(gif_files) - len(todo)} cached) "
+          f"with {args.workers} worker(s)...")
+    for gif_file in todo:
+        cache.invalidate(gif_file)
+    failed = []
+    try:
+        gif_paths = [os.path.join(gif_dir, f) for f in todo]
+        results = imap_safe(partial(extract_keypoints_from_gif, output_dir=output_dir,
+                                    stride=args.stride, target_fps=args.fps,
+                                    keyframes=keyframe_params(args)), gif_paths,
+                            workers=args.workers, initializer=init_pose)
+        for gif_path, success, error in results:
+            if error is not None:
+                failed.append((gif_path, error))
+            elif success:
+                cache.record(os.path.basename(gif_path), [gif_path], [keypoints_path(gif_path, output_dir)])
+    finally:
+        cache.save()
     
+    for gif_path, error in failed:
+        print(f"Error processing {gif_path}: {error}")
     print("✅ Keypoint extraction complete!")
 
 if __name__ == "__main__":
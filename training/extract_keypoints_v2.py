@@ -1,18 +1,50 @@
-import cv2
 import numpy as np
 import os
+import argparse
+from functools import partial
 from tqdm import tqdm
-import imageio
 import tensorflow as tf
 import tensorflow_hub as hub
 
+from preprocess_cache import PreprocessCache
+from worker_pool import imap_safe, threads_per_worker
+from frame_source import iter_frames, frame_batches, list_media_files, add_sampling_args
+from frame_cache import open_frame_cache, frame_cache_exists, DEFAULT_CACHE_DIR
+from keyframes import add_keyframe_args, keyframe_params, make_sampler
+from keypoint_filters import smooth_keypoints, SMOOTHING_METHODS
+from instrumentation import span, count, add_trace_args, setup_tracing, finish_tracing
+
+# Bump when the extraction output changes so cached keypoints are rebuilt
+EXTRACTOR_VERSION = 'movenet-3'
+MOVENET_URL = 'https://tfhub.dev/google/movenet/singlepose/thunder/4'
+IMAGE_SIZE = (256, 256)
+SMOOTHING_WINDOW = 3
+# Same EMA as the browser's smoothKeypoints, so training matches serving
+SMOOTHING = 'ema'
+BATCH_SIZE = 32
+
 def load_movenet():
     """Load the MoveNet model from TensorFlow Hub."""
-    model = hub.load('https://tfhub.dev/google/movenet/singlepose/thunder/4')
+    model = hub.load(MOVENET_URL)
     movenet = model.signatures['serving_default']
     return movenet
 
-def process_image(movenet, image, image_size=(256, 256)):
+run_batch = None
+
+def init_worker(num_threads=None):
+    """Load this process's own MoveNet instance"""
+    global run_batch
+    if num_threads:
+        tf.config.threading.set_intra_op_parallelism_threads(num_threads)
+        tf.config.threading.set_inter_op_parallelism_threads(1)
+    run_batch = make_batch_runner(load_movenet())
+
+def extract_worker(gif_path, output_dir, batch_size=BATCH_SIZE, stride=1, target_fps=None, keyframes=None,
+                   smoothing=SMOOTHING, frame_cache=None):
+    return extract_keypoints_from_gif(gif_path, output_dir, run_batch, batch_size, stride, target_fps,
+                                      keyframes, smoothing, frame_cache)
+
+def process_image(movenet, image, image_size=IMAGE_SIZE):
     """Process a single image through MoveNet."""
     img = tf.image.resize_with_pad(tf.expand_dims(image, axis=0), image_size[0], image_size[1])
     input_image = tf.cast(img, dtype=tf.int32)
@@ -25,69 +57,267 @@ def process_image(movenet, image, image_size=(256, 256)):
     keypoints = keypoints[0, 0, :, :3]  # Take only x, y, confidence
     return keypoints.flatten()  # Flatten to [x1, y1, c1, x2, y2, c2, ...]
 
-def extract_keypoints_from_gif(gif_path, output_dir, movenet):
-    """Extract keypoints from a GIF file using MoveNet."""
-    # Read GIF
-    gif = imageio.mimread(gif_path)
-    keypoints_sequence = []
-    
-    # Process each frame
-    for frame in gif:
-        # Convert to RGB if needed
-        if frame.shape[-1] == 4:  # RGBA
-            frame = cv2.cvtColor(frame, cv2.COLOR_RGBA2RGB)
-        
-        # Get keypoints
-        keypoints = process_image(movenet, frame)
-        
-        # Only add if we got valid keypoints
-        if len(keypoints) == 51:  # 17 keypoints * 3 (x, y, confidence)
-            keypoints_sequence.append(keypoints)
+def make_batch_runner(movenet):
+    """Wrap the MoveNet signature so a whole (B, H, W, 3) int32 batch runs in
+    one graph call.
+
+    The Hub singlepose signature only accepts a batch of one, so the frames are
+    mapped through it inside a tf.function instead of one Python call each.
+    """
+    @tf.function(input_signature=[tf.TensorSpec([None, IMAGE_SIZE[0], IMAGE_SIZE[1], 3], tf.int32)])
+    def run(images):
+        return tf.map_fn(
+            lambda image: movenet(tf.expand_dims(image, axis=0))['output_0'][0, 0, :, :3],
+            images,
+            fn_output_signature=tf.float32
+        )
+    return run
+
+def preprocess_frames(frames, image_size=IMAGE_SIZE):
+    """Resize and pad a stack of frames to the MoveNet input in one op"""
+    images = tf.image.resize_with_pad(frames, image_size[0], image_size[1])
+    return tf.cast(images, dtype=tf.int32)
+
+def process_frames(run_batch, frames, batch_size=BATCH_SIZE):
+    """Run MoveNet over an (F, H, W, 3) array or an iterator of frames.
+
+    Frames are consumed batch by batch, so an iterator from iter_frames is
+    decoded while earlier batches are processed and never held in full.
+    Returns (F, 51) keypoints.
+    """
+    keypoints = []
+    batches = iter(frame_batches(frames, batch_size))
+    while True:
+        with span('decode'):
+            batch = next(batches, None)
+        if batch is None:
+            break
+        with span('resize_with_pad'):
+            images = preprocess_frames(tf.convert_to_tensor(batch))
+        with span('movenet', frames=len(batch)):
+            keypoints.append(run_batch(images).numpy())
+    if not keypoints:
+        return np.zeros((0, 51), dtype=np.float32)
+    # Flatten to [x1, y1, c1, x2, y2, c2, ...]
+    return np.concatenate(keypoints).reshape(-1, 51)
+
+def read_frames(gif_path, stride=1, target_fps=None, frame_cache=None):
+    """Frames of a GIF/video: memory-mapped from a FrameCache when it holds
+    them for the file's current contents (already at the MoveNet input
+    size), else decoded lazily"""
+    if frame_cache is not None and gif_path in frame_cache:
+        if frame_cache.is_fresh(gif_path):
+            return frame_cache.frames(gif_path)
+        print(f"⚠️ Cached frames of {gif_path} are stale; decoding it (rerun `formsense frames`)")
+    return iter_frames(gif_path, stride=stride, target_fps=target_fps)
+
+def load_frame_cache(cache_dir, stride, target_fps):
+    """The frame cache in cache_dir if it was built with these settings"""
+    if not cache_dir or not frame_cache_exists(cache_dir):
+        return None
+    frame_cache = open_frame_cache(cache_dir)
+    if (frame_cache.size != tuple(IMAGE_SIZE) or frame_cache.stride != stride
+            or frame_cache.fps != target_fps):
+        print(f"⚠️ Ignoring frame cache {cache_dir}: built with size {frame_cache.size}, "
+              f"stride {frame_cache.stride}, fps {frame_cache.fps}")
+        return None
+    return frame_cache
+
+def keypoints_path(gif_path, output_dir):
+    return os.path.join(output_dir, os.path.splitext(os.path.basename(gif_path))[0] + '_keypoints.npy')
+
+def save_keypoints(keypoints_array, gif_path, output_dir, smoothing=SMOOTHING):
+    """Smooth a (F, 51) keypoint sequence and save it next to the others"""
+    # Apply smoothing to reduce jitter
+    with span('smoothing'):
+        smoothed_keypoints = smooth_keypoints(keypoints_array, smoothing, window=SMOOTHING_WINDOW)
     
-    # Convert to numpy array
-    if keypoints_sequence:
-        keypoints_array = np.array(keypoints_sequence)
-        
-        # Apply smoothing to reduce jitter
-        smoothed_keypoints = np.zeros_like(keypoints_array)
-        window_size = 3
-        
-        for i in range(len(keypoints_array)):
-            start_idx = max(0, i - window_size // 2)
-            end_idx = min(len(keypoints_array), i + window_size // 2 + 1)
-            smoothed_keypoints[i] = np.mean(keypoints_array[start_idx:end_idx], axis=0)
-        
-        # Save keypoints
-        output_path = os.path.join(output_dir, os.path.splitext(os.path.basename(gif_path))[0] + '_keypoints.npy')
+    # Save keypoints
+    output_path = keypoints_path(gif_path, output_dir)
+    with span('np.save'):
         np.save(output_path, smoothed_keypoints)
-        print(f"✅ Saved keypoints to {output_path}")
-        return True
-    
-    return False
+    print(f"✅ Saved keypoints to {output_path}")
+
+def extract_keypoints_from_gif(gif_path, output_dir, run_batch, batch_size=BATCH_SIZE,
+                               stride=1, target_fps=None, keyframes=None, smoothing=SMOOTHING,
+                               frame_cache=None):
+    """Extract keypoints from a GIF or video using batched MoveNet inference.
+
+    Frames are decoded lazily, so memory does not grow with the video length,
+    or read from `frame_cache` (see read_frames).
+    With `keyframes` (see keyframes.keyframe_params) only frames that changed
+    since the last inferred one go through MoveNet.
+    """
+    with span('gif', path=os.path.basename(gif_path)):
+        sampler = make_sampler(keyframes)
+        frames = read_frames(gif_path, stride, target_fps, frame_cache)
+        if sampler is not None:
+            frames = sampler.filter(frames)
+        keypoints_array = process_frames(run_batch, frames, batch_size)
+        if len(keypoints_array) == 0:
+            return False
+        count('frames_inferred', len(keypoints_array))
+        if sampler is not None:
+            keypoints_array = sampler.expand(keypoints_array, keyframes['keyframes'])
+        save_keypoints(keypoints_array, gif_path, output_dir, smoothing)
+    count('frames', len(keypoints_array))
+    return True
+
+def extract_keypoints_pipelined(gif_paths, output_dir, run_batch, batch_size=BATCH_SIZE,
+                                stride=1, target_fps=None, keyframes=None, smoothing=SMOOTHING,
+                                frame_cache=None):
+    """Extract keypoints from several GIFs with decoding overlapped with inference.
 
-def main():
-    print("\nLoading MoveNet model...")
-    movenet = load_movenet()
-    print("✅ Model loaded successfully!")
+    Frames of all GIFs are decoded and resized by a prefetching tf.data
+    pipeline and batched across GIF boundaries. Yields (gif_path, success) in
+    input order.
+    """
+    samplers = {}
+    def frames():
+        for i, gif_path in enumerate(gif_paths):
+            try:
+                gif_frames = read_frames(gif_path, stride, target_fps, frame_cache)
+                sampler = samplers[i] = make_sampler(keyframes)
+                if sampler is not None:
+                    gif_frames = sampler.filter(gif_frames)
+                for frame in gif_frames:
+                    yield i, frame
+            except Exception as e:
+                print(f"Error reading {gif_path}: {str(e)}")
     
+    dataset = tf.data.Dataset.from_generator(
+        frames,
+        output_signature=(tf.TensorSpec([], tf.int32), tf.TensorSpec([None, None, 3], tf.uint8))
+    )
+    dataset = dataset.map(lambda i, frame: (i, preprocess_frames(frame)),
+                          num_parallel_calls=tf.data.AUTOTUNE)
+    dataset = dataset.batch(batch_size).prefetch(tf.data.AUTOTUNE)
+    
+    # Collect per-GIF keypoints; a GIF is complete once a later GIF shows up
+    reported = 0
+    def finish(gif_index, pending):
+        nonlocal reported
+        keypoints_array = np.concatenate(pending)
+        sampler = samplers.pop(gif_index, None)
+        if sampler is not None:
+            keypoints_array = sampler.expand(keypoints_array, keyframes['keyframes'])
+        save_keypoints(keypoints_array, gif_paths[gif_index], output_dir, smoothing)
+        # GIFs without any decoded frames are reported as failures
+        results = [(gif_paths[j], False) for j in range(reported, gif_index)]
+        results.append((gif_paths[gif_index], True))
+        reported = gif_index + 1
+        return results
+    
+    current, pending = None, []
+    for indices, images in dataset:
+        indices = indices.numpy()
+        with span('movenet', frames=len(indices)):
+            keypoints = run_batch(images).numpy().reshape(len(indices), -1)
+        count('frames', len(indices))
+        for i in np.unique(indices):
+            if current is not None and i != current:
+                yield from finish(current, pending)
+                pending = []
+            current = i
+            pending.append(keypoints[indices == i])
+    if current is not None:
+        yield from finish(current, pending)
+    for j in range(reported, len(gif_paths)):
+        yield gif_paths[j], False
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Extract MoveNet keypoints from training GIFs')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                        help='Frames per MoveNet batch')
+    parser.add_argument('--prefetch', action='store_true',
+                        help='Decode GIFs in a tf.data pipeline overlapped with inference')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Worker processes, each with its own MoveNet instance')
+    parser.add_argument('--input-dir', default='training/gifs',
+                        help='Directory of GIFs and/or MP4/WebM videos')
+    parser.add_argument('--output-dir', default='training/keypoints')
+    add_sampling_args(parser)
+    parser.add_argument('--smoothing', choices=SMOOTHING_METHODS, default=SMOOTHING,
+                        help="Temporal keypoint filter; 'ema' matches the browser")
+    parser.add_argument('--frame-cache', default=None, metavar='DIR', nargs='?', const=DEFAULT_CACHE_DIR,
+                        help='Read frames from a cache built by `formsense frames` instead of decoding '
+                             f'(default dir {DEFAULT_CACHE_DIR})')
+    add_keyframe_args(parser)
+    # Stage spans are recorded in this process only; with --workers > 1 the
+    # trace shows the per-GIF counters but not the stages inside the workers
+    add_trace_args(parser)
+    args = parser.parse_args(argv)
+    setup_tracing(args)
+
     # Create output directory if it doesn't exist
-    output_dir = 'training/keypoints'
+    output_dir = args.output_dir
     os.makedirs(output_dir, exist_ok=True)
     
     # Get list of GIF files
-    gif_dir = 'training/gifs'
-    gif_files = [f for f in os.listdir(gif_dir) if f.endswith('.gif')]
+    gif_dir = args.input_dir
+    gif_files = list_media_files(gif_dir)
+    frame_cache = load_frame_cache(args.frame_cache, args.stride, args.fps)
+    
+    # Skip GIFs whose keypoints are up to date; drop keypoints of removed GIFs
+    cache = PreprocessCache(
+        os.path.join(output_dir, '.manifest.json'),
+        version=EXTRACTOR_VERSION,
+        params={'model_url': MOVENET_URL, 'image_size': list(IMAGE_SIZE), 'smoothing': args.smoothing,
+                'window_size': SMOOTHING_WINDOW, 'stride': args.stride, 'fps': args.fps, **keyframe_params(args),
+                # Cached frames are letterboxed with PIL rather than TensorFlow
+                **({'frame_cache': True} if frame_cache is not None else {})}
+    )
+    cache.prune(gif_files)
+    todo = [f for f in gif_files
+            if not cache.is_fresh(f, [os.path.join(gif_dir, f)],
+                                  [keypoints_path(f, output_dir)])]
     
-    print(f"\nProcessing {len(gif_files)} GIF files...")
+    print(f"\nProcessing {len(todo)} GIF/video files ({len(gif_files) - len(todo)} cached)...")
+    if not todo:
+        cache.save()
+        return
     
     # Process each GIF file with progress bar
     success_count = 0
-    for gif_file in tqdm(gif_files):
-        gif_path = os.path.join(gif_dir, gif_file)
-        if extract_keypoints_from_gif(gif_path, output_dir, movenet):
-            success_count += 1
+    failed = []
+    gif_paths = [os.path.join(gif_dir, f) for f in todo]
+    for gif_file in todo:
+        cache.invalidate(gif_file)
+    try:
+        if args.prefetch and args.workers <= 1:
+            print("\nLoading MoveNet model...")
+            init_worker()
+            print("✅ Model loaded successfully!")
+            results = ((gif_path, success, None) for gif_path, success in tqdm(
+                extract_keypoints_pipelined(gif_paths, output_dir, run_batch, args.batch_size,
+                                            args.stride, args.fps, keyframe_params(args), args.smoothing,
+                                            frame_cache),
+                total=len(gif_paths)))
+        else:
+            # Each worker loads MoveNet once and takes a share of the GIFs
+            num_threads = threads_per_worker(args.workers) if args.workers > 1 else None
+            results = imap_safe(partial(extract_worker, output_dir=output_dir, batch_size=args.batch_size,
+                                        stride=args.stride, target_fps=args.fps,
+                                        keyframes=keyframe_params(args), smoothing=args.smoothing,
+                                        frame_cache=frame_cache),
+                                gif_paths, workers=args.workers,
+                                initializer=init_worker, initargs=(num_threads,))
+        for gif_path, success, error in results:
+            count('gifs')
+            if error is not None:
+                count('gifs_failed')
+                failed.append((gif_path, error))
+            elif success:
+                cache.record(os.path.basename(gif_path), [gif_path], [keypoints_path(gif_path, output_dir)])
+                success_count += 1
+    finally:
+        cache.save()
     
-    print(f"\n✅ Successfully processed {success_count} out of {len(gif_files)} files")
+    for gif_path, error in failed:
+        print(f"Error processing {gif_path}: {error}")
+    print(f"\n✅ Successfully processed {success_count} out of {len(todo)} files")
+    finish_tracing(args)
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -1,14 +1,11 @@
 import os
-from PIL import Image
-import glob
 import re
+import glob
+import argparse
+from PIL import Image
 
-# === Paths ===
-base_dir = r"C:\Users\abiva\OneDrive\Desktop\FormSenseAI_new"
-input_dir = os.path.join(base_dir, "training", "gifs")
-output_dir = os.path.join(base_dir, "training", "frames")
-
-os.makedirs(output_dir, exist_ok=True)
+from frame_cache import build_frame_cache, DEFAULT_CACHE_DIR, FRAME_SIZE
+from frame_source import add_sampling_args
 
 # === Clean filename ===
 def clean_name(name):
@@ -17,22 +14,51 @@ def clean_name(name):
     return name.strip()
 
 # === Process GIFs ===
-for gif_path in glob.glob(os.path.join(input_dir, "*.gif")):
-    original_name = os.path.basename(gif_path)
-    base_name = clean_name(original_name)
-    save_folder = os.path.join(output_dir, base_name)
-    os.makedirs(save_folder, exist_ok=True)
+def gifs_to_frames(input_dir, output_dir):
+    """Save every frame of each GIF in input_dir as JPEGs under output_dir/<gif name>/"""
+    os.makedirs(output_dir, exist_ok=True)
+    for gif_path in sorted(glob.glob(os.path.join(input_dir, "*.gif"))):
+        original_name = os.path.basename(gif_path)
+        base_name = clean_name(original_name)
+        save_folder = os.path.join(output_dir, base_name)
+        os.makedirs(save_folder, exist_ok=True)
+
+        with Image.open(gif_path) as im:
+            frame = 0
+            try:
+                while True:
+                    im.seek(frame)
+                    frame_image = im.convert("RGB")
+                    filename = f"{base_name} {frame + 1} frame.jpg"
+                    frame_image.save(os.path.join(save_folder, filename))
+                    frame += 1
+            except EOFError:
+                print(f"✔️ Done: {frame} frames from '{original_name}'")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Cache the frames of training GIFs/videos as memory-mapped arrays '
+                    '(or dump them as JPEGs with --format jpeg)')
+    parser.add_argument('--format', choices=['cache', 'jpeg'], default='cache',
+                        help="'cache': uint8 (F, H, W, 3) .npy per file, resized for the pose model; "
+                             "'jpeg': one image per frame at the original size")
+    parser.add_argument('--input-dir', default='training/gifs')
+    parser.add_argument('--output-dir', default=None,
+                        help=f'Default {DEFAULT_CACHE_DIR}, or training/frames with --format jpeg')
+    parser.add_argument('--size', type=int, nargs=2, default=list(FRAME_SIZE), metavar=('H', 'W'))
+    add_sampling_args(parser)
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Worker processes (default: one per CPU)')
+    args = parser.parse_args(argv)
+
+    if args.format == 'jpeg':
+        gifs_to_frames(args.input_dir, args.output_dir or 'training/frames')
+        return
+    output_dir = args.output_dir or DEFAULT_CACHE_DIR
+    cache = build_frame_cache(args.input_dir, output_dir, size=tuple(args.size), stride=args.stride,
+                              target_fps=args.fps, workers=args.workers)
+    total = sum(entry['frames'] for entry in cache.entries.values())
+    print(f"✅ Cached {total} frames of {len(cache)} files in {output_dir}")
 
-    with Image.open(gif_path) as im:
-        frame = 0
-        try:
-            while True:
-                im.seek(frame)
-                frame_image = im.convert("RGB")
-                filename = f"{base_name} {frame + 1} frame.jpg"
-                frame_path = os.path.join(save_folder, filename)
-                frame_image.save(frame_path)
-                print(f"✅ Saved: {frame_path}")
-                frame += 1
-        except EOFError:
-            print(f"✔️ Done: {frame} frames from '{original_name}'")
+if __name__ == "__main__":
+    main()
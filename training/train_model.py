@@ -1,47 +1,21 @@
-import os
+import argparse
 import numpy as np
-from sklearn.preprocessing import LabelEncoder
-from sklearn.model_selection import train_test_split
 from tensorflow.keras.models import Sequential
 from tensorflow.keras.layers import Input, Dense, Dropout, BatchNormalization
 from tensorflow.keras.optimizers import Adam
 from tensorflow.keras.callbacks import EarlyStopping, ModelCheckpoint
-import tensorflowjs as tfjs
 
-def load_data():
-    # Load keypoints and labels
-    keypoints_dir = "training/keypoints"
-    X = []
-    y = []
-    
-    for file in os.listdir(keypoints_dir):
-        if file.endswith("_keypoints.npy"):
-            # Load keypoints
-            keypoints = np.load(os.path.join(keypoints_dir, file))
-            
-            # Get label from filename
-            label = file.replace("_keypoints.npy", "")
-            
-            # Add each frame as a separate sample
-            for frame in keypoints:
-                X.append(frame)
-                y.append(label)
-    
-    X = np.array(X)
-    y = np.array(y)
-    
-    # Encode labels
-    label_encoder = LabelEncoder()
-    y_encoded = label_encoder.fit_transform(y)
-    
-    # Save label encoder classes
-    np.save("exercise_labels.npy", label_encoder.classes_)
-    
-    return X, y_encoded, label_encoder.classes_
+from pose_dataset import keypoint_files_dataset, train_val_datasets
+from export_model import export_tfjs
+from pose_normalization import PoseNormalization, MOVENET_LAYOUT
+from fast_training import (add_fast_args, setup_fast_training, scaled_learning_rate, with_warmup,
+                           ThroughputLogger)
 
-def create_model(input_shape, num_classes):
+def create_model(input_shape, num_classes, learning_rate=0.001, jit_compile=False):
     model = Sequential([
         Input(shape=input_shape),
+        # Hip-centered, unit-scale keypoints; exported with the model
+        PoseNormalization(num_joints=input_shape[0] // 3, **MOVENET_LAYOUT, dtype='float32'),
         BatchNormalization(),
         Dense(256, activation='relu'),
         Dropout(0.3),
@@ -52,30 +26,39 @@ def create_model(input_shape, num_classes):
         Dense(64, activation='relu'),
         Dropout(0.3),
         BatchNormalization(),
-        Dense(num_classes, activation='softmax')
+        Dense(num_classes, activation='softmax', dtype='float32')  # float32 under mixed precision
     ])
     
     model.compile(
-        optimizer=Adam(learning_rate=0.001),
+        optimizer=Adam(learning_rate=learning_rate),
         loss='sparse_categorical_crossentropy',
-        metrics=['accuracy']
+        metrics=['accuracy'],
+        jit_compile=jit_compile
     )
     
     return model
 
-def main():
-    # Load and preprocess data
-    print("Loading data...")
-    X, y, labels = load_data()
+def main(argv=None):
+    parser = add_fast_args(argparse.ArgumentParser(description='Train the exercise classifier'))
+    parser.add_argument('--data', default='training/keypoints', help='Keypoint directory')
+    parser.add_argument('--out', default='exercise_classifier.h5')
+    parser.add_argument('--labels-out', default='exercise_labels.npy')
+    parser.add_argument('--tfjs-out', default='public/tfjs_model')
+    args = parser.parse_args(argv)
+    batch_size = setup_fast_training(args)
     
-    # Split data
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42, stratify=y
-    )
+    # Stream keypoints from disk instead of loading them all into memory
+    print("Loading data...")
+    dataset, labels = keypoint_files_dataset(args.data)
+    np.save(args.labels_out, labels)
+    train_ds, val_ds = train_val_datasets(dataset, validation_split=0.2, batch_size=batch_size)
     
     # Create and train model
     print("\nCreating model...")
-    model = create_model(input_shape=(X.shape[1],), num_classes=len(labels))
+    input_dim = dataset.element_spec[0].shape[0]
+    model = create_model(input_shape=(input_dim,), num_classes=len(labels),
+                         learning_rate=with_warmup(scaled_learning_rate(0.001, batch_size), batch_size),
+                         jit_compile=args.fast)
     model.summary()
     
     # Callbacks
@@ -86,34 +69,29 @@ def main():
             restore_best_weights=True
         ),
         ModelCheckpoint(
-            'exercise_classifier.h5',
+            args.out,
             monitor='val_accuracy',
             save_best_only=True
-        )
+        ),
+        ThroughputLogger(batch_size)
     ]
     
     # Train model
     print("\nTraining model...")
     history = model.fit(
-        X_train, y_train,
+        train_ds,
         epochs=50,
-        batch_size=32,
-        validation_data=(X_test, y_test),
+        validation_data=val_ds,
         callbacks=callbacks
     )
     
     # Convert to TensorFlow.js format
     print("\nConverting to TensorFlow.js format...")
-    tfjs.converters.save_keras_model(
-        model,
-        'public/tfjs_model',
-        weight_shard_size_bytes=1024*1024,
-        quantization_dtype_map={'float16': '*'}
-    )
+    export_tfjs(model, args.tfjs_out)
     
-    print("\n✅ Training complete! Model saved as 'exercise_classifier.h5'")
-    print(f"✅ TensorFlow.js model saved in 'public/tfjs_model'")
-    print(f"✅ Labels saved as 'exercise_labels.npy'")
+    print(f"\n✅ Training complete! Model saved as '{args.out}'")
+    print(f"✅ TensorFlow.js model saved in '{args.tfjs_out}'")
+    print(f"✅ Labels saved as '{args.labels_out}'")
 
 if __name__ == "__main__":
     main()
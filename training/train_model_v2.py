@@ -1,88 +1,27 @@
 import numpy as np
 import os
 import json
+import argparse
 import tensorflow as tf
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import LabelEncoder
 from tensorflow.keras.models import Sequential
 from tensorflow.keras.layers import Dense, Dropout, BatchNormalization, Input
 from tensorflow.keras.callbacks import EarlyStopping, ModelCheckpoint
-import tensorflowjs as tfjs
 
-def load_data(keypoints_dir='training/keypoints'):
-    """Load keypoints and labels from the keypoints directory."""
-    X = []
-    y = []
-    
-    for file in os.listdir(keypoints_dir):
-        if file.endswith('_keypoints.npy'):
-            # Load keypoints
-            keypoints = np.load(os.path.join(keypoints_dir, file))
-            X.extend(keypoints)
-            
-            # Extract label from filename
-            label = file.replace('_keypoints.npy', '')
-            y.extend([label] * len(keypoints))
-    
-    # Convert to numpy arrays
-    X = np.array(X)
-    
-    # Encode labels
-    le = LabelEncoder()
-    y = le.fit_transform(y)
-    
-    # Save labels for later use
-    np.save('exercise_labels.npy', le.classes_)
-    
-    return X, y, le.classes_
+from pose_augment import make_tf_augment
+from pose_dataset import keypoint_files_dataset, train_val_datasets
+from export_model import export_tfjs
+from pose_normalization import PoseNormalization, MOVENET_LAYOUT
+from fast_training import (add_fast_args, setup_fast_training, scaled_learning_rate, with_warmup,
+                           ThroughputLogger, BASE_BATCH_SIZE)
 
-def augment_data(X, y):
-    """Apply data augmentation to the training data."""
-    augmented_X = []
-    augmented_y = []
-    
-    for i in range(len(X)):
-        # Original data
-        augmented_X.append(X[i])
-        augmented_y.append(y[i])
-        
-        # Add random noise to keypoints
-        noise = np.random.normal(0, 0.01, X[i].shape)
-        augmented_X.append(X[i] + noise)
-        augmented_y.append(y[i])
-        
-        # Mirror horizontally (flip left/right)
-        mirrored = X[i].reshape(-1, 3)
-        mirrored[:, 0] = 1 - mirrored[:, 0]  # Flip x coordinates
-        augmented_X.append(mirrored.flatten())
-        augmented_y.append(y[i])
-        
-        # Scale slightly
-        scale_factor = np.random.uniform(0.95, 1.05)
-        scaled = X[i].reshape(-1, 3)
-        scaled[:, :2] *= scale_factor  # Scale x, y coordinates
-        augmented_X.append(scaled.flatten())
-        augmented_y.append(y[i])
-        
-        # Small random rotations
-        for _ in range(2):
-            angle = np.random.uniform(-0.1, 0.1)
-            cos_t = np.cos(angle)
-            sin_t = np.sin(angle)
-            rotated = X[i].reshape(-1, 3).copy()
-            x_coord = rotated[:, 0].copy()
-            y_coord = rotated[:, 1].copy()
-            rotated[:, 0] = x_coord * cos_t - y_coord * sin_t
-            rotated[:, 1] = x_coord * sin_t + y_coord * cos_t
-            augmented_X.append(rotated.flatten())
-            augmented_y.append(y[i])
-    
-    return np.array(augmented_X), np.array(augmented_y)
-
-def create_model(input_shape, num_classes):
+def create_model(input_dim, num_classes):
     """Create an improved model architecture."""
     model = Sequential([
-        Input(shape=input_shape),
+        Input(shape=(input_dim,)),
+        
+        # Hip-centered, unit-scale keypoints; exported with the model so the
+        # browser and the inference server feed raw keypoints
+        PoseNormalization(num_joints=input_dim // 3, **MOVENET_LAYOUT, dtype='float32'),
         
         # First block - capture local features
         BatchNormalization(),
@@ -104,39 +43,52 @@ def create_model(input_shape, num_classes):
         Dense(128, activation='relu'),
         Dropout(0.2),
         
-        # Output layer
+        # Output layer (float32 under mixed precision)
         BatchNormalization(),
-        Dense(num_classes, activation='softmax')
+        Dense(num_classes, activation='softmax', dtype='float32')
     ])
     
     return model
 
-def main():
-    print("\nLoading data...")
-    X, y, labels = load_data()
-    
-    print("\nAugmenting data...")
-    X_aug, y_aug = augment_data(X, y)
+def main(argv=None):
+    parser = add_fast_args(argparse.ArgumentParser(description='Train the v2 exercise classifier'))
+    parser.add_argument('--data', default='training/keypoints', help='Keypoint directory')
+    parser.add_argument('--out', default='exercise_classifier.h5')
+    parser.add_argument('--labels-out', default='exercise_labels.npy')
+    parser.add_argument('--tfjs-out', default='public/tfjs_model')
+    args = parser.parse_args(argv)
+    batch_size = setup_fast_training(args)
     
-    print("\nSplitting data...")
-    X_train, X_val, y_train, y_val = train_test_split(
-        X_aug, y_aug, test_size=0.2, random_state=42, stratify=y_aug
+    print("\nLoading data...")
+    dataset, labels = keypoint_files_dataset(args.data)
+    np.save(args.labels_out, labels)
+    input_dim = dataset.element_spec[0].shape[0]
+    
+    # Augment on the fly, so each epoch sees fresh noise/mirror/scale/rotation
+    # variants of the training split without materializing them
+    print("\nBuilding augmented input pipeline...")
+    train_ds, val_ds = train_val_datasets(
+        dataset, validation_split=0.2, batch_size=batch_size,
+        augment=make_tf_augment(input_dim // 3)
     )
     
     print("\nCreating model...")
-    model = create_model(X_train.shape[1], len(np.unique(y)))
+    model = create_model(input_dim, len(labels))
     
-    # Compile model with learning rate schedule
-    initial_learning_rate = 0.001
+    # Compile model with learning rate schedule; the rate scales with the
+    # batch size (warming up when scaled) and the decay keeps pace with the
+    # number of samples seen
+    initial_learning_rate = scaled_learning_rate(0.001, batch_size)
     lr_schedule = tf.keras.optimizers.schedules.ExponentialDecay(
-        initial_learning_rate, decay_steps=1000, decay_rate=0.9
+        initial_learning_rate, decay_steps=max(1, 1000 * BASE_BATCH_SIZE // batch_size), decay_rate=0.9
     )
-    optimizer = tf.keras.optimizers.Adam(learning_rate=lr_schedule)
+    optimizer = tf.keras.optimizers.Adam(learning_rate=with_warmup(lr_schedule, batch_size))
     
     model.compile(
         optimizer=optimizer,
         loss='sparse_categorical_crossentropy',
-        metrics=['accuracy']
+        metrics=['accuracy'],
+        jit_compile=args.fast
     )
     
     print("\nModel summary:")
@@ -155,33 +107,34 @@ def main():
             monitor='val_accuracy',
             save_best_only=True,
             verbose=1
-        )
+        ),
+        ThroughputLogger(batch_size)
     ]
     
     print("\nTraining model...")
     history = model.fit(
-        X_train, y_train,
-        validation_data=(X_val, y_val),
+        train_ds,
+        validation_data=val_ds,
         epochs=100,
-        batch_size=32,
         callbacks=callbacks,
         verbose=1
     )
     
     print("\nSaving model...")
-    model.save('exercise_classifier.h5')
+    model.save(args.out)
     
     print("\nConverting to TensorFlow.js format...")
-    tfjs.converters.save_keras_model(model, 'public/tfjs_model')
+    export_tfjs(model, args.tfjs_out)
     
     # Save labels as JSON for frontend
-    with open('public/tfjs_model/exercise_labels.json', 'w') as f:
+    labels_json = os.path.join(args.tfjs_out, 'exercise_labels.json')
+    with open(labels_json, 'w') as f:
         json.dump(labels.tolist(), f)
     
     print("\n✅ Training complete!")
-    print("✅ Model saved as 'exercise_classifier.h5'")
-    print("✅ TensorFlow.js model saved in 'public/tfjs_model'")
-    print("✅ Labels saved in 'public/tfjs_model/exercise_labels.json'")
+    print(f"✅ Model saved as '{args.out}'")
+    print(f"✅ TensorFlow.js model saved in '{args.tfjs_out}'")
+    print(f"✅ Labels saved in '{labels_json}'")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
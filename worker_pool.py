@@ -0,0 +1,58 @@
+import os
+import sys
+import traceback
+import multiprocessing as mp
+from tqdm import tqdm
+
+
+def _init_worker(initializer, initargs):
+    # Per-file progress lines from workers would tear the parent's tqdm bar
+    sys.stdout = open(os.devnull, 'w')
+    if initializer is not None:
+        initializer(*initargs)
+
+
+def _call_safe(func, item):
+    try:
+        return item, func(item), None
+    except Exception as e:
+        return item, None, f"{type(e).__name__}: {e}\n{traceback.format_exc()}"
+
+
+def _call_item(args):
+    return _call_safe(*args)
+
+
+def imap_safe(func, items, workers=1, initializer=None, initargs=(), desc=None):
+    """Map `func` over `items`, yielding (item, result, error) as they finish.
+
+    With workers > 1 the items are sharded over a spawn-based process pool
+    whose workers each run `initializer` once (e.g. to load their own pose
+    model). An exception on one item is returned as its error string instead
+    of stopping the run. Progress is shown as one tqdm bar in the parent.
+    """
+    items = list(items)
+    if workers is None or workers <= 1:
+        if initializer is not None:
+            initializer(*initargs)
+        for item in tqdm(items, desc=desc):
+            yield _call_safe(func, item)
+        return
+
+    # spawn: TensorFlow and MediaPipe are not fork-safe once initialized
+    ctx = mp.get_context('spawn')
+    with ctx.Pool(workers, initializer=_init_worker, initargs=(initializer, initargs)) as pool:
+        results = pool.imap_unordered(_call_item, [(func, item) for item in items])
+        with tqdm(total=len(items), desc=desc) as progress:
+            failed = 0
+            for item, result, error in results:
+                if error is not None:
+                    failed += 1
+                    progress.set_postfix(failed=failed)
+                progress.update()
+                yield item, result, error
+
+
+def threads_per_worker(workers):
+    """CPU threads each worker may use without oversubscribing the host"""
+    return max(1, (os.cpu_count() or 1) // max(1, workers or 1))